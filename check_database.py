@@ -3,11 +3,78 @@
 Database monitoring script - shows what data is being collected
 """
 
+import contextlib
+import io
 import sqlite3
 import sys
+import time
 from pathlib import Path
 from datetime import datetime
 
+# Connection tuning for a read-mostly check running alongside the monitor
+PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=268435456;
+    PRAGMA cache_size=-20000;
+"""
+
+# Queries are kept as module constants so sqlite3's statement cache reuses them
+TABLES_QUERY = "SELECT name FROM sqlite_master WHERE type='table'"
+
+# Metric rows live in monthly shard tables (metrics_YYYYMM); one snapshot is
+# the rows sharing a timestamp. Rows are inserted in timestamp order, so the
+# recent ones are found scanning back from the newest rowid
+RECENT_ROWS_WHERE = """
+    WHERE id > IFNULL((SELECT id FROM {table} WHERE timestamp <= ? ORDER BY id DESC LIMIT 1), 0)
+"""
+
+RECENT_METRICS_QUERY = """
+    SELECT COUNT(DISTINCT timestamp), MAX(timestamp) 
+    FROM {table} 
+""" + RECENT_ROWS_WHERE
+
+DESYNC_COUNT_QUERY = "SELECT COUNT(*) FROM desync_events"
+
+RECENT_DESYNCS_QUERY = """
+    SELECT event_id, detected_at, local_block, network_block, severity 
+    FROM desync_events 
+    ORDER BY detected_at DESC 
+    LIMIT 5
+"""
+
+ANOMALY_COUNT_QUERY = "SELECT COUNT(*) FROM metric_anomalies"
+
+RECENT_SNAPSHOTS_QUERY = """
+    SELECT timestamp, COUNT(*) 
+    FROM {table} 
+""" + RECENT_ROWS_WHERE + """
+    GROUP BY timestamp 
+    ORDER BY timestamp DESC 
+    LIMIT 10
+"""
+
+# Indexes backing the queries above (same names as storage/database.py)
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_desync_detected_at ON desync_events(detected_at)",
+]
+
+
+def _prepare_connection(conn):
+    """Apply PRAGMAs and make sure the queried columns are indexed."""
+    conn.executescript(PRAGMAS)
+    
+    for statement in INDEXES:
+        try:
+            conn.execute(statement)
+        except sqlite3.OperationalError:
+            # Table not created yet
+            continue
+    
+    conn.execute("ANALYZE")
+
+
 def check_database():
     """Check what data is in the monitoring database."""
     
@@ -21,76 +88,78 @@ def check_database():
     print("=" * 50)
     
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        _prepare_connection(conn)
         
         # Check tables
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = cursor.fetchall()
+        tables = conn.execute(TABLES_QUERY).fetchall()
         print(f"📋 Tables: {[table[0] for table in tables]}")
         
+        # Newest metric shard
+        shards = sorted(table[0] for table in tables if table[0][len('metrics_'):].isdigit())
+        latest_shard = shards[-1] if shards else None
+        
         # Check recent metrics
         try:
-            cursor.execute("""
-                SELECT COUNT(*), MAX(timestamp) 
-                FROM metrics_snapshots 
-                WHERE timestamp > datetime('now', '-1 hour')
-            """)
-            metrics_count, latest_metric = cursor.fetchone()
+            if latest_shard is None:
+                raise sqlite3.OperationalError("no metric shards")
+            # Timestamps are stored as unix epoch seconds
+            metrics_count, latest_metric = conn.execute(
+                RECENT_METRICS_QUERY.format(table=latest_shard), (time.time() - 3600,)
+            ).fetchone()
             print(f"📊 Metrics in last hour: {metrics_count}")
             print(f"📊 Latest metric: {latest_metric}")
-        except:
+        except sqlite3.OperationalError:
             print("📊 No metrics collected yet")
         
         # Check desync events
         try:
-            cursor.execute("SELECT COUNT(*) FROM desync_events")
-            desync_count = cursor.fetchone()[0]
+            desync_count = conn.execute(DESYNC_COUNT_QUERY).fetchone()[0]
             print(f"⚠️  Total desync events: {desync_count}")
             
             if desync_count > 0:
-                cursor.execute("""
-                    SELECT event_id, detected_at, local_block, network_block, severity 
-                    FROM desync_events 
-                    ORDER BY detected_at DESC 
-                    LIMIT 5
-                """)
-                recent_desyncs = cursor.fetchall()
+                recent_desyncs = conn.execute(RECENT_DESYNCS_QUERY).fetchall()
                 print("🔥 Recent desyncs:")
                 for desync in recent_desyncs:
                     event_id, detected_at, local_block, network_block, severity = desync
                     print(f"   {detected_at} - {event_id} ({severity}) - Local: {local_block}, Network: {network_block}")
-        except:
+        except sqlite3.OperationalError:
             print("⚠️  No desync events table yet")
         
         # Check anomalies
         try:
-            cursor.execute("SELECT COUNT(*) FROM metric_anomalies")
-            anomaly_count = cursor.fetchone()[0]
+            anomaly_count = conn.execute(ANOMALY_COUNT_QUERY).fetchone()[0]
             print(f"🚨 Total anomalies detected: {anomaly_count}")
-        except:
+        except sqlite3.OperationalError:
             print("🚨 No anomalies table yet")
         
         # Show latest activity
         try:
-            cursor.execute("""
-                SELECT timestamp, samples_count 
-                FROM metrics_snapshots 
-                ORDER BY timestamp DESC 
-                LIMIT 10
-            """)
-            recent_snapshots = cursor.fetchall()
+            if latest_shard is None:
+                raise sqlite3.OperationalError("no metric shards")
+            recent_snapshots = conn.execute(
+                RECENT_SNAPSHOTS_QUERY.format(table=latest_shard), (time.time() - 3600,)
+            ).fetchall()
             if recent_snapshots:
                 print(f"\n📈 Recent metric snapshots:")
                 for timestamp, count in recent_snapshots[:5]:
                     print(f"   {timestamp} - {count} metrics collected")
-        except:
+        except sqlite3.OperationalError:
             print("📈 No metrics snapshots yet")
         
+        conn.execute("PRAGMA optimize")
         conn.close()
         
     except Exception as e:
         print(f"❌ Database error: {e}")
 
 if __name__ == "__main__":
-    check_database()
\ No newline at end of file
+    # Collect output and write it in one go instead of one write per print()
+    buf = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(buf):
+            check_database()
+    finally:
+        sys.stdout.write(buf.getvalue())
+        sys.stdout.flush()
\ No newline at end of file
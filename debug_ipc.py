@@ -3,11 +3,13 @@
 Test script to isolate the IPCClient initialization issue
 """
 
+import contextlib
+import io
+import os
 import sys
-from pathlib import Path
 
 # Add src to path for imports
-sys.path.insert(0, str(Path(__file__).parent / 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
 
 def test_ipc_import():
     """Test importing and initializing IPCClient"""
@@ -63,4 +65,11 @@ def test_ipc_import():
         traceback.print_exc()
 
 if __name__ == "__main__":
-    test_ipc_import()
\ No newline at end of file
+    # Collect output and write it in one go instead of one write per print()
+    buf = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(buf):
+            test_ipc_import()
+    finally:
+        sys.stdout.write(buf.getvalue())
+        sys.stdout.flush()
\ No newline at end of file
@@ -3,11 +3,13 @@
 Minimal test to diagnose the IPCClient issue on remote node
 """
 
+import contextlib
+import io
+import os
 import sys
-from pathlib import Path
 
 # Add src to path
-sys.path.insert(0, str(Path(__file__).parent / 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
 
 def diagnose_issue():
     """Diagnose the IPCClient initialization issue."""
@@ -37,10 +39,11 @@ def diagnose_issue():
         import monitoring.sync_monitor as sm_module
         
         # Check if there's a fallback IPCClient in the module
-        fallback_attrs = []
-        for attr in dir(sm_module):
-            if 'IPCClient' in str(getattr(sm_module, attr, '')):
-                fallback_attrs.append(attr)
+        fallback_attrs = [
+            name for name, value in sm_module.__dict__.items()
+            if 'IPC' in name and isinstance(value, type)
+            and value.__module__ != 'core.ipc_client'
+        ]
         
         if fallback_attrs:
             print(f"⚠️  Found potential fallback IPCClient: {fallback_attrs}")
@@ -91,4 +94,11 @@ def diagnose_issue():
         traceback.print_exc()
 
 if __name__ == "__main__":
-    diagnose_issue()
\ No newline at end of file
+    # Collect output and write it in one go instead of one write per print()
+    buf = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(buf):
+            diagnose_issue()
+    finally:
+        sys.stdout.write(buf.getvalue())
+        sys.stdout.flush()
\ No newline at end of file
@@ -6,27 +6,49 @@ Monitors Ethereum-based blockchain fullnodes (geth and reth) to detect and analy
 """
 
 import asyncio
+import importlib
 import logging
+import os
 import signal
 import sys
-from pathlib import Path
 
 # Add src to path for imports
-sys.path.insert(0, str(Path(__file__).parent / 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
 
-try:
-    from utils.config import load_config
-    from utils.logger import setup_logging
-    from core.node_detector import NodeDetector
-    from monitoring.sync_monitor import SyncMonitor
-    from monitoring.metrics_collector import MetricsCollector
-    from loggers.desync_logger import DesyncLogger
-    from storage.database import MetricsDatabase
-except ImportError as e:
-    print(f"Failed to import modules: {e}")
-    print("Please ensure the project is properly set up and dependencies are installed.")
-    print("Install dependencies with: pip install -r requirements.txt")
-    sys.exit(1)
+# Application modules are imported on first use to keep startup fast
+_LAZY_IMPORTS = {
+    'load_config': ('utils.config', 'load_config'),
+    'ensure_runtime_dirs': ('utils.config', 'ensure_runtime_dirs'),
+    'setup_logging': ('utils.logger', 'setup_logging'),
+    'NodeDetector': ('core.node_detector', 'NodeDetector'),
+    'SyncMonitor': ('monitoring.sync_monitor', 'SyncMonitor'),
+    'MetricsCollector': ('monitoring.metrics_collector', 'MetricsCollector'),
+    'DesyncLogger': ('loggers.desync_logger', 'DesyncLogger'),
+    'MetricsDatabase': ('storage.database', 'MetricsDatabase'),
+}
+
+
+def __getattr__(name):
+    """Resolve application modules lazily (PEP 562)."""
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    
+    module_name, attr = _LAZY_IMPORTS[name]
+    value = getattr(importlib.import_module(module_name), attr)
+    globals()[name] = value
+    return value
+
+
+def _import_components():
+    """Import all application modules, exiting with a hint if any are missing."""
+    try:
+        for name in _LAZY_IMPORTS:
+            __getattr__(name)
+    except ImportError as e:
+        print(f"Failed to import modules: {e}")
+        print("Please ensure the project is properly set up and dependencies are installed.")
+        print("Install dependencies with: pip install -r requirements.txt")
+        sys.exit(1)
 
 
 class NodeMonitor:
@@ -36,6 +58,7 @@ class NodeMonitor:
         self.config = None
         self.logger = None
         self.is_running = False
+        self._shutdown_event = asyncio.Event()
         
         # Core components
         self.node_detector = None
@@ -43,16 +66,16 @@ class NodeMonitor:
         self.metrics_collector = None
         self.desync_logger = None
         self.database = None
-        
-        # Monitoring tasks
-        self.monitoring_tasks = []
     
     async def initialize(self):
         """Initialize the monitoring system."""
+        _import_components()
+        
         try:
             # Load configuration
             print("Loading configuration...")
             self.config = load_config()
+            ensure_runtime_dirs(self.config)
             print("Configuration loaded successfully")
             
             # Setup logging
@@ -70,13 +93,14 @@ class NodeMonitor:
             
             # Initialize components
             self.node_detector = NodeDetector(self.config)
-            self.sync_monitor = SyncMonitor(self.config)
-            self.metrics_collector = MetricsCollector(self.config)
-            self.desync_logger = DesyncLogger(self.config)
+            self.sync_monitor = SyncMonitor(self.config, database=self.database)
+            self.metrics_collector = MetricsCollector(self.config, database=self.database)
+            self.desync_logger = DesyncLogger(self.config, database=self.database)
             
             # Initialize sync monitor
             await self.sync_monitor.initialize()
             await self.metrics_collector.initialize()
+            await self.desync_logger.initialize()
             
             # Setup callbacks
             self._setup_event_callbacks()
@@ -132,15 +156,11 @@ class NodeMonitor:
         self.logger.info("Starting blockchain node monitoring...")
         
         try:
-            # Start monitoring tasks
-            self.monitoring_tasks = [
-                asyncio.create_task(self.sync_monitor.start_monitoring()),
-                asyncio.create_task(self.metrics_collector.start_collection()),
-                asyncio.create_task(self._status_reporter())
-            ]
-            
-            # Wait for all tasks to complete (or cancellation)
-            await asyncio.gather(*self.monitoring_tasks, return_exceptions=True)
+            # Run monitoring tasks until cancelled; a failing task cancels its siblings
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(self.sync_monitor.start_monitoring())
+                tg.create_task(self.metrics_collector.start_collection())
+                tg.create_task(self._status_reporter())
             
         except asyncio.CancelledError:
             self.logger.info("Monitoring cancelled")
@@ -151,14 +171,15 @@ class NodeMonitor:
     
     async def _status_reporter(self):
         """Periodic status reporting."""
-        while self.is_running:
+        while not self._shutdown_event.is_set():
+            try:
+                # Log status every 5 minutes, or stop as soon as shutdown begins
+                await asyncio.wait_for(self._shutdown_event.wait(), timeout=300)
+                break
+            except asyncio.TimeoutError:
+                pass
+            
             try:
-                # Log status every 5 minutes
-                await asyncio.sleep(300)
-                
-                if not self.is_running:
-                    break
-                
                 # Get monitoring status
                 sync_status = await self.sync_monitor.get_monitoring_status()
                 metrics_stats = await self.metrics_collector.get_metrics_stats()
@@ -166,21 +187,15 @@ class NodeMonitor:
                 self.logger.info(f"Status: Active desyncs: {len(sync_status.get('active_desyncs', []))}, "
                                f"Metrics collected: {metrics_stats.get('collection_stats', {}).get('metrics_collected', 0)}")
                 
-            except asyncio.CancelledError:
-                break
             except Exception as e:
                 self.logger.error(f"Status reporting failed: {e}")
     
     async def shutdown(self):
         """Shutdown the monitoring system."""
         self.is_running = False
+        self._shutdown_event.set()
         self.logger.info("Shutting down node monitor...")
         
-        # Cancel monitoring tasks
-        for task in self.monitoring_tasks:
-            if not task.done():
-                task.cancel()
-        
         # Shutdown components
         if self.sync_monitor:
             await self.sync_monitor.stop_monitoring()
@@ -188,6 +203,9 @@ class NodeMonitor:
         if self.metrics_collector:
             await self.metrics_collector.stop_collection()
         
+        if self.desync_logger:
+            await self.desync_logger.close()
+        
         if self.database:
             await self.database.close()
         
@@ -204,31 +222,37 @@ async def main():
     # Create a shutdown event
     shutdown_event = asyncio.Event()
     
-    def signal_handler(sig, frame):
+    def signal_handler(sig):
         """Handle shutdown signals."""
         monitor.logger.info(f"Received signal {sig}, shutting down...")
         shutdown_event.set()
     
-    # Setup signal handlers
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
+    # Setup signal handlers on the event loop
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, signal_handler, sig)
     
     try:
         # Start monitoring in background task
         monitoring_task = asyncio.create_task(monitor.start_monitoring())
         
-        # Wait for shutdown signal
-        await shutdown_event.wait()
+        # Wait for shutdown signal, or for monitoring to stop on its own
+        shutdown_wait = asyncio.create_task(shutdown_event.wait())
+        await asyncio.wait(
+            {monitoring_task, shutdown_wait},
+            return_when=asyncio.FIRST_COMPLETED
+        )
+        shutdown_wait.cancel()
         
-        # Cancel monitoring task
+        # Cancel monitoring task (cancels every task in its group)
         monitoring_task.cancel()
         try:
             await monitoring_task
         except asyncio.CancelledError:
             pass
-        
-        # Shutdown monitor
-        await monitor.shutdown()
+        finally:
+            # Shutdown monitor
+            await monitor.shutdown()
         
     except Exception as e:
         monitor.logger.error(f"Error during monitoring: {e}")
@@ -5,19 +5,124 @@ Universal IPC client for both geth and reth nodes with HTTP RPC fallback.
 import json
 import socket
 import asyncio
+import importlib.util
+import itertools
 import logging
+import math
+import time
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import TYPE_CHECKING, Dict, Any, Optional, List, Tuple, Callable, Union
 from dataclasses import dataclass
 
-try:
+if TYPE_CHECKING:
     import aiohttp
-    HAS_AIOHTTP = True
+
+# How long immutable node metadata stays cached (seconds)
+CLIENT_VERSION_TTL = 3600
+PROTOCOL_VERSION_TTL = 3600
+CHAIN_ID_TTL = math.inf
+
+# Parameterless methods served from the cache by call_method. net_version is
+# left out on purpose: is_connected(deep=True) uses it as a liveness probe.
+STATIC_METHOD_TTLS = {
+    "web3_clientVersion": CLIENT_VERSION_TTL,
+    "eth_chainId": CHAIN_ID_TTL,
+    "eth_protocolVersion": PROTOCOL_VERSION_TTL,
+}
+
+# Largest IPC response line accepted; bigger responses are rejected
+# instead of being buffered (asyncio's default limit is only 64 KiB)
+MAX_IPC_RESPONSE_BYTES = 16 * 1024 * 1024
+
+# Kernel socket buffer size for the IPC connection
+IPC_SOCKET_BUFFER_BYTES = 1 << 20
+
+# Responses are newline-delimited JSON
+_IPC_SEPARATOR = b'\n'
+
+# aiohttp is only needed for HTTP RPC, so it is imported on first use
+HAS_AIOHTTP = importlib.util.find_spec("aiohttp") is not None
+_aiohttp = None
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+if HAS_ORJSON:
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+else:
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+    
+    _json_loads = json.loads
+
+try:
+    import msgspec
+    HAS_MSGSPEC = True
 except ImportError:
-    HAS_AIOHTTP = False
+    HAS_MSGSPEC = False
+
+
+if HAS_MSGSPEC:
+    class RawRPCResponse(msgspec.Struct):
+        """JSON-RPC response object, decoded straight from bytes into a struct."""
+        id: Any = None
+        result: Any = None
+        error: Any = None
+    
+    _rpc_decoder = msgspec.json.Decoder(Union[RawRPCResponse, List[RawRPCResponse]])
+    _decode_rpc_response = _rpc_decoder.decode
+    _DECODE_ERRORS = (json.JSONDecodeError, msgspec.DecodeError)
+else:
+    @dataclass(slots=True)
+    class RawRPCResponse:
+        """JSON-RPC response object."""
+        id: Any = None
+        result: Any = None
+        error: Any = None
+    
+    def _to_raw_response(item: Any) -> RawRPCResponse:
+        if not isinstance(item, dict):
+            raise ValueError(f"Invalid JSON-RPC response object: {item!r:.100}")
+        return RawRPCResponse(item.get("id"), item.get("result"), item.get("error"))
+    
+    def _decode_rpc_response(data: bytes) -> Union[RawRPCResponse, List[RawRPCResponse]]:
+        decoded = _json_loads(data)
+        if isinstance(decoded, list):
+            return [_to_raw_response(item) for item in decoded]
+        return _to_raw_response(decoded)
+    
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError
+    _DECODE_ERRORS = (json.JSONDecodeError,)
+
+
+def _hex_to_int(value: Any, default: Optional[int] = 0) -> Optional[int]:
+    """Convert a JSON-RPC quantity (hex string or int) to an integer."""
+    if isinstance(value, str):
+        try:
+            # int() accepts the 0x prefix itself when base is 16
+            return int(value, 16)
+        except ValueError:
+            return default
+    if isinstance(value, int):
+        return value
+    return default
+
+
+def _get_aiohttp():
+    """Import aiohttp on first use and return the module."""
+    global _aiohttp
+    if _aiohttp is None:
+        import aiohttp
+        _aiohttp = aiohttp
+    return _aiohttp
 
 
-@dataclass
+@dataclass(slots=True)
 class IPCResponse:
     """IPC response wrapper."""
     success: bool
@@ -26,6 +131,23 @@ class IPCResponse:
     method: Optional[str] = None
 
 
+@dataclass(slots=True)
+class SyncStatus:
+    """Lightweight sync status returned by IPCClient.get_sync_status."""
+    is_syncing: bool
+    current_block: int
+    highest_block: int
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for reporting."""
+        return {
+            'is_syncing': self.is_syncing,
+            'current_block': self.current_block,
+            'highest_block': self.highest_block,
+            'blocks_behind': max(0, self.highest_block - self.current_block) if not self.is_syncing else 0
+        }
+
+
 class IPCClient:
     """Universal IPC client supporting both geth and reth with HTTP RPC fallback."""
     
@@ -42,8 +164,26 @@ class IPCClient:
         self.http_rpc_url = http_rpc_url or "http://localhost:8545"
         self.timeout = timeout
         self.logger = logging.getLogger('ipc_client')
-        self._request_id = 0
+        self._request_ids = itertools.count(1)
+        self._templates: Dict[str, bytes] = {}
         self._use_http = False
+        self._session: Optional["aiohttp.ClientSession"] = None
+        self._batch_supported = True
+        
+        # Whether the last get_sync_status() saw the node syncing
+        self._last_syncing = False
+        
+        # Cached responses for node metadata: method -> (fetched_at, response)
+        self._cache: Dict[str, Tuple[float, IPCResponse]] = {}
+        
+        # Persistent IPC connection, shared by all calls
+        self._ipc_writer: Optional[asyncio.StreamWriter] = None
+        self._ipc_reader_task: Optional[asyncio.Task] = None
+        self._ipc_connect_lock = asyncio.Lock()
+        
+        # In-flight IPC requests: request id -> future resolved by the reader task
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._pending_batches: List[int] = []
         
         # Auto-detect connection method
         if not ipc_path or not Path(ipc_path).exists():
@@ -68,23 +208,23 @@ class IPCClient:
         Returns:
             IPCResponse with result or error
         """
-        if params is None:
-            params = []
-        
-        self._request_id += 1
+        ttl = None if params else STATIC_METHOD_TTLS.get(method)
+        if ttl is not None:
+            cached = self._get_cached(method, ttl)
+            if cached is not None:
+                return cached
         
-        request = {
-            "jsonrpc": "2.0",
-            "method": method,
-            "params": params,
-            "id": self._request_id
-        }
+        request_id, request = self._encode_request(method, params)
         
         try:
             if self._use_http:
-                return await self._call_http(request, method)
+                response = await self._call_http(request, method)
             else:
-                return await self._call_ipc(request, method)
+                response = await self._call_ipc(request, method, request_id)
+            
+            if ttl is not None:
+                self._store_cached(method, response)
+            return response
                 
         except Exception as e:
             self.logger.error(f"Failed to call {method}: {e}")
@@ -94,130 +234,374 @@ class IPCClient:
                 method=method
             )
     
-    async def _call_http(self, request: dict, method: str) -> IPCResponse:
-        """Call method via HTTP RPC."""
-        if not HAS_AIOHTTP:
-            return IPCResponse(
-                success=False,
-                error="aiohttp not available - cannot use HTTP RPC",
-                method=method
-            )
-            
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.http_rpc_url,
-                    json=request,
-                    timeout=aiohttp.ClientTimeout(total=self.timeout),
-                    headers={"Content-Type": "application/json"}
-                ) as response:
-                    if response.status != 200:
-                        return IPCResponse(
-                            success=False,
-                            error=f"HTTP {response.status}: {await response.text()}",
-                            method=method
-                        )
-                    
-                    response_data = await response.json()
-                    
-                    if "error" in response_data:
-                        return IPCResponse(
-                            success=False,
-                            error=response_data["error"].get("message", "Unknown RPC error"),
-                            method=method
-                        )
-                    
-                    return IPCResponse(
-                        success=True,
-                        data=response_data.get("result"),
-                        method=method
-                    )
-                    
-        except asyncio.TimeoutError:
-            return IPCResponse(
-                success=False,
-                error=f"HTTP request timeout after {self.timeout}s",
-                method=method
-            )
-        except Exception as e:
-            return IPCResponse(
-                success=False,
-                error=f"HTTP request failed: {e}",
-                method=method
-            )
+    def _encode_request(self, method: str, params: Optional[List[Any]]) -> Tuple[int, bytes]:
+        """
+        Encode a single JSON-RPC request.
+        
+        Parameterless methods (eth_blockNumber, net_peerCount, ...) make up
+        most polling traffic, so their encoding is built once per method and
+        only the id is filled in per call.
+        """
+        request_id = next(self._request_ids)
+        
+        if params:
+            return request_id, _json_dumps({
+                "jsonrpc": "2.0",
+                "method": method,
+                "params": params,
+                "id": request_id
+            })
+        
+        template = self._templates.get(method)
+        if template is None:
+            encoded_method = _json_dumps(method).replace(b'%', b'%%')
+            template = b'{"jsonrpc":"2.0","method":' + encoded_method + b',"params":[],"id":%d}'
+            self._templates[method] = template
+        return request_id, template % request_id
     
-    async def _call_ipc(self, request: dict, method: str) -> IPCResponse:
-        """Call method via IPC socket."""
-        try:
-            # Check if IPC socket exists
-            if not Path(self.ipc_path).exists():
-                return IPCResponse(
-                    success=False,
-                    error=f"IPC socket not found: {self.ipc_path}",
-                    method=method
-                )
-            
-            # Connect and send request
-            reader, writer = await asyncio.wait_for(
-                asyncio.open_unix_connection(self.ipc_path),
-                timeout=self.timeout
-            )
-            
-            # Send request
-            request_data = json.dumps(request) + '\n'
-            writer.write(request_data.encode('utf-8'))
-            await writer.drain()
-            
-            # Read response
-            response_data = await asyncio.wait_for(
-                reader.readline(),
-                timeout=self.timeout
-            )
-            
-            writer.close()
-            await writer.wait_closed()
+    async def call_method_projected(self, method: str, params: List[Any] = None,
+                                    project: Callable[[Any], Any] = None) -> IPCResponse:
+        """
+        Call a JSON-RPC method and keep only part of its result.
+        
+        Large responses such as admin_peers are projected right after
+        decoding, so callers holding on to the response do not keep the
+        whole object tree alive.
+        
+        Args:
+            method: RPC method name
+            params: Method parameters
+            project: Function mapping the full result to the part to keep
             
-            # Parse response
-            if not response_data:
+        Returns:
+            IPCResponse whose data is the projected result
+        """
+        response = await self.call_method(method, params)
+        if response.success and project is not None and response.data is not None:
+            try:
+                response.data = project(response.data)
+            except (KeyError, IndexError, TypeError, AttributeError) as e:
                 return IPCResponse(
                     success=False,
-                    error="Empty response from node",
+                    error=f"Unexpected {method} result shape: {e}",
                     method=method
                 )
+        return response
+    
+    async def call_batch(self, calls: List[Tuple[str, List[Any]]]) -> List[IPCResponse]:
+        """
+        Call several JSON-RPC methods in a single batch request.
+        
+        Both geth and reth accept JSON-RPC 2.0 batches over IPC and HTTP, so
+        the whole batch costs one round-trip. Responses are matched back to
+        their requests by id.
+        
+        Args:
+            calls: List of (method, params) tuples
             
-            response = json.loads(response_data.decode('utf-8'))
-            
-            if 'error' in response:
-                return IPCResponse(
+        Returns:
+            List of IPCResponse objects in the same order as ``calls``
+        """
+        if not calls:
+            # An empty batch is an invalid request in JSON-RPC 2.0
+            return []
+        
+        if not self._batch_supported:
+            return await self._call_concurrently(calls)
+        
+        requests = []
+        for method, params in calls:
+            requests.append({
+                "jsonrpc": "2.0",
+                "method": method,
+                "params": params or [],
+                "id": next(self._request_ids)
+            })
+        
+        if self._use_http and not HAS_AIOHTTP:
+            return [
+                IPCResponse(
                     success=False,
-                    error=response['error']['message'],
+                    error="aiohttp not available - cannot use HTTP RPC",
                     method=method
                 )
-            
+                for method, _ in calls
+            ]
+        
+        try:
+            request_data = _json_dumps(requests)
+            if self._use_http:
+                response_data = await self._http_roundtrip(request_data)
+            else:
+                response_data = await self._ipc_roundtrip(request_data, requests[0]["id"], is_batch=True)
+        except FileNotFoundError:
+            if self._switch_to_http():
+                return await self.call_batch(calls)
+            error = f"IPC socket not found: {self.ipc_path}"
+            return [IPCResponse(success=False, error=error, method=method) for method, _ in calls]
+        except Exception as e:
+            error = self._describe_error(e)
+            return [IPCResponse(success=False, error=error, method=method) for method, _ in calls]
+        
+        if not isinstance(response_data, list):
+            # Node rejected the batch as a whole - fall back to individual calls
+            self.logger.debug("Batch request not supported by node, falling back to individual calls")
+            self._batch_supported = False
+            return await self._call_concurrently(calls)
+        
+        responses_by_id = {item.id: item for item in response_data}
+        
+        results = []
+        for request in requests:
+            item = responses_by_id.get(request["id"])
+            if item is None:
+                results.append(IPCResponse(
+                    success=False,
+                    error="Missing response in batch",
+                    method=request["method"]
+                ))
+            else:
+                results.append(self._to_response(item, request["method"]))
+        
+        return results
+    
+    async def _call_concurrently(self, calls: List[Tuple[str, List[Any]]]) -> List[IPCResponse]:
+        """Issue individual calls concurrently for nodes without batch support."""
+        return list(await asyncio.gather(
+            *(self.call_method(method, params) for method, params in calls)
+        ))
+    
+    def _to_response(self, response_data: RawRPCResponse, method: str) -> IPCResponse:
+        """Convert a decoded JSON-RPC response object into an IPCResponse."""
+        error = response_data.error
+        if error is not None:
             return IPCResponse(
-                success=True,
-                data=response.get('result'),
+                success=False,
+                error=error.get("message", "Unknown RPC error") if isinstance(error, dict) else str(error),
                 method=method
             )
-            
-        except asyncio.TimeoutError:
+        
+        return IPCResponse(
+            success=True,
+            data=response_data.result,
+            method=method
+        )
+    
+    def _describe_error(self, error: Exception) -> str:
+        """Build an error message for a failed transport round-trip."""
+        if isinstance(error, asyncio.TimeoutError):
+            if self._use_http:
+                return f"HTTP request timeout after {self.timeout}s"
+            return f"Request timeout after {self.timeout}s"
+        if isinstance(error, _DECODE_ERRORS):
+            return f"Invalid JSON response: {error}"
+        if self._use_http:
+            return f"HTTP request failed: {error}"
+        return f"IPC communication error: {error}"
+    
+    async def _call_http(self, request: bytes, method: str) -> IPCResponse:
+        """Call method via HTTP RPC."""
+        if not HAS_AIOHTTP:
             return IPCResponse(
                 success=False,
-                error=f"Request timeout after {self.timeout}s",
+                error="aiohttp not available - cannot use HTTP RPC",
                 method=method
             )
-        except json.JSONDecodeError as e:
+        
+        try:
+            response_data = await self._http_roundtrip(request)
+        except Exception as e:
             return IPCResponse(
                 success=False,
-                error=f"Invalid JSON response: {e}",
+                error=self._describe_error(e),
+                method=method
+            )
+        
+        return self._to_response(response_data, method)
+    
+    async def _http_roundtrip(self, request_data: bytes) -> Any:
+        """Send an encoded JSON-RPC payload over HTTP and return the decoded response."""
+        session = await self._get_session()
+        try:
+            async with session.post(self.http_rpc_url, data=request_data) as response:
+                if response.status != 200:
+                    raise RuntimeError(f"HTTP {response.status}: {await response.text()}")
+                
+                return _decode_rpc_response(await response.read())
+        except Exception:
+            # The node may be down or restarting - refetch its metadata
+            self._cache.clear()
+            raise
+    
+    async def _get_session(self) -> "aiohttp.ClientSession":
+        """Get the shared HTTP session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            aiohttp = _get_aiohttp()
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=10, keepalive_timeout=75),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"Content-Type": "application/json"}
+            )
+        return self._session
+    
+    async def close(self):
+        """Close the shared HTTP session and IPC connection."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        
+        if self._ipc_writer is not None:
+            writer = self._ipc_writer
+            reader_task = self._ipc_reader_task
+            self._drop_ipc()
+            try:
+                await writer.wait_closed()
+            except Exception as e:
+                self.logger.debug(f"Error while closing IPC connection: {e}")
+            if reader_task is not None:
+                await asyncio.gather(reader_task, return_exceptions=True)
+    
+    async def _call_ipc(self, request: bytes, method: str, request_id: int) -> IPCResponse:
+        """Call method via IPC socket."""
+        try:
+            response_data = await self._ipc_roundtrip(request, request_id)
+        except FileNotFoundError:
+            if self._switch_to_http():
+                return await self._call_http(request, method)
+            return IPCResponse(
+                success=False,
+                error=f"IPC socket not found: {self.ipc_path}",
                 method=method
             )
         except Exception as e:
             return IPCResponse(
                 success=False,
-                error=f"IPC communication error: {e}",
+                error=self._describe_error(e),
                 method=method
             )
+        
+        return self._to_response(response_data, method)
+    
+    def _switch_to_http(self) -> bool:
+        """Fall back to HTTP RPC after the IPC socket disappeared."""
+        if not HAS_AIOHTTP:
+            return False
+        
+        self.logger.warning(f"IPC socket not found: {self.ipc_path}, using HTTP RPC: {self.http_rpc_url}")
+        self._use_http = True
+        return True
+    
+    async def _ipc_roundtrip(self, request_data: bytes, request_id: int, is_batch: bool = False) -> Any:
+        """
+        Send an encoded JSON-RPC payload over the IPC socket and return the decoded response.
+        
+        Requests are pipelined: each caller registers a future under its
+        request id and the background reader task resolves it when the
+        matching response arrives, so concurrent calls share one connection
+        without waiting for each other.
+        """
+        writer = await self._ensure_ipc()
+        
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        if is_batch:
+            self._pending_batches.append(request_id)
+        
+        try:
+            try:
+                # Hand both parts to the transport instead of concatenating them
+                # into a fresh bytes object per request
+                writer.writelines((request_data, _IPC_SEPARATOR))
+                await writer.drain()
+            except BaseException:
+                # A partial write leaves the stream unusable - reconnect on the next call
+                self._drop_ipc()
+                raise
+            
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        finally:
+            self._pending.pop(request_id, None)
+            if is_batch and request_id in self._pending_batches:
+                self._pending_batches.remove(request_id)
+    
+    async def _ensure_ipc(self) -> asyncio.StreamWriter:
+        """Open the IPC connection and start its reader task if not already running."""
+        async with self._ipc_connect_lock:
+            if self._ipc_writer is None or self._ipc_writer.is_closing():
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_unix_connection(self.ipc_path, limit=MAX_IPC_RESPONSE_BYTES),
+                    timeout=self.timeout
+                )
+                self._tune_ipc_socket(writer)
+                self._ipc_writer = writer
+                self._ipc_reader_task = asyncio.create_task(self._read_ipc_responses(reader))
+        return self._ipc_writer
+    
+    def _tune_ipc_socket(self, writer: asyncio.StreamWriter):
+        """Enlarge the socket buffers so large responses take fewer reads."""
+        sock = writer.get_extra_info('socket')
+        if sock is None:
+            return
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, IPC_SOCKET_BUFFER_BYTES)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, IPC_SOCKET_BUFFER_BYTES)
+        except OSError as e:
+            self.logger.debug(f"Could not resize IPC socket buffers: {e}")
+    
+    async def _read_ipc_responses(self, reader: asyncio.StreamReader):
+        """Read response lines from the IPC socket and resolve pending requests."""
+        try:
+            while True:
+                try:
+                    response_data = await reader.readuntil(_IPC_SEPARATOR)
+                except asyncio.IncompleteReadError as e:
+                    raise ConnectionError("Empty response from node") from e
+                
+                self._dispatch_ipc_response(_decode_rpc_response(response_data))
+        
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Oversized line, invalid JSON or closed socket - fail everything in flight
+            self._drop_ipc(e)
+    
+    def _dispatch_ipc_response(self, response: Union[RawRPCResponse, List[RawRPCResponse]]):
+        """Hand a decoded response to the request waiting for it."""
+        key = None
+        if isinstance(response, list):
+            # Batch response - keyed by the id of its first request
+            for item in response:
+                if item.id in self._pending:
+                    key = item.id
+                    break
+        else:
+            key = response.id
+            if key is None and self._pending_batches:
+                # Error without an id: the node rejected a batch as a whole
+                key = self._pending_batches[0]
+        
+        future = self._pending.get(key)
+        if future is not None and not future.done():
+            future.set_result(response)
+    
+    def _drop_ipc(self, error: Optional[Exception] = None):
+        """Discard the current IPC connection and fail requests still waiting on it."""
+        if self._ipc_writer is not None:
+            self._ipc_writer.close()
+        self._ipc_writer = None
+        
+        reader_task = self._ipc_reader_task
+        self._ipc_reader_task = None
+        if reader_task is not None and reader_task is not asyncio.current_task():
+            reader_task.cancel()
+        
+        error = error or ConnectionError("IPC connection closed")
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        
+        # The node may have restarted - refetch its metadata
+        self._cache.clear()
     
     async def get_block_number(self) -> IPCResponse:
         """Get current block number."""
@@ -235,6 +619,13 @@ class IPCClient:
         """Get detailed peer information."""
         return await self.call_method("admin_peers")
     
+    async def get_peer_ids(self) -> IPCResponse:
+        """Get the ids of connected peers without keeping full peer details."""
+        return await self.call_method_projected(
+            "admin_peers",
+            project=lambda peers: [peer.get("id") for peer in peers]
+        )
+    
     async def get_node_info(self) -> IPCResponse:
         """Get node information."""
         return await self.call_method("admin_nodeInfo")
@@ -251,72 +642,100 @@ class IPCClient:
         """Get protocol version."""
         return await self.call_method("eth_protocolVersion")
     
-    async def get_sync_status(self) -> Optional[object]:
+    def _get_cached(self, method: str, ttl: float) -> Optional[IPCResponse]:
+        """Return a cached response if it is younger than ttl seconds."""
+        entry = self._cache.get(method)
+        if entry and time.monotonic() - entry[0] < ttl:
+            return entry[1]
+        return None
+    
+    def _store_cached(self, method: str, response: IPCResponse):
+        """Cache a successful response."""
+        if response.success:
+            self._cache[method] = (time.monotonic(), response)
+    
+    async def get_sync_status(self) -> Optional[SyncStatus]:
         """Get synchronization status - returns SyncStatus object or None."""
-        syncing_response = await self.get_syncing_status()
+        if self._last_syncing:
+            # eth_syncing carries both block numbers while syncing, so
+            # eth_blockNumber is only fetched once the node has caught up
+            syncing_response = await self.call_method("eth_syncing")
+            block_response = None
+        else:
+            syncing_response, block_response = await self.call_batch([
+                ("eth_syncing", []),
+                ("eth_blockNumber", [])
+            ])
         if not syncing_response.success:
             return None
             
-        block_response = await self.get_block_number()
-        if not block_response.success:
-            return None
-            
-        # Mock SyncStatus object since we don't have the import
-        class SyncStatus:
-            def __init__(self, is_syncing, current_block, highest_block):
-                self.is_syncing = is_syncing
-                # Convert hex strings to decimal integers
-                self.current_block = self._hex_to_int(current_block)
-                self.highest_block = self._hex_to_int(highest_block)
-                
-            def _hex_to_int(self, value):
-                """Convert hex string to integer, handle various input types."""
-                if isinstance(value, str) and value.startswith('0x'):
-                    try:
-                        return int(value, 16)
-                    except ValueError:
-                        return 0
-                elif isinstance(value, int):
-                    return value
-                else:
-                    return 0
-            
-            def to_dict(self):
-                """Convert to dictionary for reporting."""
-                return {
-                    'is_syncing': self.is_syncing,
-                    'current_block': self.current_block,
-                    'highest_block': self.highest_block,
-                    'blocks_behind': max(0, self.highest_block - self.current_block) if not self.is_syncing else 0
-                }
-        
         if syncing_response.data is False:
             # Not syncing, fully synced
-            return SyncStatus(False, block_response.data, block_response.data)
+            self._last_syncing = False
+            if block_response is None:
+                block_response = await self.get_block_number()
+            if not block_response.success:
+                return None
+            current_block = _hex_to_int(block_response.data)
+            return SyncStatus(False, current_block, current_block)
         else:
             # Still syncing
+            self._last_syncing = True
             sync_data = syncing_response.data
             return SyncStatus(
                 True,
-                sync_data.get('currentBlock', 0),
-                sync_data.get('highestBlock', 0)
+                _hex_to_int(sync_data.get('currentBlock', 0)),
+                _hex_to_int(sync_data.get('highestBlock', 0))
             )
     
     async def get_latest_block(self) -> int:
         """Get latest block number."""
         response = await self.get_block_number()
         if response.success and response.data:
-            try:
-                return int(response.data, 16)  # Convert hex string to int
-            except (ValueError, TypeError):
-                return 0
+            return _hex_to_int(response.data)
         return 0
     
-    async def is_connected(self) -> bool:
-        """Check if IPC connection is working."""
+    async def is_connected(self, deep: bool = False) -> bool:
+        """
+        Check if IPC connection is working.
+        
+        Args:
+            deep: Issue a net_version call instead of only checking that the
+                IPC socket accepts connections
+            
+        Returns:
+            True if the node is reachable
+        """
+        if not deep and not self._use_http and self.ipc_path:
+            return await self._ipc_socket_alive()
+        
         response = await self.call_method("net_version")
         return response.success
     
+    async def _ipc_socket_alive(self) -> bool:
+        """Check that the IPC socket exists and accepts connections."""
+        if not Path(self.ipc_path).exists():
+            return False
+        
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        try:
+            await asyncio.wait_for(
+                asyncio.get_running_loop().sock_connect(sock, self.ipc_path),
+                timeout=1
+            )
+            return True
+        except (OSError, asyncio.TimeoutError):
+            return False
+        finally:
+            sock.close()
+    
+    async def _timed_call(self, method: str) -> Tuple[IPCResponse, float]:
+        """Call a method and measure its response time."""
+        start_ns = time.monotonic_ns()
+        response = await self.call_method(method)
+        return response, (time.monotonic_ns() - start_ns) / 1e9
+    
     async def health_check(self) -> Dict[str, Any]:
         """
         Perform comprehensive health check.
@@ -334,48 +753,74 @@ class IPCClient:
             "errors": []
         }
         
-        # Test basic connectivity
-        import time
-        start_time = time.time()
-        version_response = await self.get_client_version()
-        health["response_times"]["client_version"] = time.time() - start_time
+        probes = [
+            ("client_version", "web3_clientVersion"),
+            ("block_number", "eth_blockNumber"),
+            ("peer_count", "net_peerCount"),
+            ("sync_status", "eth_syncing")
+        ]
+        
+        # The client version only changes on restart - skip it while cached
+        cached_version = self._get_cached("web3_clientVersion", CLIENT_VERSION_TTL)
+        if cached_version is not None:
+            probes = probes[1:]
+        
+        if self._batch_supported:
+            # Query all probes in a single batched round-trip
+            start_ns = time.monotonic_ns()
+            responses = await self.call_batch([(method, []) for _, method in probes])
+            elapsed = (time.monotonic_ns() - start_ns) / 1e9
+            for probe, _ in probes:
+                health["response_times"][probe] = elapsed
+        else:
+            # Node does not accept batches - run the probes concurrently instead
+            results = await asyncio.gather(
+                *(self._timed_call(method) for _, method in probes),
+                return_exceptions=True
+            )
+            responses = []
+            for (probe, method), result in zip(probes, results):
+                if isinstance(result, Exception):
+                    responses.append(IPCResponse(success=False, error=str(result), method=method))
+                else:
+                    response, elapsed = result
+                    health["response_times"][probe] = elapsed
+                    responses.append(response)
+        
+        if cached_version is not None:
+            responses.insert(0, cached_version)
+        else:
+            self._store_cached("web3_clientVersion", responses[0])
+        
+        version_response, block_response, peer_response, sync_response = responses
         
         if not version_response.success:
             health["errors"].append(f"Client version check failed: {version_response.error}")
             return health
         
+        # A cached version says nothing about the node now - the live block
+        # probe decides whether it is still reachable
+        if cached_version is not None and not block_response.success:
+            health["errors"].append(f"Block number check failed: {block_response.error}")
+            return health
+        
         health["connected"] = True
         health["client_version"] = version_response.data
         
-        # Get block number
-        start_time = time.time()
-        block_response = await self.get_block_number()
-        health["response_times"]["block_number"] = time.time() - start_time
-        
         if block_response.success:
             # Convert hex to int
-            health["block_number"] = int(block_response.data, 16)
+            health["block_number"] = _hex_to_int(block_response.data, None)
         else:
             health["errors"].append(f"Block number check failed: {block_response.error}")
         
-        # Get peer count
-        start_time = time.time()
-        peer_response = await self.get_peer_count()
-        health["response_times"]["peer_count"] = time.time() - start_time
-        
         if peer_response.success:
-            health["peer_count"] = int(peer_response.data, 16)
+            health["peer_count"] = _hex_to_int(peer_response.data, None)
         else:
             health["errors"].append(f"Peer count check failed: {peer_response.error}")
         
-        # Get sync status
-        start_time = time.time()
-        sync_response = await self.get_syncing_status()
-        health["response_times"]["sync_status"] = time.time() - start_time
-        
         if sync_response.success:
             health["sync_status"] = sync_response.data
         else:
             health["errors"].append(f"Sync status check failed: {sync_response.error}")
         
-        return health
\ No newline at end of file
+        return health
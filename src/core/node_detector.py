@@ -4,15 +4,20 @@ Node detection and information gathering.
 
 import asyncio
 import logging
+import re
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 from core.ipc_client import IPCClient
 from utils.config import get_network_config, detect_network_from_ipc
 
+# Client name and version from web3_clientVersion, e.g. "Geth/v1.13.4-stable/...";
+# the version part is optional so a bare client name is still recognised
+_CLIENT_VERSION_RE = re.compile(r'(geth|reth|erigon|besu)(?:/v?([^/]+))?', re.IGNORECASE)
 
-@dataclass
+
+@dataclass(slots=True)
 class NodeInfo:
     """Node information container."""
     client_type: str  # geth, reth
@@ -64,17 +69,13 @@ class NodeDetector:
         
         http_rpc_url = self.config.get('node', {}).get('rpc_url', 'http://localhost:8545')
         
-        for ipc_path in common_paths:
-            if Path(ipc_path).exists():
-                self.logger.info(f"Found IPC socket at: {ipc_path}")
-                
-                try:
-                    node_info = await self._probe_node(ipc_path, http_rpc_url)
-                    self.logger.info(f"Successfully detected node: {node_info.client_type} v{node_info.version}")
-                    return node_info
-                except Exception as e:
-                    self.logger.debug(f"Failed to probe {ipc_path}: {e}")
-                    continue
+        candidates = [str(Path(ipc_path).expanduser()) for ipc_path in common_paths]
+        
+        # Probe all sockets concurrently and take the first one that answers
+        node_info = await self._probe_first(candidates, http_rpc_url)
+        if node_info is not None:
+            self.logger.info(f"Successfully detected node: {node_info.client_type} v{node_info.version}")
+            return node_info
         
         # If no IPC socket found, try HTTP RPC
         self.logger.info(f"No IPC socket found, trying HTTP RPC: {http_rpc_url}")
@@ -105,6 +106,56 @@ class NodeDetector:
         
         raise RuntimeError("No accessible node found. Please check IPC socket availability.")
     
+    async def _probe_first(self, ipc_paths: List[str], http_rpc_url: str) -> Optional[NodeInfo]:
+        """
+        Probe several IPC paths concurrently.
+        
+        All probes run at once, but results are taken in the order of
+        `ipc_paths`, so the same set of reachable nodes always yields the
+        same node.
+        
+        Args:
+            ipc_paths: Candidate IPC socket paths, highest priority first
+            http_rpc_url: HTTP RPC URL fallback
+            
+        Returns:
+            NodeInfo from the highest priority successful probe, or None if all fail
+        """
+        tasks = [
+            asyncio.create_task(self._probe_ipc_path(ipc_path, http_rpc_url))
+            for ipc_path in ipc_paths
+        ]
+        
+        try:
+            for ipc_path, task in zip(ipc_paths, tasks):
+                try:
+                    return await task
+                except Exception as e:
+                    self.logger.debug(f"Failed to probe {ipc_path}: {e}")
+            return None
+        finally:
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+    
+    async def _probe_ipc_path(self, ipc_path: str, http_rpc_url: str) -> NodeInfo:
+        """
+        Probe a candidate IPC path, failing fast if nothing listens on it.
+        
+        Connecting directly replaces a separate exists() check: a missing
+        path raises FileNotFoundError and a stale socket file left behind by
+        a stopped node raises ConnectionRefusedError, instead of the probe
+        quietly falling back to HTTP.
+        """
+        _, writer = await asyncio.wait_for(asyncio.open_unix_connection(ipc_path), timeout=2)
+        writer.close()
+        await writer.wait_closed()
+        
+        self.logger.info(f"Found IPC socket at: {ipc_path}")
+        return await self._probe_node(ipc_path, http_rpc_url)
+    
     async def _manual_node_config(self) -> NodeInfo:
         """Use manual node configuration."""
         ipc_path = self.node_config.get('ipc_path')
@@ -133,37 +184,41 @@ class NodeDetector:
         """
         ipc_client = IPCClient(ipc_path=ipc_path, http_rpc_url=http_rpc_url)
         
-        # Get client version
-        version_response = await ipc_client.get_client_version()
-        if not version_response.success:
-            raise RuntimeError(f"Failed to get client version: {version_response.error}")
-        
-        client_version = version_response.data
-        
-        # Parse client type and version
-        client_type, version = self._parse_client_version(client_version)
-        
-        # Get chain ID to determine network
-        chain_id_response = await ipc_client.call_method("eth_chainId")
-        if not chain_id_response.success:
-            raise RuntimeError(f"Failed to get chain ID: {chain_id_response.error}")
-        
-        chain_id = int(chain_id_response.data, 16)
-        
-        # Determine network from chain ID
-        network = self._determine_network(chain_id, ipc_path)
-        
-        # Get network configuration
-        network_config = get_network_config(self.config, network)
-        
-        return NodeInfo(
-            client_type=client_type,
-            version=version,
-            network=network,
-            chain_id=chain_id,
-            ipc_path=ipc_path,
-            rpc_fallback=network_config['rpc_fallback']
-        )
+        try:
+            # Get client version
+            version_response = await ipc_client.get_client_version()
+            if not version_response.success:
+                raise RuntimeError(f"Failed to get client version: {version_response.error}")
+            
+            client_version = version_response.data
+            
+            # Parse client type and version
+            client_type, version = self._parse_client_version(client_version)
+            
+            # Get chain ID to determine network
+            chain_id_response = await ipc_client.call_method("eth_chainId")
+            if not chain_id_response.success:
+                raise RuntimeError(f"Failed to get chain ID: {chain_id_response.error}")
+            
+            chain_id = int(chain_id_response.data, 16)
+            
+            # Determine network from chain ID
+            network = self._determine_network(chain_id, ipc_path)
+            
+            # Get network configuration
+            network_config = get_network_config(self.config, network)
+            
+            return NodeInfo(
+                client_type=client_type,
+                version=version,
+                network=network,
+                chain_id=chain_id,
+                ipc_path=ipc_path,
+                rpc_fallback=network_config['rpc_fallback']
+            )
+        finally:
+            # Probes may be cancelled once another path answers
+            await ipc_client.close()
     
     def _parse_client_version(self, version_string: str) -> tuple[str, str]:
         """
@@ -175,41 +230,13 @@ class NodeDetector:
         Returns:
             Tuple of (client_type, version)
         """
-        version_lower = version_string.lower()
-        
-        if 'geth' in version_lower:
-            # Format: Geth/v1.13.4-stable/linux-amd64/go1.21.3
-            if '/' in version_string:
-                parts = version_string.split('/')
-                if len(parts) >= 2:
-                    version = parts[1].replace('v', '')
-                else:
-                    version = "unknown"
-            else:
-                version = "unknown"
-            return "geth", version
-        
-        elif 'reth' in version_lower:
-            # Format: reth/v0.1.0-alpha.10/x86_64-unknown-linux-gnu
-            if '/' in version_string:
-                parts = version_string.split('/')
-                if len(parts) >= 2:
-                    version = parts[1].replace('v', '')
-                else:
-                    version = "unknown"
-            else:
-                version = "unknown"
-            return "reth", version
-        
-        elif 'erigon' in version_lower:
-            return "erigon", "unknown"
-        
-        elif 'besu' in version_lower:
-            return "besu", "unknown"
-        
-        else:
-            # Try to extract version from unknown client
+        # Formats: Geth/v1.13.4-stable/linux-amd64/go1.21.3,
+        #          reth/v0.1.0-alpha.10/x86_64-unknown-linux-gnu
+        match = _CLIENT_VERSION_RE.search(version_string)
+        if match is None:
             return "unknown", "unknown"
+        
+        return match.group(1).lower(), match.group(2) or "unknown"
     
     def _determine_network(self, chain_id: int, ipc_path: str) -> str:
         """
@@ -5,9 +5,12 @@ Prometheus metrics client for collecting node metrics.
 import aiohttp
 import asyncio
 import logging
+import math
+import re
 import time
-from typing import Dict, Any, List, Optional
-from dataclasses import dataclass
+from array import array
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from dataclasses import dataclass, field
 from urllib.parse import urljoin
 
 try:
@@ -18,7 +21,24 @@ except ImportError:
         return {}
 
 
-@dataclass
+# Exposition format line: name{labels} value [timestamp]
+# (quoted label values may contain braces, commas and escaped quotes)
+_METRIC_LINE_RE = re.compile(rb'^([^{\s]+)(?:\{((?:[^}"]|"(?:[^"\\]|\\.)*")*)\})?\s+(\S+)')
+_LABEL_RE = re.compile(r'([^=,\s]+)\s*=\s*"((?:[^"\\]|\\.)*)"')
+
+# Metrics collected even when not explicitly configured
+COMMON_METRIC_PATTERNS = [
+    'p2p_peers',
+    'chain_head',
+    'chain_block',
+    'system_memory',
+    'system_cpu',
+    'db_chaindata'
+]
+_COMMON_METRIC_RE = re.compile('|'.join(map(re.escape, COMMON_METRIC_PATTERNS)))
+
+
+@dataclass(slots=True)
 class MetricSample:
     """Single metric sample."""
     name: str
@@ -31,29 +51,131 @@ class MetricSample:
             self.labels = {}
 
 
-@dataclass
+@dataclass(slots=True)
 class MetricSnapshot:
-    """Snapshot of multiple metrics at a point in time."""
+    """
+    Snapshot of multiple metrics at a point in time.
+    
+    Samples are stored column-wise (names, values, labels) rather than as
+    one object per sample; ``samples`` builds MetricSample views on demand.
+    """
     timestamp: float
-    samples: List[MetricSample]
+    names: List[str] = field(default_factory=list)
+    values: array = field(default_factory=lambda: array('d'))
+    labels: List[Dict[str, str]] = field(default_factory=list)
+    name_index: Dict[str, int] = field(default_factory=dict, init=False, repr=False)
+    
+    def __post_init__(self):
+        if not isinstance(self.values, array):
+            self.values = array('d', self.values)
+        # Samples without labels get an empty label set
+        self.labels.extend({} for _ in range(len(self.names) - len(self.labels)))
+        for i, name in enumerate(self.names):
+            self.name_index.setdefault(name, i)
+    
+    @classmethod
+    def from_samples(cls, timestamp: float, samples: Iterable[MetricSample]) -> 'MetricSnapshot':
+        """Build a snapshot from MetricSample objects."""
+        snapshot = cls(timestamp=timestamp)
+        for sample in samples:
+            snapshot.add(sample.name, sample.value, sample.labels)
+        return snapshot
+    
+    def add(self, name: str, value: float, labels: Dict[str, str]):
+        """Append a sample."""
+        self.name_index.setdefault(name, len(self.names))
+        self.names.append(name)
+        self.values.append(value)
+        self.labels.append(labels)
+    
+    def __len__(self) -> int:
+        return len(self.names)
+    
+    @property
+    def samples(self) -> List[MetricSample]:
+        """Samples as MetricSample objects."""
+        return [
+            MetricSample(name, value, self.timestamp, labels)
+            for name, value, labels in zip(self.names, self.values, self.labels)
+        ]
+    
+    def sample_at(self, i: int) -> MetricSample:
+        """Sample at a row of the columns."""
+        return MetricSample(self.names[i], self.values[i], self.timestamp, self.labels[i])
     
     def get_metric(self, name: str) -> Optional[MetricSample]:
         """Get metric by name."""
-        for sample in self.samples:
-            if sample.name == name:
-                return sample
-        return None
+        i = self.name_index.get(name)
+        if i is None:
+            return None
+        return self.sample_at(i)
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for logging."""
         return {
             'timestamp': self.timestamp,
             'metrics': {
-                sample.name: {
-                    'value': sample.value,
-                    'labels': sample.labels
+                name: {
+                    'value': value,
+                    'labels': labels
                 }
-                for sample in self.samples
+                for name, value, labels in zip(self.names, self.values, self.labels)
+            }
+        }
+
+
+@dataclass(slots=True)
+class MetricsBatch:
+    """
+    A run of snapshots stored as one column per metric.
+    
+    Values missing from a snapshot are NaN in that metric's column; each
+    metric keeps the labels it was last seen with.
+    """
+    timestamps: array = field(default_factory=lambda: array('d'))
+    columns: Dict[str, array] = field(default_factory=dict)
+    labels: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    
+    @classmethod
+    def from_snapshots(cls, snapshots: Iterable[MetricSnapshot]) -> 'MetricsBatch':
+        """Build a batch from snapshots, oldest first."""
+        batch = cls()
+        for snapshot in snapshots:
+            batch.add(snapshot)
+        return batch
+    
+    def add(self, snapshot: MetricSnapshot):
+        """Append a snapshot as one row."""
+        row = len(self.timestamps)
+        self.timestamps.append(snapshot.timestamp)
+        for name, value, labels in zip(snapshot.names, snapshot.values, snapshot.labels):
+            column = self.columns.get(name)
+            if column is None:
+                column = self.columns[name] = array('d', [math.nan]) * row
+            elif len(column) > row:
+                # Repeated name within one snapshot - keep the first value
+                continue
+            column.append(value)
+            self.labels[name] = labels
+        
+        # Pad metrics absent from this snapshot
+        for column in self.columns.values():
+            if len(column) == row:
+                column.append(math.nan)
+    
+    def __len__(self) -> int:
+        return len(self.timestamps)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for logging (missing values become None)."""
+        return {
+            'timestamps': self.timestamps.tolist(),
+            'metrics': {
+                name: {
+                    'values': [None if math.isnan(value) else value for value in column],
+                    'labels': self.labels[name]
+                }
+                for name, column in self.columns.items()
             }
         }
 
@@ -71,6 +193,7 @@ class PrometheusClient:
         self.config = config
         self.prometheus_config = config['prometheus']
         self.base_url = config['node']['prometheus_url']
+        self._metrics_url = urljoin(self.base_url, '/metrics')
         self.timeout = self.prometheus_config['timeout']
         self.logger = logging.getLogger('prometheus_client')
         
@@ -83,14 +206,27 @@ class PrometheusClient:
         
         # Build list of metrics to collect
         self.target_metrics = self._build_target_metrics()
+        self._target_metrics_set = frozenset(self.target_metrics)
         
         self.session = None
+        self._connector = None
         
     async def start(self):
         """Start the Prometheus client."""
-        self.session = aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=self.timeout)
-        )
+        if self.session is None or self.session.closed:
+            # One kept-alive connection to the endpoint, with its DNS lookup cached
+            self._connector = aiohttp.TCPConnector(
+                limit_per_host=1,
+                ttl_dns_cache=300,
+                keepalive_timeout=60,
+                enable_cleanup_closed=True
+            )
+            # gzip shrinks the (large) metrics text on the wire
+            self.session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"Accept-Encoding": "gzip"},
+                connector=self._connector
+            )
         
         # Test connection
         if await self.test_connection():
@@ -102,12 +238,15 @@ class PrometheusClient:
         """Stop the Prometheus client."""
         if self.session:
             await self.session.close()
+            self.session = None
+        if self._connector:
+            await self._connector.close()
+            self._connector = None
     
     async def test_connection(self) -> bool:
         """Test connection to Prometheus endpoint."""
         try:
-            url = urljoin(self.base_url, '/metrics')
-            async with self.session.get(url) as response:
+            async with self.session.get(self._metrics_url) as response:
                 return response.status == 200
         except Exception as e:
             self.logger.error(f"Prometheus connection test failed: {e}")
@@ -121,18 +260,21 @@ class PrometheusClient:
             MetricSnapshot with current values, or None if failed
         """
         try:
-            url = urljoin(self.base_url, '/metrics')
             timestamp = time.time()
             
-            async with self.session.get(url) as response:
+            async with self.session.get(self._metrics_url) as response:
                 if response.status != 200:
                     self.logger.error(f"Prometheus returned status {response.status}")
                     return None
                 
-                text = await response.text()
-                samples = self._parse_metrics(text, timestamp)
+                # Parse line by line as the body streams in
+                snapshot = MetricSnapshot(timestamp=timestamp)
+                async for line in response.content:
+                    parsed = self._parse_metric_line(line)
+                    if parsed is not None:
+                        snapshot.add(*parsed)
                 
-                return MetricSnapshot(timestamp=timestamp, samples=samples)
+                return snapshot
                 
         except Exception as e:
             self.logger.error(f"Failed to collect metrics: {e}")
@@ -153,15 +295,13 @@ class PrometheusClient:
             return None
         
         # Filter to requested metrics
-        filtered_samples = [
-            sample for sample in snapshot.samples
-            if sample.name in metric_names
-        ]
+        wanted = set(metric_names)
+        filtered = MetricSnapshot(timestamp=snapshot.timestamp)
+        for name, value, labels in zip(snapshot.names, snapshot.values, snapshot.labels):
+            if name in wanted:
+                filtered.add(name, value, labels)
         
-        return MetricSnapshot(
-            timestamp=snapshot.timestamp,
-            samples=filtered_samples
-        )
+        return filtered
     
     async def get_metric_value(self, metric_name: str) -> Optional[float]:
         """
@@ -181,17 +321,27 @@ class PrometheusClient:
         return None
     
     def _build_target_metrics(self) -> List[str]:
-        """Build list of metrics to collect based on configuration."""
+        """
+        Build list of metrics to collect based on configuration.
+        
+        Also indexes every configured metric by name for get_metric_config().
+        """
         target_metrics = []
+        self._metric_config_by_name = {}
         
         # Add all configured metrics
         for category_name, metrics in self.metrics_config.items():
-            if category_name in ['critical_metrics', 'chain_metrics', 'performance_metrics',
-                               'peer_metrics', 'resource_metrics', 'storage_metrics']:
-                if isinstance(metrics, list):
-                    for metric in metrics:
-                        if isinstance(metric, dict) and 'name' in metric:
-                            target_metrics.append(metric['name'])
+            if not isinstance(metrics, list):
+                continue
+            
+            is_target_category = category_name in ['critical_metrics', 'chain_metrics', 'performance_metrics',
+                                                   'peer_metrics', 'resource_metrics', 'storage_metrics']
+            for metric in metrics:
+                if isinstance(metric, dict) and 'name' in metric:
+                    # First definition wins, as with the previous linear scan
+                    self._metric_config_by_name.setdefault(metric['name'], metric)
+                    if is_target_category:
+                        target_metrics.append(metric['name'])
         
         return target_metrics
     
@@ -208,67 +358,55 @@ class PrometheusClient:
         """
         samples = []
         
-        for line in metrics_text.split('\n'):
-            line = line.strip()
-            
-            # Skip comments and empty lines
-            if not line or line.startswith('#'):
-                continue
-            
-            try:
-                # Parse metric line
-                if '{' in line:
-                    # Metric with labels: metric_name{label1="value1",label2="value2"} value
-                    metric_part, value_str = line.rsplit(' ', 1)
-                    metric_name, labels_str = metric_part.split('{', 1)
-                    labels_str = labels_str.rstrip('}')
-                    
-                    # Parse labels
-                    labels = {}
-                    if labels_str:
-                        for label_pair in labels_str.split(','):
-                            if '=' in label_pair:
-                                key, value = label_pair.split('=', 1)
-                                key = key.strip()
-                                value = value.strip().strip('"')
-                                labels[key] = value
-                else:
-                    # Simple metric: metric_name value
-                    metric_name, value_str = line.rsplit(' ', 1)
-                    labels = {}
-                
-                # Only collect target metrics or if no targets specified, collect common ones
-                if not self.target_metrics or metric_name in self.target_metrics or self._is_common_metric(metric_name):
-                    try:
-                        value = float(value_str)
-                        samples.append(MetricSample(
-                            name=metric_name,
-                            value=value,
-                            timestamp=timestamp,
-                            labels=labels
-                        ))
-                    except ValueError:
-                        # Skip invalid numeric values
-                        continue
-                    
-            except (ValueError, IndexError):
-                # Skip invalid lines
-                continue
+        for line in metrics_text.encode('utf-8').splitlines():
+            parsed = self._parse_metric_line(line)
+            if parsed is not None:
+                name, value, labels = parsed
+                samples.append(MetricSample(name, value, timestamp, labels))
         
         return samples
     
+    def _parse_metric_line(self, line: bytes) -> Optional[Tuple[str, float, Dict[str, str]]]:
+        """
+        Parse a single line of Prometheus metrics text.
+        
+        Args:
+            line: Raw line as bytes
+            
+        Returns:
+            (name, value, labels), or None for comments, invalid lines and metrics that are not collected
+        """
+        line = line.strip()
+        
+        # Skip comments and empty lines
+        if not line or line.startswith(b'#'):
+            return None
+        
+        match = _METRIC_LINE_RE.match(line)
+        if match is None:
+            return None
+        
+        raw_name, raw_labels, raw_value = match.groups()
+        metric_name = raw_name.decode('utf-8', 'replace')
+        
+        # Only collect target metrics or if no targets specified, collect common ones
+        if self._target_metrics_set and metric_name not in self._target_metrics_set and not self._is_common_metric(metric_name):
+            return None
+        
+        try:
+            value = float(raw_value)
+        except ValueError:
+            # Skip invalid numeric values
+            return None
+        
+        # Labels are only decoded for metrics we keep
+        labels = dict(_LABEL_RE.findall(raw_labels.decode('utf-8', 'replace'))) if raw_labels else {}
+        
+        return metric_name, value, labels
+    
     def _is_common_metric(self, metric_name: str) -> bool:
         """Check if metric is a commonly useful metric to collect."""
-        common_patterns = [
-            'p2p_peers',
-            'chain_head',
-            'chain_block',
-            'system_memory',
-            'system_cpu',
-            'db_chaindata'
-        ]
-        
-        return any(pattern in metric_name for pattern in common_patterns)
+        return _COMMON_METRIC_RE.search(metric_name) is not None
     
     def get_metric_config(self, metric_name: str) -> Optional[Dict[str, Any]]:
         """
@@ -280,9 +418,4 @@ class PrometheusClient:
         Returns:
             Metric configuration or None if not found
         """
-        for category_name, metrics in self.metrics_config.items():
-            if isinstance(metrics, list):
-                for metric in metrics:
-                    if isinstance(metric, dict) and metric.get('name') == metric_name:
-                        return metric
-        return None
\ No newline at end of file
+        return self._metric_config_by_name.get(metric_name)
\ No newline at end of file
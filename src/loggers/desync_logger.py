@@ -2,15 +2,35 @@
 AI-optimized desync logging system.
 """
 
+import asyncio
+import io
+import os
 import json
 import logging
+import math
+import re
 import time
-from typing import Dict, Any, List, Optional
+from functools import lru_cache
+from collections import OrderedDict
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from pathlib import Path
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
 try:
     from storage.models import DesyncEvent, MetricAnomaly, NodeInfo
     from storage.database import MetricsDatabase
+    from core.prometheus_client import MetricsBatch
 except ImportError:
     # Fallback for development
     class DesyncEvent:
@@ -24,35 +44,296 @@ except ImportError:
     
     class MetricsDatabase:
         def __init__(self, config): pass
+        async def initialize(self): pass
         async def close(self): pass
+    
+    class MetricsBatch:
+        @classmethod
+        def from_snapshots(cls, snapshots): return cls()
+        def add(self, snapshot): pass
+        def to_dict(self): return {}
+
+
+if HAS_ORJSON:
+    def _dumps_line(entry: Dict[str, Any]) -> bytes:
+        return orjson.dumps(entry, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+    
+    _loads = orjson.loads
+else:
+    def _dumps_line(entry: Dict[str, Any]) -> bytes:
+        return (json.dumps(entry) + '\n').encode('utf-8')
+    
+    _loads = json.loads
+
+
+# Per-file write buffer; entries reach disk on flush or when it fills up
+LOG_BUFFER_SIZE = 64 * 1024
+
+# Most queued entries written in one batch by the writer task
+MAX_WRITE_BATCH = 256
+
+# Batches larger than the write buffer go straight to the file with one
+# writev() per IOV_MAX entries instead of being joined and buffered
+HAS_WRITEV = hasattr(os, 'writev')
+try:
+    _IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    _IOV_MAX = 16
+
+# First "event_id" in an analysis entry line, i.e. analysis_metadata's (the
+# metadata is always the first key); lets index scans skip full JSON decodes
+_ANALYSIS_EVENT_ID_RE = re.compile(rb'"event_id":\s*"([^"\\]*)"')
+
+# zstd level for compressed analysis logs; each entry is its own frame so the
+# offset index keeps working and the file still decompresses with plain zstd
+ANALYSIS_COMPRESSION_LEVEL = 3
+
+# How often the cached local UTC offset is refreshed (picks up DST changes)
+UTC_OFFSET_REFRESH_SECONDS = 900
+
+# Largest possible zstd frame header
+_ZSTD_MAX_FRAME_HEADER = 18
+
+# Rebuilt analysis entries kept in memory in lazy analysis mode
+ANALYSIS_CACHE_SIZE = 32
+
+# Context metrics are cached per bucket of event timestamps, so a cascade of
+# desyncs within a few seconds shares one database read
+CONTEXT_BUCKET_SECONDS = 10
+CONTEXT_CACHE_SIZE = 128
+
+# Snapshots preceding the event included in its metrics context
+CONTEXT_PRE_EVENT_SAMPLES = 5
+
+# Outlier scan over the context window: minimum history per metric and the
+# most anomalies reported per analysis entry
+ANOMALY_MIN_SAMPLES = 10
+MAX_CONTEXT_ANOMALIES = 10
+
+# Desync severities from least to most severe
+SEVERITY_RANKS = {'low': 0, 'medium': 1, 'high': 2, 'critical': 3}
+
+# Desync entry sections that only feed AI analysis
+AI_ONLY_SECTIONS = frozenset({'system_health', 'correlation_hints'})
+
+# Placeholder context sections, shared by every entry; never mutated
+UNKNOWN_PEER_CONTEXT = {
+    'peer_connection_stability': 'unknown',
+    'peer_geographic_distribution': 'unknown',
+    'peer_version_distribution': 'unknown',
+    'connection_quality_metrics': {}
+}
+
+UNKNOWN_NETWORK_CONDITIONS = {
+    'network_congestion_level': 'unknown',
+    'validator_performance': 'unknown',
+    'consensus_health': 'unknown'
+}
+
+UNKNOWN_USAGE_PATTERN = {'pattern': 'unknown', 'trend': 'stable'}
+
+# Static analysis suggestions, shared by every entry instead of rebuilt per event
+CORRELATION_HINTS = (
+    "Check correlation with peer count fluctuations",
+    "Analyze memory usage spikes before event",
+    "Examine network latency patterns",
+    "Review disk I/O bottlenecks"
+)
+
+IMMEDIATE_CHECKS = (
+    "Verify peer connectivity and count",
+    "Check system resource utilization",
+    "Review recent block processing times",
+    "Examine network latency to consensus nodes"
+)
+
+SEVERE_IMMEDIATE_CHECKS = IMMEDIATE_CHECKS + (
+    "Consider restarting the node if recovery is slow",
+    "Check for any infrastructure alerts or issues"
+)
+
+INVESTIGATION_PATHS = (
+    "Analyze historical desync patterns for trends",
+    "Compare with other nodes on the same network",
+    "Review infrastructure monitoring for correlations",
+    "Examine consensus node performance metrics"
+)
+
+MONITORING_IMPROVEMENTS = (
+    "Add earlier warning thresholds for block lag",
+    "Implement peer quality monitoring",
+    "Add network latency tracking to consensus nodes",
+    "Monitor system resource trends more granularly"
+)
+
+PREVENTION_STRATEGIES = (
+    "Optimize peer connection management",
+    "Implement proactive resource scaling",
+    "Add redundant consensus node connections",
+    "Schedule maintenance during low-activity periods"
+)
+
+
+# Skeleton of the prompt built by generate_ai_analysis_prompt
+AI_PROMPT_TEMPLATE = """
+BLOCKCHAIN NODE DESYNC ANALYSIS REQUEST
+
+{investigation_focus}
+
+KEY QUESTIONS TO ADDRESS:
+{questions}
+
+DATA SUMMARY:
+{data_summary}
+
+PATTERN RECOGNITION HINTS:
+{hints}
+
+EVENT TIMELINE:
+{timeline}
+
+SUGGESTED INVESTIGATION PATHS:
+{investigation_paths}
+
+IMMEDIATE RECOMMENDED CHECKS:
+{immediate_checks}
+
+Please provide a comprehensive analysis of this desync event, including:
+1. Root cause analysis
+2. Contributing factors identification
+3. Impact assessment
+4. Prevention recommendations
+5. Monitoring improvements
+
+Full technical context is available in the attached data structure.
+"""
+
+
+def _bullets(items) -> str:
+    """Render items as a '- ' bulleted block."""
+    return '\n'.join(f"- {item}" for item in items)
+
+
+def _zstd_frame_spans(data: bytes) -> Iterator[Tuple[int, int]]:
+    """Yield (offset, length) of each frame in concatenated zstd frames."""
+    view = memoryview(data)
+    pos = 0
+    while pos < len(data):
+        start = pos
+        header = view[pos:pos + _ZSTD_MAX_FRAME_HEADER]
+        has_checksum = zstandard.get_frame_parameters(header).has_checksum
+        pos += zstandard.frame_header_size(header)
+        
+        # Walk the block headers: bit 0 marks the last block, bits 1-2 the
+        # type (RLE blocks store a single byte), bits 3-23 the size
+        last_block = False
+        while not last_block and pos + 3 <= len(data):
+            block_header = int.from_bytes(view[pos:pos + 3], 'little')
+            pos += 3 + (1 if (block_header >> 1) & 3 == 1 else block_header >> 3)
+            last_block = bool(block_header & 1)
+        if has_checksum:
+            pos += 4
+        
+        if not last_block or pos > len(data):
+            # Truncated trailing frame
+            return
+        yield start, pos - start
+
+
+def _duration_bucket(duration: Optional[float]) -> Optional[str]:
+    """Classify a desync duration for the analysis prose."""
+    if not duration:
+        return None
+    if duration > 300:  # 5 minutes
+        return 'long'
+    if duration > 60:  # 1 minute
+        return 'moderate'
+    return 'brief'
 
 
 class DesyncLogger:
     """AI-optimized logging for desync events and analysis."""
     
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], database: Optional[MetricsDatabase] = None):
         """
         Initialize desync logger.
         
         Args:
             config: Configuration dictionary
+            database: Shared database, initialized and closed by the caller
         """
         self.config = config
         self.logger = logging.getLogger('desync_logger')
-        self.database = MetricsDatabase(config)
+        self._owns_database = database is None
+        self.database = MetricsDatabase(config) if database is None else database
         
         # Log file paths
         self.logs_dir = Path(config['logging']['logs_directory'])
         self.desync_log_path = self.logs_dir / 'desyncs' / 'desync_events.jsonl'
         self.analysis_log_path = self.logs_dir / 'analysis' / 'ai_analysis.jsonl'
+        self.anomaly_log_path = self.logs_dir / 'analysis' / 'anomalies.jsonl'
         
         # Configuration
         self.context_window_minutes = config['logging'].get('context_window_minutes', 10)
         self.ai_optimization = config['logging'].get('ai_optimization_enabled', True)
+        self.flush_interval = config['logging'].get('flush_interval_seconds', 5)
+        self.anomaly_threshold_std = config.get('monitoring', {}).get('anomaly_threshold_standard_deviations', 2.5)
+        
+        # Optionally write analysis entries as zstd frames
+        self._analysis_compressor = None
+        if config['logging'].get('compress_analysis', False):
+            if HAS_ZSTD:
+                self._analysis_compressor = zstandard.ZstdCompressor(level=ANALYSIS_COMPRESSION_LEVEL)
+                self.analysis_log_path = self.analysis_log_path.with_suffix('.jsonl.zst')
+            else:
+                self.logger.warning("compress_analysis is enabled but zstandard is not installed, "
+                                    "writing uncompressed analysis logs")
+        
+        # eager: write full analysis entries; lazy: write a pointer into the
+        # desync log and build the analysis when a prompt is requested
+        self.analysis_mode = config['logging'].get('analysis_mode', 'eager')
+        self._analysis_cache: OrderedDict[Tuple[str, int], Dict[str, Any]] = OrderedDict()
+        
+        # timestamp bucket -> (cached at, serialized context metrics)
+        self._context_cache: OrderedDict[int, Tuple[float, Dict[str, Dict[str, Any]]]] = OrderedDict()
+        
+        # Events below the minimum severity are not logged at all
+        desync_logging = config['logging'].get('desync_logging', {})
+        self.desync_logging_enabled = desync_logging.get('enabled', True)
+        self.min_severity_rank = SEVERITY_RANKS.get(desync_logging.get('min_severity', 'low'), 0)
+        
+        # Optional desync entry sections; AI-only ones are skipped without AI optimization
+        self._enabled_sections = AI_ONLY_SECTIONS if self.ai_optimization else frozenset()
+        
+        # Local UTC offset for hour-of-day hints: (refreshed at, offset seconds)
+        self._utc_offset: Tuple[float, int] = (time.monotonic(), time.localtime().tm_gmtoff)
+        
+        # Invariant part of every desync entry's metadata
+        self._log_metadata_template = {
+            'log_type': 'desync_event',
+            'log_version': '1.0',
+            'ai_optimized': self.ai_optimization
+        }
         
         # Ensure log directories exist
         self.desync_log_path.parent.mkdir(parents=True, exist_ok=True)
         self.analysis_log_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Log files stay open between entries and are flushed periodically
+        self._writers: Dict[Path, io.BufferedWriter] = {}
+        
+        # Size each log file will have once queued entries are written
+        self._log_offsets: Dict[Path, int] = {}
+        
+        # event_id -> (offset, length) of its latest entry in the analysis log;
+        # existing entries are indexed by one scan on first lookup
+        self._analysis_index: Dict[str, Tuple[int, int]] = {}
+        self._analysis_index_loaded = False
+        
+        # Entries are serialized by the caller and queued; a single writer
+        # task does the file I/O in a worker thread, off the event loop
+        self._queue: asyncio.Queue[Tuple[Path, bytes]] = asyncio.Queue()
+        self._writer_task: Optional[asyncio.Task] = None
     
     async def log_desync_event(self, desync_event: DesyncEvent, node_info: Optional[NodeInfo] = None):
         """
@@ -62,17 +343,28 @@ class DesyncLogger:
             desync_event: The desync event to log
             node_info: Optional node information
         """
+        if not self._should_log(desync_event.severity):
+            return
+        
         try:
             # Create comprehensive log entry
             log_entry = await self._create_desync_log_entry(desync_event, node_info)
             
             # Write to desync log
-            await self._write_log_entry(self.desync_log_path, log_entry)
+            offset = self._write_log_entry(self.desync_log_path, log_entry)
             
             # If AI optimization is enabled, create analysis entry
             if self.ai_optimization:
-                analysis_entry = await self._create_analysis_entry(desync_event, log_entry)
-                await self._write_log_entry(self.analysis_log_path, analysis_entry)
+                if self.analysis_mode == 'lazy' and offset is not None:
+                    analysis_entry = self._create_analysis_pointer(desync_event, offset)
+                else:
+                    analysis_entry = await self._create_analysis_entry(desync_event, log_entry, offset)
+                analysis_offset = self._write_log_entry(self.analysis_log_path, analysis_entry)
+                if analysis_offset is not None:
+                    self._analysis_index[desync_event.event_id] = (
+                        analysis_offset,
+                        self._log_offsets[self.analysis_log_path] - analysis_offset
+                    )
             
             self.logger.info(f"Logged desync event: {desync_event.event_id}")
             
@@ -81,22 +373,16 @@ class DesyncLogger:
     
     async def _create_desync_log_entry(self, desync_event: DesyncEvent, node_info: Optional[NodeInfo]) -> Dict[str, Any]:
         """Create comprehensive desync log entry."""
-        # Get context metrics
+        # Only the metrics context does I/O; the other sources are computed in place
         context_metrics = await self._get_context_metrics(desync_event.detected_at)
-        
-        # Get peer information
-        peer_context = await self._get_peer_context(desync_event.detected_at)
+        peer_context = self._get_peer_context(desync_event.detected_at)
+        network_conditions = self._analyze_network_conditions()
         
         # Calculate timing analysis
         timing_analysis = self._calculate_timing_analysis(desync_event)
         
-        return {
-            'log_metadata': {
-                'log_type': 'desync_event',
-                'log_version': '1.0',
-                'timestamp': time.time(),
-                'ai_optimized': self.ai_optimization
-            },
+        log_entry = {
+            'log_metadata': {**self._log_metadata_template, 'timestamp': time.time()},
             'event_summary': {
                 'event_id': desync_event.event_id,
                 'detected_at': desync_event.detected_at,
@@ -116,27 +402,42 @@ class DesyncLogger:
             'network_context': {
                 'peer_count': desync_event.peer_count,
                 'peer_analysis': peer_context,
-                'network_conditions': await self._analyze_network_conditions()
+                'network_conditions': network_conditions
             },
             'metrics_context': {
                 'context_window_minutes': self.context_window_minutes,
-                'pre_event_metrics': context_metrics.get('pre_event', []),
-                'during_event_metrics': context_metrics.get('during_event', []),
-                'post_event_metrics': context_metrics.get('post_event', [])
+                'pre_event_metrics': context_metrics.get('pre_event', {}),
+                'during_event_metrics': context_metrics.get('during_event', {}),
+                'post_event_metrics': context_metrics.get('post_event', {})
             },
-            'timing_analysis': timing_analysis,
-            'system_health': {
-                'memory_usage_patterns': await self._get_memory_patterns(),
-                'cpu_usage_patterns': await self._get_cpu_patterns(),
-                'disk_io_patterns': await self._get_disk_patterns(),
-                'network_io_patterns': await self._get_network_patterns()
-            },
-            'correlation_hints': await self._generate_correlation_hints(desync_event),
-            'raw_event_data': desync_event.to_dict()
+            'timing_analysis': timing_analysis
         }
+        
+        if 'system_health' in self._enabled_sections:
+            log_entry['system_health'] = {
+                'memory_usage_patterns': self._get_memory_patterns(),
+                'cpu_usage_patterns': self._get_cpu_patterns(),
+                'disk_io_patterns': self._get_disk_patterns(),
+                'network_io_patterns': self._get_network_patterns()
+            }
+        if 'correlation_hints' in self._enabled_sections:
+            log_entry['correlation_hints'] = self._generate_correlation_hints(desync_event)
+        
+        log_entry['raw_event_data'] = desync_event.to_dict()
+        return log_entry
+    
+    def _should_log(self, severity: str) -> bool:
+        """Whether a desync event of this severity gets logged."""
+        return self.desync_logging_enabled and SEVERITY_RANKS.get(severity, self.min_severity_rank) >= self.min_severity_rank
     
-    async def _create_analysis_entry(self, desync_event: DesyncEvent, log_entry: Dict[str, Any]) -> Dict[str, Any]:
-        """Create AI analysis entry with structured prompts."""
+    async def _create_analysis_entry(self, desync_event: DesyncEvent, log_entry: Dict[str, Any],
+                                     desync_log_offset: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Create AI analysis entry with structured prompts.
+        
+        The full desync log entry is referenced by event id and byte offset
+        rather than embedded a second time.
+        """
         return {
             'analysis_metadata': {
                 'analysis_type': 'desync_investigation',
@@ -162,11 +463,112 @@ class DesyncLogger:
                 'monitoring_improvements': self._suggest_monitoring_improvements(desync_event),
                 'prevention_strategies': self._suggest_prevention_strategies(log_entry)
             },
-            'full_context': log_entry
+            'full_context_ref': {
+                'log': str(self.desync_log_path),
+                'event_id': desync_event.event_id,
+                'offset': desync_log_offset
+            }
         }
     
+    def _create_analysis_pointer(self, desync_event: DesyncEvent, desync_log_offset: int) -> Dict[str, Any]:
+        """Create a compact analysis entry pointing at the event's desync log entry."""
+        return {
+            'analysis_metadata': {
+                'analysis_type': 'desync_investigation',
+                'event_id': desync_event.event_id,
+                'timestamp': time.time(),
+                'analysis_version': '1.0'
+            },
+            'desync_log_offset': desync_log_offset
+        }
+    
+    async def _materialize_analysis_entry(self, pointer: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the full analysis entry for a lazy pointer from the desync log."""
+        key = (pointer['analysis_metadata']['event_id'], pointer['desync_log_offset'])
+        cached = self._analysis_cache.get(key)
+        if cached is not None:
+            self._analysis_cache.move_to_end(key)
+            return cached
+        
+        line = await asyncio.to_thread(self._read_record, self.desync_log_path, pointer['desync_log_offset'])
+        log_entry = _loads(line)
+        desync_event = DesyncEvent.from_dict(log_entry['raw_event_data'])
+        analysis_entry = await self._create_analysis_entry(desync_event, log_entry, pointer['desync_log_offset'])
+        
+        self._analysis_cache[key] = analysis_entry
+        if len(self._analysis_cache) > ANALYSIS_CACHE_SIZE:
+            self._analysis_cache.popitem(last=False)
+        return analysis_entry
+    
+    @staticmethod
+    def _read_record(log_path: Path, offset: int, length: Optional[int] = None) -> bytes:
+        """Read one record of a log file, up to the end of the line if no length is given."""
+        with open(log_path, 'rb') as f:
+            f.seek(offset)
+            return f.readline() if length is None else f.read(length)
+    
+    async def _load_analysis_index(self):
+        """Index the analysis entries already on disk by event id."""
+        scanned = await asyncio.to_thread(self._scan_analysis_log)
+        
+        # Entries written while scanning are newer than anything scanned
+        scanned.update(self._analysis_index)
+        self._analysis_index = scanned
+        self._analysis_index_loaded = True
+    
+    def _scan_analysis_log(self) -> Dict[str, Tuple[int, int]]:
+        """Map each event id to its latest entry in the analysis log (runs in a worker thread)."""
+        index = {}
+        if not self.analysis_log_path.exists():
+            return index
+        
+        for offset, length, line in self._iter_analysis_lines():
+            match = _ANALYSIS_EVENT_ID_RE.search(line)
+            if match:
+                event_id = match.group(1).decode('utf-8', 'replace')
+            else:
+                # Escaped or missing id - fall back to decoding the record
+                try:
+                    event_id = _loads(line).get('analysis_metadata', {}).get('event_id')
+                except ValueError:
+                    event_id = None
+            if event_id is not None:
+                index[event_id] = (offset, length)
+        return index
+    
+    def _iter_analysis_lines(self) -> Iterator[Tuple[int, int, bytes]]:
+        """Yield (offset, length on disk, JSON line) for each entry in the analysis log."""
+        if self._analysis_compressor is None:
+            offset = 0
+            with open(self.analysis_log_path, 'rb', buffering=LOG_BUFFER_SIZE) as f:
+                for line in f:
+                    yield offset, len(line), line
+                    offset += len(line)
+            return
+        
+        data = self.analysis_log_path.read_bytes()
+        decompressor = zstandard.ZstdDecompressor()
+        for offset, length in _zstd_frame_spans(data):
+            try:
+                yield offset, length, decompressor.decompress(data[offset:offset + length])
+            except zstandard.ZstdError:
+                continue
+    
+    def _decode_analysis_record(self, record: bytes) -> bytes:
+        """Return the JSON line of an analysis record as stored on disk."""
+        if self._analysis_compressor is None:
+            return record
+        return zstandard.ZstdDecompressor().decompress(record)
+    
     def _generate_investigation_focus(self, desync_event: DesyncEvent) -> str:
         """Generate focused investigation prompt."""
+        prefix, suffix = self._focus_template(desync_event.severity, _duration_bucket(desync_event.duration))
+        return f"{prefix}{desync_event.blocks_behind}{suffix}"
+    
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _focus_template(severity: str, duration_bucket: Optional[str]) -> Tuple[str, str]:
+        """Static prose around the blocks-behind count, per (severity, duration bucket)."""
         severity_context = {
             'critical': 'This is a critical desync event requiring immediate investigation.',
             'high': 'This is a significant desync event that needs thorough analysis.',
@@ -174,25 +576,31 @@ class DesyncLogger:
             'low': 'This is a minor desync event that may indicate emerging issues.'
         }
         
-        duration_context = ""
-        if desync_event.duration:
-            if desync_event.duration > 300:  # 5 minutes
-                duration_context = "The extended duration suggests systemic issues."
-            elif desync_event.duration > 60:  # 1 minute
-                duration_context = "The moderate duration indicates potential performance problems."
-            else:
-                duration_context = "The brief duration suggests a temporary synchronization issue."
+        duration_context = {
+            'long': "The extended duration suggests systemic issues.",
+            'moderate': "The moderate duration indicates potential performance problems.",
+            'brief': "The brief duration suggests a temporary synchronization issue."
+        }
         
         return (
-            f"{severity_context.get(desync_event.severity, '')} "
-            f"The node fell {desync_event.blocks_behind} blocks behind the network. "
-            f"{duration_context} "
+            f"{severity_context.get(severity, '')} The node fell ",
+            f" blocks behind the network. "
+            f"{duration_context.get(duration_bucket, '')} "
             f"Focus your analysis on identifying the root cause and prevention strategies."
         )
     
-    def _generate_key_questions(self, desync_event: DesyncEvent, log_entry: Dict[str, Any]) -> List[str]:
+    def _generate_key_questions(self, desync_event: DesyncEvent, log_entry: Dict[str, Any]) -> Tuple[str, ...]:
         """Generate key questions for AI analysis."""
-        questions = [
+        return self._key_questions(
+            desync_event.severity in ('critical', 'high'),
+            _duration_bucket(desync_event.duration) == 'long'
+        )
+    
+    @staticmethod
+    @lru_cache(maxsize=4)
+    def _key_questions(is_severe: bool, long_recovery: bool) -> Tuple[str, ...]:
+        """Question set for a (severity, recovery length) combination."""
+        questions = (
             "What was the primary cause of this desynchronization event?",
             "Were there any warning signs in the metrics before the desync occurred?",
             "How do the peer connection patterns correlate with the desync timing?",
@@ -200,21 +608,21 @@ class DesyncLogger:
             "Are there any network-level issues that could have contributed?",
             "How does this event compare to historical desync patterns?",
             "What preventive measures could reduce the likelihood of similar events?"
-        ]
+        )
         
         # Add severity-specific questions
-        if desync_event.severity in ['critical', 'high']:
-            questions.extend([
+        if is_severe:
+            questions += (
                 "What immediate actions should be taken to prevent recurrence?",
                 "Are there any infrastructure-level changes needed?"
-            ])
+            )
         
         # Add duration-specific questions
-        if desync_event.duration and desync_event.duration > 300:
-            questions.extend([
+        if long_recovery:
+            questions += (
                 "Why did the recovery take so long?",
                 "What factors prevented faster resynchronization?"
-            ])
+            )
         
         return questions
     
@@ -237,12 +645,21 @@ class DesyncLogger:
         
         return summary
     
+    def _local_hour(self, timestamp: float) -> str:
+        """Local hour of a timestamp as two digits, using the cached UTC offset."""
+        refreshed_at, offset = self._utc_offset
+        now = time.monotonic()
+        if now - refreshed_at > UTC_OFFSET_REFRESH_SECONDS:
+            offset = time.localtime().tm_gmtoff
+            self._utc_offset = (now, offset)
+        return f"{int((timestamp + offset) // 3600) % 24:02d}"
+    
     def _generate_pattern_hints(self, log_entry: Dict[str, Any]) -> List[str]:
         """Generate pattern recognition hints for AI."""
         hints = []
         
         # Timing patterns
-        event_hour = time.strftime('%H', time.localtime(log_entry['event_summary']['detected_at']))
+        event_hour = self._local_hour(log_entry['event_summary']['detected_at'])
         hints.append(f"Event occurred at hour {event_hour} - check for time-based patterns")
         
         # Severity patterns
@@ -258,31 +675,40 @@ class DesyncLogger:
         
         return hints
     
-    async def _get_context_metrics(self, event_timestamp: float) -> Dict[str, List[Dict]]:
-        """Get metrics context around the event."""
+    async def _get_context_metrics(self, event_timestamp: float) -> Dict[str, Dict[str, Any]]:
+        """Get metrics context around the event, one column per metric for each phase."""
+        context_seconds = self.context_window_minutes * 60
+        bucket = int(event_timestamp // CONTEXT_BUCKET_SECONDS)
+        
+        cached = self._context_cache.get(bucket)
+        if cached and time.monotonic() - cached[0] < context_seconds:
+            return cached[1]
+        
         try:
-            context_seconds = self.context_window_minutes * 60
-            
             # Get metrics before, during, and after the event
-            pre_event = await self.database.get_recent_metrics(context_seconds)
+            pre_event = await self.database.get_recent_metrics(context_seconds, limit=CONTEXT_PRE_EVENT_SAMPLES)
             # This is simplified - would need more sophisticated querying
             
-            return {
-                'pre_event': [m.to_dict() for m in pre_event[-5:]],  # Last 5 samples
-                'during_event': [],  # Would get metrics during event
-                'post_event': []     # Would get metrics after event
+            context = {
+                'pre_event': MetricsBatch.from_snapshots(pre_event).to_dict(),
+                'during_event': MetricsBatch().to_dict(),  # Would get metrics during event
+                'post_event': MetricsBatch().to_dict()     # Would get metrics after event
             }
-        except:
-            return {'pre_event': [], 'during_event': [], 'post_event': []}
+        except Exception as e:
+            self.logger.debug(f"Failed to load context metrics: {e}")
+            empty = MetricsBatch().to_dict()
+            return {'pre_event': empty, 'during_event': empty, 'post_event': empty}
+        
+        self._context_cache[bucket] = (time.monotonic(), context)
+        self._context_cache.move_to_end(bucket)
+        if len(self._context_cache) > CONTEXT_CACHE_SIZE:
+            self._context_cache.popitem(last=False)
+        
+        return context
     
-    async def _get_peer_context(self, event_timestamp: float) -> Dict[str, Any]:
+    def _get_peer_context(self, event_timestamp: float) -> Dict[str, Any]:
         """Get peer connection context."""
-        return {
-            'peer_connection_stability': 'unknown',
-            'peer_geographic_distribution': 'unknown',
-            'peer_version_distribution': 'unknown',
-            'connection_quality_metrics': {}
-        }
+        return UNKNOWN_PEER_CONTEXT
     
     def _calculate_timing_analysis(self, desync_event: DesyncEvent) -> Dict[str, Any]:
         """Calculate timing analysis for the event."""
@@ -312,38 +738,29 @@ class DesyncLogger:
         # Would analyze recent block times
         return 3.0  # placeholder
     
-    async def _analyze_network_conditions(self) -> Dict[str, Any]:
+    def _analyze_network_conditions(self) -> Dict[str, Any]:
         """Analyze network conditions at time of event."""
-        return {
-            'network_congestion_level': 'unknown',
-            'validator_performance': 'unknown',
-            'consensus_health': 'unknown'
-        }
+        return UNKNOWN_NETWORK_CONDITIONS
     
-    async def _get_memory_patterns(self) -> Dict[str, Any]:
+    def _get_memory_patterns(self) -> Dict[str, Any]:
         """Get memory usage patterns."""
-        return {'pattern': 'unknown', 'trend': 'stable'}
+        return UNKNOWN_USAGE_PATTERN
     
-    async def _get_cpu_patterns(self) -> Dict[str, Any]:
+    def _get_cpu_patterns(self) -> Dict[str, Any]:
         """Get CPU usage patterns."""
-        return {'pattern': 'unknown', 'trend': 'stable'}
+        return UNKNOWN_USAGE_PATTERN
     
-    async def _get_disk_patterns(self) -> Dict[str, Any]:
+    def _get_disk_patterns(self) -> Dict[str, Any]:
         """Get disk I/O patterns."""
-        return {'pattern': 'unknown', 'trend': 'stable'}
+        return UNKNOWN_USAGE_PATTERN
     
-    async def _get_network_patterns(self) -> Dict[str, Any]:
+    def _get_network_patterns(self) -> Dict[str, Any]:
         """Get network I/O patterns."""
-        return {'pattern': 'unknown', 'trend': 'stable'}
+        return UNKNOWN_USAGE_PATTERN
     
-    async def _generate_correlation_hints(self, desync_event: DesyncEvent) -> List[str]:
+    def _generate_correlation_hints(self, desync_event: DesyncEvent) -> Tuple[str, ...]:
         """Generate correlation analysis hints."""
-        return [
-            "Check correlation with peer count fluctuations",
-            "Analyze memory usage spikes before event",
-            "Examine network latency patterns",
-            "Review disk I/O bottlenecks"
-        ]
+        return CORRELATION_HINTS
     
     def _create_event_timeline(self, desync_event: DesyncEvent, log_entry: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Create detailed event timeline."""
@@ -366,8 +783,42 @@ class DesyncLogger:
     
     async def _identify_metric_anomalies(self, desync_event: DesyncEvent) -> List[Dict[str, Any]]:
         """Identify metric anomalies around the event time."""
-        # Would analyze metrics for anomalies
-        return []
+        # Snapshots are folded into the columns as they stream from the database
+        batch = MetricsBatch()
+        try:
+            async for snapshot in self.database.iter_recent_metrics(self.context_window_minutes * 60):
+                batch.add(snapshot)
+        except Exception as e:
+            self.logger.debug(f"Failed to load metrics for anomaly scan: {e}")
+            return []
+        
+        anomalies = []
+        for name, column in batch.columns.items():
+            present = [value for value in column if value == value]  # skip NaN gaps
+            if len(present) < ANOMALY_MIN_SAMPLES:
+                continue
+            
+            # Population std in one C-level pass: the distance from the column to its mean
+            count = len(present)
+            mean = sum(present) / count
+            std = math.dist(present, (mean,) * count) / math.sqrt(count)
+            if std == 0:
+                continue
+            
+            limit = self.anomaly_threshold_std * std
+            for timestamp, value in zip(batch.timestamps, column):
+                if abs(value - mean) > limit:
+                    anomalies.append({
+                        'metric_name': name,
+                        'timestamp': timestamp,
+                        'value': value,
+                        'mean': mean,
+                        'std': std,
+                        'deviation': abs(value - mean) / std
+                    })
+        
+        anomalies.sort(key=lambda anomaly: anomaly['deviation'], reverse=True)
+        return anomalies[:MAX_CONTEXT_ANOMALIES]
     
     async def _get_comparative_data(self, desync_event: DesyncEvent) -> Dict[str, Any]:
         """Get comparative analysis with similar events."""
@@ -385,59 +836,157 @@ class DesyncLogger:
             'blockchain_state': log_entry.get('blockchain_state', {})
         }
     
-    def _suggest_immediate_checks(self, desync_event: DesyncEvent) -> List[str]:
+    def _suggest_immediate_checks(self, desync_event: DesyncEvent) -> Tuple[str, ...]:
         """Suggest immediate checks."""
-        suggestions = [
-            "Verify peer connectivity and count",
-            "Check system resource utilization",
-            "Review recent block processing times",
-            "Examine network latency to consensus nodes"
-        ]
-        
-        if desync_event.severity in ['critical', 'high']:
-            suggestions.extend([
-                "Consider restarting the node if recovery is slow",
-                "Check for any infrastructure alerts or issues"
-            ])
-        
-        return suggestions
+        if desync_event.severity in ('critical', 'high'):
+            return SEVERE_IMMEDIATE_CHECKS
+        return IMMEDIATE_CHECKS
     
-    def _suggest_investigation_paths(self, log_entry: Dict[str, Any]) -> List[str]:
+    def _suggest_investigation_paths(self, log_entry: Dict[str, Any]) -> Tuple[str, ...]:
         """Suggest investigation paths."""
-        return [
-            "Analyze historical desync patterns for trends",
-            "Compare with other nodes on the same network",
-            "Review infrastructure monitoring for correlations",
-            "Examine consensus node performance metrics"
-        ]
+        return INVESTIGATION_PATHS
     
-    def _suggest_monitoring_improvements(self, desync_event: DesyncEvent) -> List[str]:
+    def _suggest_monitoring_improvements(self, desync_event: DesyncEvent) -> Tuple[str, ...]:
         """Suggest monitoring improvements."""
-        suggestions = [
-            "Add earlier warning thresholds for block lag",
-            "Implement peer quality monitoring",
-            "Add network latency tracking to consensus nodes",
-            "Monitor system resource trends more granularly"
-        ]
-        
-        return suggestions
+        return MONITORING_IMPROVEMENTS
     
-    def _suggest_prevention_strategies(self, log_entry: Dict[str, Any]) -> List[str]:
+    def _suggest_prevention_strategies(self, log_entry: Dict[str, Any]) -> Tuple[str, ...]:
         """Suggest prevention strategies."""
-        return [
-            "Optimize peer connection management",
-            "Implement proactive resource scaling",
-            "Add redundant consensus node connections",
-            "Schedule maintenance during low-activity periods"
-        ]
+        return PREVENTION_STRATEGIES
     
-    async def _write_log_entry(self, log_path: Path, entry: Dict[str, Any]):
-        """Write log entry to file."""
+    def _write_log_entry(self, log_path: Path, entry: Dict[str, Any]) -> Optional[int]:
+        """
+        Queue a log entry for the writer task.
+        
+        Returns:
+            Byte offset the entry will have in the log file, or None on failure
+        """
         try:
-            with open(log_path, 'a') as f:
-                f.write(json.dumps(entry) + '\n')
+            payload = _dumps_line(entry)
+            if self._analysis_compressor is not None and log_path == self.analysis_log_path:
+                payload = self._analysis_compressor.compress(payload)
+            
+            # The single writer appends in queue order, so the offset is known now
+            offset = self._log_offsets.get(log_path)
+            if offset is None:
+                offset = os.path.getsize(log_path) if log_path.exists() else 0
+            self._log_offsets[log_path] = offset + len(payload)
+            
+            self._queue.put_nowait((log_path, payload))
+            self._ensure_writer_task()
+            return offset
         except Exception as e:
             self.logger.error(f"Failed to write log entry to {log_path}: {e}")
+            return None
+    
+    def _ensure_writer_task(self):
+        """Start the writer task if it is not running."""
+        if self._writer_task is None or self._writer_task.done():
+            self._writer_task = asyncio.create_task(self._drain_queue())
+    
+    async def _drain_queue(self):
+        """Write queued entries to disk in batches, flushing when idle."""
+        while True:
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                # Nothing new for a while - push buffered entries to disk
+                await asyncio.to_thread(self.flush)
+                continue
+            
+            batch = [item]
+            while len(batch) < MAX_WRITE_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            
+            # One write per file for the whole batch
+            payloads: Dict[Path, List[bytes]] = {}
+            for log_path, payload in batch:
+                payloads.setdefault(log_path, []).append(payload)
+            
+            try:
+                await asyncio.to_thread(self._write_payloads, payloads)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+    
+    def _write_payloads(self, payloads: Dict[Path, List[bytes]]):
+        """Append serialized entries to their log files (runs in a worker thread)."""
+        for log_path, chunks in payloads.items():
+            try:
+                self._write_chunks(self._get_writer(log_path), chunks)
+            except Exception as e:
+                self.logger.error(f"Failed to write log entries to {log_path}: {e}")
+    
+    @staticmethod
+    def _write_chunks(writer: io.BufferedWriter, chunks: List[bytes]):
+        """Append chunks to a log file, bypassing the buffer for large batches."""
+        if len(chunks) == 1:
+            writer.write(chunks[0])
+            return
+        
+        total = sum(map(len, chunks))
+        if not HAS_WRITEV or total < LOG_BUFFER_SIZE:
+            writer.write(b''.join(chunks))
+            return
+        
+        # Buffered entries come first in the file
+        writer.flush()
+        fd = writer.fileno()
+        for start in range(0, len(chunks), _IOV_MAX):
+            group = chunks[start:start + _IOV_MAX]
+            written = os.writev(fd, group)
+            remaining = sum(map(len, group)) - written
+            if remaining:
+                # Short write - finish the rest of this group
+                tail = memoryview(b''.join(group))[written:]
+                while tail:
+                    tail = tail[os.write(fd, tail):]
+    
+    def _get_writer(self, log_path: Path) -> io.BufferedWriter:
+        """Return the open, buffered writer for a log file."""
+        writer = self._writers.get(log_path)
+        if writer is None:
+            writer = open(log_path, 'ab', buffering=LOG_BUFFER_SIZE)
+            self._writers[log_path] = writer
+        return writer
+    
+    def flush(self):
+        """Write all buffered log entries to disk."""
+        for log_path, writer in list(self._writers.items()):
+            try:
+                writer.flush()
+            except Exception as e:
+                self.logger.error(f"Failed to flush log file {log_path}: {e}")
+    
+    async def sync(self):
+        """Wait until every queued entry is written and flushed to disk."""
+        if self._writer_task is not None and not self._writer_task.done():
+            await self._queue.join()
+        await asyncio.to_thread(self.flush)
+    
+    async def initialize(self):
+        """Initialize the logger's own database; a shared one is initialized by its owner."""
+        if self._owns_database:
+            await self.database.initialize()
+    
+    async def close(self):
+        """Write out queued entries, then flush and close all log files."""
+        await self.sync()
+        
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            await asyncio.gather(self._writer_task, return_exceptions=True)
+            self._writer_task = None
+        
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+        
+        if self._owns_database:
+            await self.database.close()
     
     async def log_anomaly(self, anomaly: MetricAnomaly):
         """Log a metric anomaly."""
@@ -454,8 +1003,7 @@ class DesyncLogger:
                 }
             }
             
-            anomaly_log_path = self.logs_dir / 'analysis' / 'anomalies.jsonl'
-            await self._write_log_entry(anomaly_log_path, anomaly_entry)
+            self._write_log_entry(self.anomaly_log_path, anomaly_entry)
             
         except Exception as e:
             self.logger.error(f"Failed to log anomaly: {e}")
@@ -463,56 +1011,38 @@ class DesyncLogger:
     async def generate_ai_analysis_prompt(self, event_id: str) -> str:
         """Generate a comprehensive AI analysis prompt for a specific event."""
         try:
-            # Read the analysis entry for the event
-            analysis_entries = []
-            if self.analysis_log_path.exists():
-                with open(self.analysis_log_path, 'r') as f:
-                    for line in f:
-                        try:
-                            entry = json.loads(line.strip())
-                            if entry.get('analysis_metadata', {}).get('event_id') == event_id:
-                                analysis_entries.append(entry)
-                        except:
-                            continue
+            # Make sure queued entries are on disk before reading them back
+            await self.sync()
+            
+            if not self._analysis_index_loaded:
+                await self._load_analysis_index()
             
-            if not analysis_entries:
+            # Read only the latest analysis entry for the event
+            location = self._analysis_index.get(event_id)
+            if location is None:
                 return f"No analysis data found for event {event_id}"
             
-            latest_entry = analysis_entries[-1]  # Get most recent
+            record = await asyncio.to_thread(self._read_record, self.analysis_log_path, *location)
+            latest_entry = _loads(self._decode_analysis_record(record))
+            if 'desync_log_offset' in latest_entry:
+                # Lazy mode - rebuild the analysis from the desync log
+                latest_entry = await self._materialize_analysis_entry(latest_entry)
             
-            # Generate comprehensive prompt
-            prompt = f"""
-BLOCKCHAIN NODE DESYNC ANALYSIS REQUEST
-
-{latest_entry['ai_prompt_context']['investigation_focus']}
-
-KEY QUESTIONS TO ADDRESS:
-{chr(10).join('- ' + q for q in latest_entry['ai_prompt_context']['key_questions'])}
-
-DATA SUMMARY:
-{latest_entry['ai_prompt_context']['data_summary']}
-
-PATTERN RECOGNITION HINTS:
-{chr(10).join('- ' + h for h in latest_entry['ai_prompt_context']['pattern_hints'])}
-
-EVENT TIMELINE:
-{chr(10).join(f"- {item['timestamp']}: {item['event']} - {item['details']}" for item in latest_entry['structured_data']['event_timeline'])}
-
-SUGGESTED INVESTIGATION PATHS:
-{chr(10).join('- ' + s for s in latest_entry['analysis_suggestions']['investigation_paths'])}
-
-IMMEDIATE RECOMMENDED CHECKS:
-{chr(10).join('- ' + c for c in latest_entry['analysis_suggestions']['immediate_checks'])}
-
-Please provide a comprehensive analysis of this desync event, including:
-1. Root cause analysis
-2. Contributing factors identification
-3. Impact assessment
-4. Prevention recommendations
-5. Monitoring improvements
-
-Full technical context is available in the attached data structure.
-"""
+            # Fill the prompt skeleton once
+            prompt_context = latest_entry['ai_prompt_context']
+            suggestions = latest_entry['analysis_suggestions']
+            timeline = latest_entry['structured_data']['event_timeline']
+            prompt = AI_PROMPT_TEMPLATE.format_map({
+                'investigation_focus': prompt_context['investigation_focus'],
+                'questions': _bullets(prompt_context['key_questions']),
+                'data_summary': prompt_context['data_summary'],
+                'hints': _bullets(prompt_context['pattern_hints']),
+                'timeline': _bullets(
+                    f"{item['timestamp']}: {item['event']} - {item['details']}" for item in timeline
+                ),
+                'investigation_paths': _bullets(suggestions['investigation_paths']),
+                'immediate_checks': _bullets(suggestions['immediate_checks'])
+            })
             
             return prompt
             
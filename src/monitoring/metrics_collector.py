@@ -3,9 +3,13 @@ Metrics collection and analysis system.
 """
 
 import asyncio
+import bisect
+import itertools
 import logging
+import math
 import time
-from typing import Dict, Any, List, Optional
+from collections import deque
+from typing import Deque, Dict, Any, List, Optional, Tuple
 
 try:
     from core.prometheus_client import PrometheusClient, MetricSnapshot
@@ -24,8 +28,10 @@ except ImportError:
     
     class MetricsDatabase:
         def __init__(self, config): pass
+        async def initialize(self): pass
         async def store_metrics(self, snapshot): pass
         async def store_anomaly(self, anomaly): pass
+        async def store_anomalies(self, anomalies): pass
         async def close(self): pass
     
     class MetricAnomaly:
@@ -56,22 +62,35 @@ except ImportError:
             }
 
 
+# (count, mean, M2) of a group of samples
+MetricMoments = Tuple[int, float, float]
+
+# A time series: metric name plus its label set in sorted order
+SeriesKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+# Anomaly severity by deviation: above 2.5σ medium, 3.5σ high, 5σ critical
+ANOMALY_SEVERITY_BOUNDS = (2.5, 3.5, 5.0)
+ANOMALY_SEVERITIES = ("low", "medium", "high", "critical")
+
+
 class MetricsCollector:
     """Collects and analyzes Prometheus metrics."""
     
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], database: Optional[MetricsDatabase] = None):
         """
         Initialize metrics collector.
         
         Args:
             config: Configuration dictionary
+            database: Shared database, initialized and closed by the caller
         """
         self.config = config
         self.logger = logging.getLogger('metrics_collector')
         
         # Components
         self.prometheus_client = PrometheusClient(config)
-        self.database = MetricsDatabase(config)
+        self._owns_database = database is None
+        self.database = MetricsDatabase(config) if database is None else database
         
         # State
         self.is_collecting = False
@@ -83,11 +102,21 @@ class MetricsCollector:
         
         # Anomaly detection parameters
         self.baseline_window = config['monitoring'].get('anomaly_baseline_window_minutes', 60)
+        self._baseline_window_seconds = self.baseline_window * 60
         self.anomaly_threshold_std = config['monitoring'].get('anomaly_threshold_standard_deviations', 2.5)
+        self._threshold_sq = self.anomaly_threshold_std ** 2
         
-        # Metric baselines for anomaly detection
-        self.metric_baselines: Dict[str, Dict[str, Any]] = {}
-        self.recent_metrics: List[MetricSnapshot] = []
+        # Metric baselines for anomaly detection, kept up to date incrementally
+        # as snapshots enter and leave the baseline window. The window holds
+        # each snapshot's per-series (count, mean, M2); snapshots themselves
+        # are not retained once processed.
+        # Baselines are per series (name and labels), keyed by an interned id;
+        # ids are released with their baseline so label churn does not pile up
+        self._series_ids: Dict[SeriesKey, int] = {}
+        self._series_keys: Dict[int, SeriesKey] = {}
+        self._next_series_id = itertools.count()
+        self.metric_baselines: Dict[int, Dict[str, Any]] = {}
+        self._baseline_moments: Deque[Tuple[float, Dict[int, MetricMoments]]] = deque()
         
         # Callbacks
         self.anomaly_callbacks: List[callable] = []
@@ -95,7 +124,9 @@ class MetricsCollector:
     async def initialize(self):
         """Initialize the metrics collector."""
         try:
-            # Database is already initialized in the main script
+            # A shared database is already initialized by the main script
+            if self._owns_database:
+                await self.database.initialize()
             self.logger.info("Metrics collector initialized")
             
         except Exception as e:
@@ -129,110 +160,164 @@ class MetricsCollector:
         """Stop metrics collection."""
         self.is_collecting = False
         self.logger.info("Stopping metrics collection")
+        
+        if self._owns_database:
+            await self.database.close()
     
     async def _collect_and_analyze(self):
         """Collect metrics and perform analysis."""
         try:
             # Collect metrics
             snapshot = await self.prometheus_client.collect_metrics()
+            now = time.time()
             if not snapshot:
                 self.stats.prometheus_request_failures += 1
                 return
             
             self.stats.prometheus_requests += 1
-            self.stats.metrics_collected += len(snapshot.samples)
+            self.stats.metrics_collected += len(snapshot)
             
-            # Store metrics
+            # Store metrics; the write is queued and counted once it commits
             try:
-                await self.database.store_metrics(snapshot)
-                self.stats.database_writes += 1
+                stored = await self.database.store_metrics(snapshot)
+                if stored is not None:
+                    stored.add_done_callback(self._count_metrics_write)
             except Exception as e:
-                self.logger.error(f"Failed to store metrics: {e}")
+                self.logger.error("Failed to store metrics: %s", e)
                 self.stats.database_write_failures += 1
             
-            # Add to recent metrics for analysis
-            self.recent_metrics.append(snapshot)
+            # Detect anomalies and update baselines
+            await self._process_snapshot(snapshot, now)
+            
+        except Exception as e:
+            self.logger.error("Collection and analysis failed: %s", e)
+    
+    def _count_metrics_write(self, stored: asyncio.Future):
+        """Record the outcome of a queued metrics write."""
+        if stored.result():
+            self.stats.database_writes += 1
+        else:
+            self.stats.database_write_failures += 1
+    
+    async def _process_snapshot(self, snapshot: MetricSnapshot, now: float):
+        """Screen a snapshot for anomalies and fold it into the baselines.
+        
+        Both happen in a single pass over the snapshot's columns: each sample
+        is resolved to its series, checked against the series' current
+        baseline, then accumulated into the snapshot's per-series moments,
+        which are merged into the baselines after the pass.
+        """
+        cutoff_time = now - self._baseline_window_seconds
+        
+        # Snapshots arrive in timestamp order, so the expired ones are all at
+        # the left end of the window
+        while self._baseline_moments and self._baseline_moments[0][0] < cutoff_time:
+            _, expired = self._baseline_moments.popleft()
+            for series_id, moments in expired.items():
+                self._unmerge_baseline(series_id, moments)
+        
+        series_ids = self._series_ids
+        baselines = self.metric_baselines
+        # Nothing to screen against on a cold start or right after a reset
+        detect = self.anomaly_detection_enabled and bool(baselines)
+        threshold_sq = self._threshold_sq
+        isfinite = math.isfinite
+        moments_by_series: Dict[int, MetricMoments] = {}
+        flagged: List[Tuple[int, Dict[str, Any], float]] = []
+        
+        for i, (name, labels, value) in enumerate(zip(snapshot.names, snapshot.labels, snapshot.values)):
+            # A NaN/Inf sample would make the series' mean and M2 NaN for good
+            # (unmerging cannot take it back out), so it is neither screened
+            # nor merged
+            if not isfinite(value):
+                continue
             
-            # Keep only recent metrics (last hour)
-            cutoff_time = time.time() - 3600
-            self.recent_metrics = [
-                m for m in self.recent_metrics 
-                if m.timestamp > cutoff_time
-            ]
+            key = (name, tuple(sorted(labels.items())) if labels else ())
+            series_id = series_ids.get(key)
+            if series_id is None:
+                series_id = series_ids[key] = next(self._next_series_id)
+                self._series_keys[series_id] = key
             
-            # Perform anomaly detection
-            if self.anomaly_detection_enabled:
-                await self._detect_anomalies(snapshot)
+            # Need enough baseline data; a flat baseline has inv_std 0 and never
+            # flags. Squared deviations are compared, the root only taken for
+            # hits, which keep a copy of the baseline they were screened against
+            if detect:
+                baseline = baselines.get(series_id)
+                if baseline is not None and baseline['sample_count'] >= 10:
+                    diff = (value - baseline['mean']) * baseline['inv_std']
+                    deviation_sq = diff * diff
+                    if deviation_sq > threshold_sq:
+                        flagged.append((i, dict(baseline), deviation_sq ** 0.5))
             
-            # Update baselines
-            await self._update_baselines(snapshot)
+            previous = moments_by_series.get(series_id)
+            if previous is None:
+                moments_by_series[series_id] = (1, value, 0.0)
+                continue
             
-        except Exception as e:
-            self.logger.error(f"Collection and analysis failed: {e}")
-    
-    async def _detect_anomalies(self, snapshot: MetricSnapshot):
-        """Detect anomalies in current metrics."""
-        current_time = time.time()
+            # Same series repeated within a snapshot - Welford update
+            count, mean, m2 = previous
+            count += 1
+            delta = value - mean
+            mean += delta / count
+            moments_by_series[series_id] = (count, mean, m2 + delta * (value - mean))
         
-        for sample in snapshot.samples:
+        if snapshot.timestamp >= cutoff_time:
+            self._baseline_moments.append((snapshot.timestamp, moments_by_series))
+            for series_id, moments in moments_by_series.items():
+                self._merge_baseline(series_id, moments, now)
+        else:
+            # Too old to enter the window - drop ids first seen in this snapshot
+            for series_id in moments_by_series:
+                if series_id not in baselines:
+                    self._release_series(series_id)
+        
+        if flagged:
+            await self._report_anomalies(snapshot, flagged, now)
+    
+    async def _report_anomalies(self, snapshot: MetricSnapshot,
+                                flagged: List[Tuple[int, Dict[str, Any], float]], current_time: float):
+        """Build, store and announce anomalies for flagged (row, baseline, deviation) entries."""
+        anomalies = []
+        for i, baseline, deviation in flagged:
+            sample = snapshot.sample_at(i)
             try:
-                # Check if we have enough baseline data
-                if sample.name not in self.metric_baselines:
-                    continue
-                
-                baseline = self.metric_baselines[sample.name]
-                if baseline['sample_count'] < 10:  # Need minimum samples
-                    continue
-                
-                # Calculate deviation
-                mean = baseline['mean']
-                std = baseline['std']
-                
-                if std == 0:  # No variation in baseline
-                    continue
-                
-                deviation = abs(sample.value - mean) / std
+                anomalies.append(await self._create_anomaly(sample, baseline, deviation, current_time))
                 
-                # Check if anomaly
-                if deviation > self.anomaly_threshold_std:
-                    anomaly = await self._create_anomaly(sample, baseline, deviation, current_time)
-                    
-                    # Store anomaly
-                    await self.database.store_anomaly(anomaly.to_dict())
-                    self.stats.anomalies_detected += 1
-                    
-                    # Notify callbacks
-                    for callback in self.anomaly_callbacks:
-                        try:
-                            await callback(anomaly)
-                        except Exception as e:
-                            self.logger.error(f"Anomaly callback failed: {e}")
-                    
-                    self.logger.warning(
-                        f"ANOMALY DETECTED: {sample.name} = {sample.value:.2f} "
-                        f"(expected: {mean:.2f}±{std:.2f}, deviation: {deviation:.2f}σ)"
-                    )
+                self.logger.warning(
+                    "ANOMALY DETECTED: %s = %.2f (expected: %.2f±%.2f, deviation: %.2fσ)",
+                    sample.name, sample.value, baseline['mean'], baseline['std'], deviation
+                )
             
             except Exception as e:
-                self.logger.error(f"Anomaly detection failed for {sample.name}: {e}")
+                self.logger.error("Anomaly detection failed for %s: %s", sample.name, e)
+        
+        if not anomalies:
+            return
+        
+        # Store the snapshot's anomalies in one transaction
+        await self.database.store_anomalies(anomalies)
+        self.stats.anomalies_detected += len(anomalies)
+        
+        # Notify callbacks
+        results = await asyncio.gather(
+            *(callback(anomaly) for anomaly in anomalies for callback in self.anomaly_callbacks),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                self.logger.error("Anomaly callback failed: %s", result)
     
     async def _create_anomaly(self, sample, baseline, deviation, timestamp) -> MetricAnomaly:
         """Create anomaly object."""
         # Determine anomaly type
-        anomaly_type = "spike" if sample.value > baseline['mean'] else "drop"
+        is_spike = sample.value > baseline['mean']
+        anomaly_type = "spike" if is_spike else "drop"
         
-        # Determine severity
-        if deviation > 5.0:
-            severity = "critical"
-        elif deviation > 3.5:
-            severity = "high"
-        elif deviation > 2.5:
-            severity = "medium"
-        else:
-            severity = "low"
+        # Determine severity (bounds are exclusive)
+        severity = ANOMALY_SEVERITIES[bisect.bisect_left(ANOMALY_SEVERITY_BOUNDS, deviation)]
         
         # Create description
-        direction = "above" if sample.value > baseline['mean'] else "below"
+        direction = "above" if is_spike else "below"
         description = (
             f"{sample.name} is {deviation:.1f} standard deviations {direction} "
             f"the expected range ({baseline['mean']:.2f}±{baseline['std']:.2f})"
@@ -259,40 +344,55 @@ class MetricsCollector:
             }
         )
     
-    async def _update_baselines(self, snapshot: MetricSnapshot):
-        """Update metric baselines for anomaly detection."""
-        cutoff_time = time.time() - (self.baseline_window * 60)
+    def _merge_baseline(self, series_id: int, moments: MetricMoments, timestamp: float):
+        """Fold a group of samples into a series' baseline (Chan et al.)."""
+        count_b, mean_b, m2_b = moments
+        baseline = self.metric_baselines.get(series_id)
+        if baseline is None:
+            baseline = self.metric_baselines[series_id] = {
+                'mean': 0.0, 'std': 0.0, 'inv_std': 0.0, 'm2': 0.0, 'sample_count': 0
+            }
         
-        # Group metrics by name
-        metric_values: Dict[str, List[float]] = {}
+        count_a = baseline['sample_count']
+        count = count_a + count_b
+        delta = mean_b - baseline['mean']
+        baseline['mean'] += delta * count_b / count
+        baseline['m2'] += m2_b + delta * delta * count_a * count_b / count
+        baseline['sample_count'] = count
+        self._set_baseline_std(baseline, count)
+        baseline['last_updated'] = timestamp
+    
+    def _unmerge_baseline(self, series_id: int, moments: MetricMoments):
+        """Take a group of samples previously merged back out of a series' baseline."""
+        baseline = self.metric_baselines.get(series_id)
+        if baseline is None:
+            return
         
-        for historical_snapshot in self.recent_metrics:
-            if historical_snapshot.timestamp < cutoff_time:
-                continue
-            
-            for sample in historical_snapshot.samples:
-                if sample.name not in metric_values:
-                    metric_values[sample.name] = []
-                metric_values[sample.name].append(sample.value)
+        count_b, mean_b, m2_b = moments
+        count = baseline['sample_count']
+        count_a = count - count_b
+        if count_a <= 0:
+            del self.metric_baselines[series_id]
+            self._release_series(series_id)
+            return
         
-        # Calculate baselines
-        for metric_name, values in metric_values.items():
-            if len(values) < 2:
-                continue
-            
-            # Calculate statistics
-            mean = sum(values) / len(values)
-            variance = sum((x - mean) ** 2 for x in values) / len(values)
-            std = variance ** 0.5
-            
-            self.metric_baselines[metric_name] = {
-                'mean': mean,
-                'std': std,
-                'min': min(values),
-                'max': max(values),
-                'sample_count': len(values),
-                'last_updated': time.time()
-            }
+        mean_a = (count * baseline['mean'] - count_b * mean_b) / count_a
+        delta = mean_b - mean_a
+        baseline['mean'] = mean_a
+        baseline['m2'] = max(0.0, baseline['m2'] - m2_b - delta * delta * count_a * count_b / count)
+        baseline['sample_count'] = count_a
+        self._set_baseline_std(baseline, count_a)
+    
+    def _release_series(self, series_id: int):
+        """Forget the interned id of a series that no longer has a baseline."""
+        del self._series_ids[self._series_keys.pop(series_id)]
+    
+    @staticmethod
+    def _set_baseline_std(baseline: Dict[str, Any], count: int):
+        """Derive std and its reciprocal (used by anomaly screening) from M2."""
+        std = (baseline['m2'] / count) ** 0.5
+        baseline['std'] = std
+        baseline['inv_std'] = 1.0 / std if std > 0 else 0.0
     
     async def get_recent_anomalies(self, hours: int = 24) -> List[Dict[str, Any]]:
         """Get recent anomalies from database."""
@@ -304,13 +404,16 @@ class MetricsCollector:
         return {
             'collection_stats': self.stats.to_dict(),
             'baseline_metrics': len(self.metric_baselines),
-            'recent_snapshots': len(self.recent_metrics),
+            'recent_snapshots': len(self._baseline_moments),
             'anomaly_detection_enabled': self.anomaly_detection_enabled
         }
     
     def force_baseline_reset(self):
         """Force reset of all metric baselines."""
         self.metric_baselines.clear()
+        self._baseline_moments.clear()
+        self._series_ids.clear()
+        self._series_keys.clear()
         self.logger.info("Metric baselines reset")
 
 
@@ -3,9 +3,27 @@ Synchronization monitoring system.
 """
 
 import asyncio
+import bisect
+import json
 import logging
+import re
 import time
-from typing import Dict, Any, Optional, Callable
+from collections import deque
+from typing import Deque, Dict, Any, List, Optional, Callable, Tuple
+
+try:
+    import aiohttp
+    HAS_AIOHTTP = True
+except ImportError:
+    HAS_AIOHTTP = False
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+    _json_dumps = lambda obj: json.dumps(obj).encode()
 
 # Import core modules
 from core.ipc_client import IPCClient
@@ -31,15 +49,34 @@ except ImportError:
         pass
 
 
+# eth_blockNumber request body, serialized once and posted as-is
+_BLOCK_NUMBER_PAYLOAD = _json_dumps({"jsonrpc": "2.0", "method": "eth_blockNumber", "params": [], "id": 1})
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Hex block number in an eth_blockNumber response, read without decoding the JSON
+_BLOCK_NUMBER_RESULT_RE = re.compile(rb'"result"\s*:\s*"0x([0-9a-fA-F]+)"')
+
+
+# Desync severity by blocks behind: from 10 medium, 100 high, 1000 critical
+DESYNC_SEVERITY_BOUNDS = (10, 100, 1000)
+DESYNC_SEVERITIES = ("low", "medium", "high", "critical")
+
+# Recent sync checks kept in memory as desync context, and how much of it an event includes
+RECENT_CONTEXT_SIZE = 64
+CONTEXT_WINDOW_SECONDS = 600
+CONTEXT_SAMPLES = 10
+
+
 class SyncMonitor:
     """Main synchronization monitoring component."""
     
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], database: Optional[MetricsDatabase] = None):
         """
         Initialize sync monitor.
         
         Args:
             config: Configuration dictionary
+            database: Shared database, initialized and closed by the caller
         """
         self.config = config
         self.logger = logging.getLogger('sync_monitor')
@@ -65,13 +102,17 @@ class SyncMonitor:
         self.logger.info(f"Initializing IPC client - IPC: {ipc_path}, HTTP: {http_rpc_url}")
         self.ipc_client = IPCClient(ipc_path=ipc_path, timeout=timeout, http_rpc_url=http_rpc_url)
         self.prometheus_client = PrometheusClient(config)
-        self.database = MetricsDatabase(config)
+        self._owns_database = database is None
+        self.database = MetricsDatabase(config) if database is None else database
         
         # State
         self.monitoring_state = MonitoringState(started_at=time.time())
         self.is_running = False
         self.current_desync: Optional[DesyncEvent] = None
         
+        # (timestamp, sync status) of the latest checks, oldest first
+        self._recent_context: Deque[Tuple[float, Dict[str, Any]]] = deque(maxlen=RECENT_CONTEXT_SIZE)
+        
         # Configuration
         self.check_interval = config['monitoring']['sync_check_interval_seconds']
         self.desync_threshold = config['monitoring']['desync_threshold_blocks']
@@ -85,6 +126,14 @@ class SyncMonitor:
         # RPC endpoint for consensus comparison
         network_config = self._get_network_config()
         self.consensus_rpc_url = network_config.get('consensus_rpc_url')
+        
+        # Consensus comparison needs aiohttp; checked once here rather than per call
+        self._consensus_enabled = HAS_AIOHTTP
+        if not HAS_AIOHTTP:
+            self.logger.warning("aiohttp not available, consensus RPC comparison disabled")
+        
+        # Kept open across checks so the consensus connection is reused
+        self._http_session: Optional['aiohttp.ClientSession'] = None
     
     def _get_network_config(self) -> Dict[str, Any]:
         """Get network configuration based on detected node."""
@@ -94,8 +143,11 @@ class SyncMonitor:
     async def initialize(self):
         """Initialize the monitoring system."""
         try:
-            # Initialize database
-            await self.database.initialize()
+            # Initialize database (unless shared by the caller)
+            if self._owns_database:
+                await self.database.initialize()
+            
+            self._get_http_session()
             
             # Detect node type and update configuration
             node_info = await self._detect_node()
@@ -161,6 +213,16 @@ class SyncMonitor:
         """Add callback for desync recovery."""
         self.recovery_callbacks.append(callback)
     
+    async def _notify_callbacks(self, callbacks: List[Callable], desync_event: DesyncEvent, kind: str):
+        """Run event callbacks concurrently, logging any that fail."""
+        results = await asyncio.gather(
+            *(callback(desync_event) for callback in callbacks),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                self.logger.error("%s callback failed: %s", kind, result)
+    
     async def start_monitoring(self):
         """Start the monitoring loop."""
         self.is_running = True
@@ -185,8 +247,26 @@ class SyncMonitor:
         self.is_running = False
         self.logger.info("Stopping sync monitoring")
         
-        # Close database connection
-        await self.database.close()
+        # Close node connections and database
+        await self.ipc_client.close()
+        if self._owns_database:
+            await self.database.close()
+        
+        if self._http_session is not None:
+            await self._http_session.close()
+            self._http_session = None
+    
+    def _get_http_session(self) -> Optional['aiohttp.ClientSession']:
+        """Return the shared HTTP session for consensus RPC calls, creating it if needed."""
+        if not HAS_AIOHTTP:
+            return None
+        
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.network_timeout),
+                connector=aiohttp.TCPConnector(limit=16, ttl_dns_cache=300, keepalive_timeout=60)
+            )
+        return self._http_session
     
     async def _check_sync_status(self):
         """Check current synchronization status."""
@@ -201,29 +281,34 @@ class SyncMonitor:
                 try:
                     self.logger.info("Testing individual RPC calls for debugging...")
                     version_response = await self.ipc_client.get_client_version()
-                    self.logger.info(f"Client version response: success={version_response.success}, data={version_response.data}, error={version_response.error}")
+                    self.logger.info("Client version response: success=%s, data=%s, error=%s",
+                                     version_response.success, version_response.data, version_response.error)
                     
                     syncing_response = await self.ipc_client.get_syncing_status()
-                    self.logger.info(f"Syncing response: success={syncing_response.success}, data={syncing_response.data}, error={syncing_response.error}")
+                    self.logger.info("Syncing response: success=%s, data=%s, error=%s",
+                                     syncing_response.success, syncing_response.data, syncing_response.error)
                     
                     block_response = await self.ipc_client.get_block_number()
-                    self.logger.info(f"Block number response: success={block_response.success}, data={block_response.data}, error={block_response.error}")
+                    self.logger.info("Block number response: success=%s, data=%s, error=%s",
+                                     block_response.success, block_response.data, block_response.error)
                     
                 except Exception as debug_e:
-                    self.logger.error(f"Debug RPC calls failed: {debug_e}")
+                    self.logger.error("Debug RPC calls failed: %s", debug_e)
                 
                 return
             
+            now = time.time()
             self.monitoring_state.current_sync_status = sync_status
+            self._recent_context.append((now, sync_status.to_dict()))
             
             # Check for desync
             await self._check_for_desync(sync_status)
             
             # Update last check time
-            self.monitoring_state.last_metrics_collection = time.time()
+            self.monitoring_state.last_metrics_collection = now
             
         except Exception as e:
-            self.logger.error(f"Failed to check sync status: {e}")
+            self.logger.error("Failed to check sync status: %s", e)
     
     async def _check_for_desync(self, sync_status: SyncStatus):
         """
@@ -256,49 +341,42 @@ class SyncMonitor:
                     await self._handle_desync_recovery(sync_status, consensus_block)
             
         except Exception as e:
-            self.logger.error(f"Failed to check for desync: {e}")
+            self.logger.error("Failed to check for desync: %s", e)
     
     async def _get_consensus_block_height(self) -> Optional[int]:
         """Get consensus block height from network RPC."""
         try:
-            if not self.consensus_rpc_url:
+            if not self._consensus_enabled or not self.consensus_rpc_url:
                 return None
             
-            import aiohttp
-            import json
-            
-            payload = {
-                "jsonrpc": "2.0",
-                "method": "eth_blockNumber",
-                "params": [],
-                "id": 1
-            }
-            
-            timeout = aiohttp.ClientTimeout(total=self.network_timeout)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(self.consensus_rpc_url, json=payload) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if 'result' in data:
-                            return int(data['result'], 16)
+            session = self._get_http_session()
+            async with session.post(self.consensus_rpc_url, data=_BLOCK_NUMBER_PAYLOAD,
+                                    headers=_JSON_HEADERS) as response:
+                if response.status == 200:
+                    body = await response.read()
+                    match = _BLOCK_NUMBER_RESULT_RE.search(body)
+                    if match:
+                        return int(match.group(1), 16)
+                    
+                    data = _json_loads(body)
+                    if 'result' in data:
+                        return int(data['result'], 16)
             
             return None
             
-        except ImportError:
-            self.logger.warning("aiohttp not available for consensus RPC calls")
-            return None
         except Exception as e:
-            self.logger.warning(f"Failed to get consensus block height: {e}")
+            self.logger.warning("Failed to get consensus block height: %s", e)
             return None
     
     async def _handle_desync_detection(self, sync_status: SyncStatus, consensus_block: int, blocks_behind: int):
         """Handle new desync detection."""
-        event_id = f"desync_{int(time.time())}"
+        detected_at = time.time()
+        event_id = f"desync_{int(detected_at)}"
         peer_count = await self.ipc_client.get_peer_count()
         
         self.current_desync = DesyncEvent(
             event_id=event_id,
-            detected_at=time.time(),
+            detected_at=detected_at,
             local_block=sync_status.current_block,
             network_block=consensus_block,
             blocks_behind=blocks_behind,
@@ -316,15 +394,11 @@ class SyncMonitor:
         await self.database.store_desync_event(event_id, event_data)
         
         # Notify callbacks
-        for callback in self.desync_callbacks:
-            try:
-                await callback(self.current_desync)
-            except Exception as e:
-                self.logger.error(f"Desync callback failed: {e}")
+        await self._notify_callbacks(self.desync_callbacks, self.current_desync, "Desync")
         
         self.logger.warning(
-            f"DESYNC DETECTED: {blocks_behind} blocks behind consensus "
-            f"(local: {sync_status.current_block}, network: {consensus_block})"
+            "DESYNC DETECTED: %d blocks behind consensus (local: %d, network: %d)",
+            blocks_behind, sync_status.current_block, consensus_block
         )
     
     async def _handle_desync_recovery(self, sync_status: SyncStatus, consensus_block: int):
@@ -341,15 +415,11 @@ class SyncMonitor:
         await self.database.store_desync_event(self.current_desync.event_id, event_data)
         
         # Notify callbacks
-        for callback in self.recovery_callbacks:
-            try:
-                await callback(self.current_desync)
-            except Exception as e:
-                self.logger.error(f"Recovery callback failed: {e}")
+        await self._notify_callbacks(self.recovery_callbacks, self.current_desync, "Recovery")
         
         self.logger.info(
-            f"DESYNC RECOVERED: Event {self.current_desync.event_id} "
-            f"lasted {self.current_desync.recovery_duration:.1f} seconds"
+            "DESYNC RECOVERED: Event %s lasted %.1f seconds",
+            self.current_desync.event_id, self.current_desync.recovery_duration
         )
         
         # Remove from active desyncs
@@ -360,25 +430,24 @@ class SyncMonitor:
     
     def _calculate_desync_severity(self, blocks_behind: int) -> str:
         """Calculate desync severity based on blocks behind."""
-        if blocks_behind >= 1000:
-            return "critical"
-        elif blocks_behind >= 100:
-            return "high"
-        elif blocks_behind >= 10:
-            return "medium"
-        else:
-            return "low"
+        return DESYNC_SEVERITIES[bisect.bisect_right(DESYNC_SEVERITY_BOUNDS, blocks_behind)]
     
     async def _create_detailed_event_data(self, desync_event: DesyncEvent) -> Dict[str, Any]:
         """Create detailed event data for logging and analysis."""
         # Get additional context
         peer_count = await self.ipc_client.get_peer_count()
         
-        # Get recent metrics for context
-        try:
-            recent_metrics = await self.database.get_recent_metrics(600)  # 10 minutes
-        except:
-            recent_metrics = []
+        now = time.time()
+        context_data = self._recent_context_data(now)
+        metrics_context = {
+            'metrics_window_seconds': CONTEXT_WINDOW_SECONDS,
+            'metrics_collected': len(context_data),
+            'context_data': context_data
+        }
+        if not context_data:
+            # Ring is cold (e.g. right after a restart) - stored metric
+            # snapshots have their own schema, so they get their own key
+            metrics_context['stored_metrics'] = await self._stored_context_metrics()
         
         return {
             'event_metadata': {
@@ -399,16 +468,12 @@ class SyncMonitor:
             'peer_analysis': {
                 'peer_statistics': {
                     'total_peers': peer_count,
-                    'collection_timestamp': time.time()
+                    'collection_timestamp': now
                 }
             },
-            'metrics_context': {
-                'metrics_window_seconds': 600,
-                'metrics_collected': len(recent_metrics),
-                'context_data': [m.to_dict() for m in recent_metrics[-10:]]  # Last 10 samples
-            },
+            'metrics_context': metrics_context,
             'system_context': {
-                'monitoring_uptime': time.time() - self.monitoring_state.started_at,
+                'monitoring_uptime': now - self.monitoring_state.started_at,
                 'configuration': {
                     'desync_threshold': self.desync_threshold,
                     'check_interval': self.check_interval
@@ -416,6 +481,26 @@ class SyncMonitor:
             }
         }
     
+    def _recent_context_data(self, now: float) -> List[Dict[str, Any]]:
+        """Last few sync checks from the context window as timestamped SyncStatus dicts, newest last."""
+        cutoff_time = now - CONTEXT_WINDOW_SECONDS
+        context_data = []
+        for timestamp, status in reversed(self._recent_context):
+            if timestamp < cutoff_time or len(context_data) == CONTEXT_SAMPLES:
+                break
+            context_data.append({'timestamp': timestamp, **status})
+        
+        context_data.reverse()
+        return context_data
+    
+    async def _stored_context_metrics(self) -> List[Dict[str, Any]]:
+        """Last few metric snapshots of the context window from the database."""
+        try:
+            recent_metrics = await self.database.get_recent_metrics(CONTEXT_WINDOW_SECONDS, limit=CONTEXT_SAMPLES)
+        except Exception:
+            return []
+        return [m.to_dict() for m in recent_metrics]
+    
     async def get_monitoring_status(self) -> Dict[str, Any]:
         """Get current monitoring status."""
         return self.monitoring_state.to_dict()
\ No newline at end of file
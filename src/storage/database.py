@@ -8,54 +8,125 @@ try:
 except ImportError:
     import sqlite3
     import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    from functools import partial
     AIOSQLITE_AVAILABLE = False
     
-    # Simple async wrapper for sqlite3 when aiosqlite is not available
+    # Minimal aiosqlite stand-in: each connection lives on its own worker
+    # thread (as with aiosqlite), so queries never block the event loop
+    class _AsyncCursor:
+        def __init__(self, conn, cursor):
+            self._conn = conn
+            self._cursor = cursor
+        
+        @property
+        def rowcount(self):
+            return self._cursor.rowcount
+        
+        async def fetchone(self):
+            return await self._conn._run(self._cursor.fetchone)
+        
+        async def fetchmany(self, size=None):
+            return await self._conn._run(self._cursor.fetchmany, size or self._cursor.arraysize)
+        
+        async def fetchall(self):
+            return await self._conn._run(self._cursor.fetchall)
+        
+        async def close(self):
+            await self._conn._run(self._cursor.close)
+        
+        async def __aiter__(self):
+            while True:
+                rows = await self.fetchmany(100)
+                if not rows:
+                    return
+                for row in rows:
+                    yield row
+    
+    class _AsyncConnection:
+        def __init__(self, executor, conn):
+            self._executor = executor
+            self._conn = conn
+        
+        async def _run(self, func, *args):
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        
+        @property
+        def row_factory(self):
+            return self._conn.row_factory
+        
+        @row_factory.setter
+        def row_factory(self, value):
+            self._conn.row_factory = value
+        
+        @property
+        def in_transaction(self):
+            return self._conn.in_transaction
+        
+        async def execute(self, query, parameters=()):
+            return _AsyncCursor(self, await self._run(self._conn.execute, query, parameters))
+        
+        async def executemany(self, query, parameters):
+            return _AsyncCursor(self, await self._run(self._conn.executemany, query, parameters))
+        
+        async def commit(self):
+            await self._run(self._conn.commit)
+        
+        async def rollback(self):
+            await self._run(self._conn.rollback)
+        
+        async def close(self):
+            await self._run(self._conn.close)
+            self._executor.shutdown(wait=False)
+    
     class aiosqlite:
         Row = sqlite3.Row
         
         @staticmethod
-        async def connect(path):
-            # Create a wrapper that makes sqlite3 look like aiosqlite
-            class AsyncConnection:
-                def __init__(self, conn):
-                    self._conn = conn
-                    self.row_factory = None
-                    
-                async def execute(self, query, parameters=()):
-                    return self._conn.execute(query, parameters)
-                    
-                async def commit(self):
-                    self._conn.commit()
-                    
-                async def rollback(self):
-                    self._conn.rollback()
-                    
-                async def close(self):
-                    self._conn.close()
-                    
-                def __setattr__(self, name, value):
-                    if name == 'row_factory':
-                        self._conn.row_factory = value
-                    super().__setattr__(name, value)
-            
-            conn = sqlite3.connect(path)
-            return AsyncConnection(conn)
+        async def connect(path, **kwargs):
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite')
+            conn = await asyncio.get_running_loop().run_in_executor(
+                executor, partial(sqlite3.connect, path, **kwargs)
+            )
+            return _AsyncConnection(executor, conn)
 
+import asyncio
+import calendar
 import json
 import logging
+import math
+import re
 import time
-from typing import Dict, Any, List, Optional
+from bisect import insort
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
 from pathlib import Path
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as pads
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
 try:
     from core.prometheus_client import MetricSnapshot, MetricSample
 except ImportError:
     # Fallback when core modules not available
     class MetricSnapshot:
-        def __init__(self, timestamp, samples):
+        def __init__(self, timestamp, names=None, values=None, labels=None):
             self.timestamp = timestamp
-            self.samples = samples
+            self.names = names or []
+            self.values = values or []
+            self.labels = labels or []
         
         def to_dict(self):
             return {'timestamp': self.timestamp, 'metrics': {}}
@@ -68,6 +139,98 @@ except ImportError:
             self.labels = labels or {}
 
 
+# Connection PRAGMAs for the append-heavy metrics workload; storage.pragmas
+# in the config overrides individual entries
+DEFAULT_PRAGMAS = {
+    # Only takes effect on a new database (before the first table exists)
+    'auto_vacuum': 'INCREMENTAL',
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'temp_store': 'MEMORY',
+    'cache_size': -65536,
+    'mmap_size': 268435456,
+    'wal_autocheckpoint': 1000,
+}
+
+# PRAGMAs that are per connection and also apply to read-only connections
+READER_PRAGMAS = ('cache_size', 'mmap_size', 'temp_store')
+
+# Read-only connections serving SELECTs alongside the single writer
+DEFAULT_READER_POOL_SIZE = 2
+
+# Group commit: writes queued within this window (seconds) of the first
+# are written in one transaction, up to a batch size
+WRITE_COALESCE_SECONDS = 0.1
+WRITE_BATCH_MAX = 64
+
+# Retention deletes run in transactions of at most this many rows, and free
+# pages go back to the filesystem this many at a time
+DELETE_BATCH_ROWS = 10000
+VACUUM_BATCH_PAGES = 1000
+
+# Rows pulled per fetchmany() while streaming query results
+FETCH_BATCH_SIZE = 1000
+
+# Label set ids kept in memory (most recently used)
+LABEL_CACHE_SIZE = 4096
+
+# Metric rows are sharded into one table per UTC month (metrics_YYYYMM), so
+# retention drops whole shards instead of deleting row by row
+_METRIC_SHARD_RE = re.compile(r'^metrics_(\d{4})(\d{2})$')
+
+# Metric rows of one shard with their label set's JSON, for reads and archiving
+METRIC_ROWS_SELECT = """
+    SELECT m.timestamp, m.metric_name, m.metric_value, l.labels_json AS labels
+    FROM {table} m LEFT JOIN label_sets l ON l.id = m.label_id
+"""
+
+# Rows newer than a timestamp. Rows are inserted in timestamp order, so the
+# last older row, found scanning back from the newest rowid, bounds the range
+# without a timestamp index
+RECENT_ROWS_WHERE = """
+    WHERE m.id > IFNULL((SELECT id FROM {table} WHERE timestamp <= ? ORDER BY id DESC LIMIT 1), 0)
+    AND m.timestamp > ?
+"""
+
+# Parquet archive of metric rows older than the hot window: one file per hour
+# (UTC, per archive run), metric names dictionary-encoded
+if HAS_PYARROW:
+    ARCHIVE_SCHEMA = pa.schema([
+        ('timestamp', pa.timestamp('us')),
+        ('metric_name', pa.dictionary(pa.int32(), pa.string())),
+        ('value', pa.float64()),
+        ('labels', pa.string()),
+    ])
+ARCHIVE_HOUR_FORMAT = '%Y%m%d%H'
+
+def _metric_shard(timestamp: float) -> str:
+    """Name of the shard table holding metric rows at `timestamp`."""
+    return time.strftime('metrics_%Y%m', time.gmtime(timestamp))
+
+
+def _shard_span(table: str) -> Tuple[int, int]:
+    """[start, end) of a shard's month as unix timestamps."""
+    match = _METRIC_SHARD_RE.match(table)
+    year, month = int(match.group(1)), int(match.group(2))
+    start = calendar.timegm((year, month, 1, 0, 0, 0))
+    end = calendar.timegm((year + month // 12, month % 12 + 1, 1, 0, 0, 0))
+    return start, end
+
+
+# JSON columns are written as text. orjson also serializes dataclasses
+# directly; otherwise objects fall back to their to_dict()
+if HAS_ORJSON:
+    def _json_text(obj: Any) -> str:
+        return orjson.dumps(obj, default=lambda o: o.to_dict()).decode('utf-8')
+    
+    _json_loads = orjson.loads
+else:
+    def _json_text(obj: Any) -> str:
+        return json.dumps(obj, default=lambda o: o.to_dict())
+    
+    _json_loads = json.loads
+
+
 class MetricsDatabase:
     """SQLite database for storing metrics and monitoring data."""
     
@@ -81,17 +244,41 @@ class MetricsDatabase:
         self.config = config
         self.db_path = config['storage']['database_path']
         self.retention_hours = config['storage']['timeseries_retention_hours']
+        self.pragmas = {**DEFAULT_PRAGMAS, **(config['storage'].get('pragmas') or {})}
+        self.reader_pool_size = config['storage'].get('reader_pool_size', DEFAULT_READER_POOL_SIZE)
         self.logger = logging.getLogger('metrics_database')
         
+        # Optional Parquet archive; SQLite then only keeps the hot window of metric rows
+        archive_config = config['storage'].get('archive') or {}
+        self.archive_enabled = bool(archive_config.get('enabled', False))
+        if self.archive_enabled and not HAS_PYARROW:
+            self.logger.warning("pyarrow not available, metrics archive disabled")
+            self.archive_enabled = False
+        self.archive_dir = Path(archive_config.get('directory') or Path(self.db_path).parent / 'archive')
+        self.hot_hours = archive_config.get('hot_hours', 24)
+        
         # Ensure database directory exists
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
         
+        # Writer connection; SELECTs go through the read-only pool when it exists
         self.db = None
+        self._readers: Optional[asyncio.Queue] = None
+        
+        # Sorted label items -> label_sets id
+        self._label_ids: OrderedDict = OrderedDict()
+        
+        # Existing metric shard tables, oldest first
+        self._metric_shards: List[str] = []
+        
+        # Background writer draining queued (kind, payload, future) writes
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
     
     async def initialize(self):
         """Initialize database and create tables."""
         self.db = await aiosqlite.connect(self.db_path)
         self.db.row_factory = aiosqlite.Row
+        await self._apply_pragmas()
         
         await self._create_tables()
         await self._create_indexes()
@@ -99,34 +286,88 @@ class MetricsDatabase:
         # Schedule cleanup
         await self._cleanup_old_data()
         
+        await self._open_readers()
+        
+        self._write_queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._run_writer())
+        
         self.logger.info(f"Database initialized: {self.db_path}")
     
     async def close(self):
-        """Close database connection."""
+        """Flush queued writes and close database connections."""
+        if self._writer_task is not None:
+            self._write_queue.put_nowait(None)
+            await self._writer_task
+            self._writer_task = None
+        
+        if self._readers is not None:
+            while not self._readers.empty():
+                await self._readers.get_nowait().close()
+            self._readers = None
+        
         if self.db:
             await self.db.close()
     
+    async def _open_readers(self):
+        """Open the read-only connection pool; WAL lets these read while the writer commits."""
+        if self.reader_pool_size <= 0:
+            return
+        
+        readers = asyncio.Queue()
+        uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+        try:
+            for _ in range(self.reader_pool_size):
+                reader = await aiosqlite.connect(uri, uri=True)
+                reader.row_factory = aiosqlite.Row
+                for name in READER_PRAGMAS:
+                    if name in self.pragmas:
+                        await reader.execute(f"PRAGMA {name}={self.pragmas[name]}")
+                readers.put_nowait(reader)
+        except Exception as e:
+            self.logger.warning(f"Read-only connections unavailable, reading through the writer: {e}")
+            while not readers.empty():
+                await readers.get_nowait().close()
+            return
+        
+        self._readers = readers
+    
+    @asynccontextmanager
+    async def _acquire_reader(self) -> AsyncIterator[Any]:
+        """Borrow a read-only connection, or the writer if there is no pool."""
+        if self._readers is None:
+            yield self.db
+            return
+        
+        reader = await self._readers.get()
+        try:
+            yield reader
+        finally:
+            self._readers.put_nowait(reader)
+    
+    async def _apply_pragmas(self):
+        """Tune the connection (WAL journal, relaxed sync, larger caches)."""
+        for name, value in self.pragmas.items():
+            await self.db.execute(f"PRAGMA {name}={value}")
+        await self.db.commit()
+    
     async def _create_tables(self):
         """Create database tables."""
-        # Metrics snapshots table
+        # Distinct label sets, shared by the metric rows that carry them
         await self.db.execute("""
-            CREATE TABLE IF NOT EXISTS metrics_snapshots (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp REAL NOT NULL,
-                snapshot_data TEXT NOT NULL
+            CREATE TABLE IF NOT EXISTS label_sets (
+                id INTEGER PRIMARY KEY,
+                labels_json TEXT UNIQUE NOT NULL
             )
         """)
         
-        # Individual metrics table for easy querying
-        await self.db.execute("""
-            CREATE TABLE IF NOT EXISTS metrics (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp REAL NOT NULL,
-                metric_name TEXT NOT NULL,
-                metric_value REAL NOT NULL,
-                labels TEXT
-            )
-        """)
+        # Individual metrics for easy querying live in monthly shards,
+        # created as rows for a new month arrive
+        await self._load_metric_shards()
+        await self._migrate_metric_labels()
+        await self._migrate_unsharded_metrics()
+        
+        # Snapshots are rebuilt from the metric rows on read
+        await self._drop_snapshot_table()
         
         # Desync events table
         await self.db.execute("""
@@ -159,23 +400,128 @@ class MetricsDatabase:
         
         await self.db.commit()
     
-    async def _create_indexes(self):
-        """Create database indexes for performance."""
-        # Metrics indexes
-        await self.db.execute("""
-            CREATE INDEX IF NOT EXISTS idx_metrics_timestamp 
-            ON metrics(timestamp)
-        """)
+    async def _migrate_metric_labels(self):
+        """Move per-row label JSON from databases created before label_sets into it."""
+        cursor = await self.db.execute("PRAGMA table_info(metrics)")
+        columns = {row[1] for row in await cursor.fetchall()}
+        if 'labels' not in columns:
+            return
+        
+        if 'label_id' not in columns:
+            await self.db.execute("ALTER TABLE metrics ADD COLUMN label_id INTEGER REFERENCES label_sets(id)")
         
+        # Old rows hold json.dumps text; label sets are re-encoded through
+        # _label_id so migrated and new rows share the same label_sets entry
+        cursor = await self.db.execute("SELECT DISTINCT labels FROM metrics WHERE labels IS NOT NULL")
+        mapping = []
+        for (labels_text,) in await cursor.fetchall():
+            labels = _json_loads(labels_text)
+            mapping.append((labels_text, await self._label_id(labels) if labels else None))
+        
+        await self.db.execute("CREATE TEMP TABLE label_migration (labels TEXT PRIMARY KEY, label_id INTEGER)")
+        await self.db.executemany("INSERT INTO label_migration (labels, label_id) VALUES (?, ?)", mapping)
         await self.db.execute("""
-            CREATE INDEX IF NOT EXISTS idx_metrics_name_timestamp 
-            ON metrics(metric_name, timestamp)
+            UPDATE metrics
+            SET label_id = (SELECT label_id FROM label_migration WHERE labels = metrics.labels), labels = NULL
+            WHERE labels IS NOT NULL
         """)
+        await self.db.execute("DROP TABLE label_migration")
+        self.logger.info("Migrated metric labels to label_sets")
+    
+    async def _migrate_unsharded_metrics(self):
+        """Move rows of the single metrics table of older databases into monthly shards."""
+        cursor = await self.db.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'metrics'")
+        if await cursor.fetchone() is None:
+            return
         
-        await self.db.execute("""
-            CREATE INDEX IF NOT EXISTS idx_snapshots_timestamp 
-            ON metrics_snapshots(timestamp)
+        cursor = await self.db.execute("SELECT DISTINCT strftime('%Y%m', timestamp, 'unixepoch') FROM metrics")
+        for (month,) in await cursor.fetchall():
+            table = f"metrics_{month}"
+            await self._create_metric_shard(table)
+            await self.db.execute(f"""
+                INSERT INTO {table} (timestamp, metric_name, metric_value, label_id)
+                SELECT timestamp, metric_name, metric_value, label_id FROM metrics
+                WHERE strftime('%Y%m', timestamp, 'unixepoch') = ? ORDER BY id
+            """, (month,))
+        
+        await self.db.execute("DROP TABLE metrics")
+        self.logger.info("Migrated metrics table to monthly shards")
+    
+    async def _drop_snapshot_table(self):
+        """Drop the snapshot document table of older databases (it duplicated the metric rows)."""
+        cursor = await self.db.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'metrics_snapshots'")
+        if await cursor.fetchone() is None:
+            return
+        
+        await self.db.execute("DROP TABLE metrics_snapshots")
+        self.logger.info("Dropped metrics_snapshots table")
+    
+    async def _load_metric_shards(self):
+        """Read the existing metric shard tables from the schema."""
+        cursor = await self.db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        self._metric_shards = sorted(row[0] for row in await cursor.fetchall() if _METRIC_SHARD_RE.match(row[0]))
+    
+    async def _shards_newer_than(self, cutoff_time: float) -> List[str]:
+        """
+        Shard tables holding rows newer than `cutoff_time`, oldest first.
+        
+        Other MetricsDatabase instances on the same file create shards too,
+        so the cached list is re-read from the schema while it lacks the
+        current month.
+        """
+        if _metric_shard(time.time()) not in self._metric_shards:
+            await self._load_metric_shards()
+        return [table for table in self._metric_shards if _shard_span(table)[1] > cutoff_time]
+    
+    async def _create_metric_shard(self, table: str):
+        """Create a metric shard table with its covering (name, timestamp) index."""
+        await self.db.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY,
+                timestamp REAL NOT NULL,
+                metric_name TEXT NOT NULL,
+                metric_value REAL NOT NULL,
+                label_id INTEGER REFERENCES label_sets(id)
+            )
         """)
+        await self.db.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_{table}_name_ts 
+            ON {table}(metric_name, timestamp, metric_value, label_id)
+        """)
+        if table not in self._metric_shards:
+            insort(self._metric_shards, table)
+    
+    async def _metric_shard_for(self, timestamp: float) -> str:
+        """Shard table for rows at `timestamp`, creating it for a new month."""
+        table = _metric_shard(timestamp)
+        if table not in self._metric_shards:
+            await self._create_metric_shard(table)
+        return table
+    
+    async def _label_id(self, labels: Dict[str, str]) -> Optional[int]:
+        """Id of a label set, adding it to label_sets on first sight."""
+        if not labels:
+            return None
+        
+        key = tuple(sorted(labels.items()))
+        label_id = self._label_ids.get(key)
+        if label_id is not None:
+            self._label_ids.move_to_end(key)
+            return label_id
+        
+        labels_json = _json_text(dict(key))
+        await self.db.execute("INSERT OR IGNORE INTO label_sets (labels_json) VALUES (?)", (labels_json,))
+        cursor = await self.db.execute("SELECT id FROM label_sets WHERE labels_json = ?", (labels_json,))
+        label_id = (await cursor.fetchone())[0]
+        
+        self._label_ids[key] = label_id
+        if len(self._label_ids) > LABEL_CACHE_SIZE:
+            self._label_ids.popitem(last=False)
+        return label_id
+    
+    async def _create_indexes(self):
+        """Create database indexes for performance."""
+        # Metric shards carry their own index (see _create_metric_shard)
         
         # Desync events indexes
         await self.db.execute("""
@@ -191,83 +537,299 @@ class MetricsDatabase:
         
         await self.db.commit()
     
-    async def store_metrics(self, snapshot: MetricSnapshot):
+    async def store_metrics(self, snapshot: MetricSnapshot) -> asyncio.Future:
         """
-        Store metrics snapshot in database.
+        Queue a metrics snapshot for storage.
+        
+        Snapshots queued close together are written in one transaction by
+        the background writer; this returns without waiting for it.
         
         Args:
             snapshot: MetricSnapshot to store
+            
+        Returns:
+            Future resolving to whether the snapshot's transaction committed
         """
+        return await self._queue_write('metrics', snapshot)
+    
+    async def _queue_write(self, kind: str, payload: Any) -> asyncio.Future:
+        """Hand a write to the background writer, or apply it now if none is running."""
+        future = asyncio.get_running_loop().create_future()
+        item = (kind, payload, future)
+        if self._writer_task is None or self._writer_task.done():
+            future.set_result((await self._write_batch([item]))[0])
+        else:
+            self._write_queue.put_nowait(item)
+        return future
+    
+    @staticmethod
+    def _failed_write() -> asyncio.Future:
+        """Already-resolved future for a write rejected before queueing."""
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(False)
+        return future
+    
+    async def _run_writer(self):
+        """Write queued items in coalesced batches until a None sentinel arrives."""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        
+        while not stopping:
+            item = await self._write_queue.get()
+            if item is None:
+                return
+            
+            batch = [item]
+            deadline = loop.time() + WRITE_COALESCE_SECONDS
+            while len(batch) < WRITE_BATCH_MAX:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._write_queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            
+            written = await self._write_batch(batch)
+            for (_, _, future), ok in zip(batch, written):
+                if not future.done():
+                    future.set_result(ok)
+    
+    async def _write_batch(self, batch: List[Tuple[str, Any, asyncio.Future]]) -> List[bool]:
+        """
+        Apply queued writes with a single commit for the batch.
+        
+        The batch's snapshots share one savepoint and every desync event and
+        anomaly list gets its own, so a failing write only loses itself.
+        
+        Returns:
+            Whether each item was written, in batch order
+        """
+        written = [False] * len(batch)
         try:
-            # Store complete snapshot
-            await self.db.execute(
-                "INSERT INTO metrics_snapshots (timestamp, snapshot_data) VALUES (?, ?)",
-                (snapshot.timestamp, json.dumps(snapshot.to_dict()))
-            )
+            metrics = [index for index, (kind, _, _) in enumerate(batch) if kind == 'metrics']
+            if metrics:
+                snapshots = [batch[index][1] for index in metrics]
+                # Outside the transaction, so a rollback never drops a new shard
+                tables = [await self._metric_shard_for(snapshot.timestamp) for snapshot in snapshots]
             
-            # Store individual metrics for easy querying
-            for sample in snapshot.samples:
-                await self.db.execute(
-                    "INSERT INTO metrics (timestamp, metric_name, metric_value, labels) VALUES (?, ?, ?, ?)",
-                    (
-                        snapshot.timestamp,
-                        sample.name,
-                        sample.value,
-                        json.dumps(sample.labels) if sample.labels else None
-                    )
-                )
+            # Explicit transaction; releasing the outermost savepoint would commit otherwise
+            if not self.db.in_transaction:
+                await self.db.execute("BEGIN")
+            
+            if metrics:
+                ok = await self._in_savepoint(self._insert_snapshots, snapshots, tables)
+                for index in metrics:
+                    written[index] = ok
+            
+            for index, (kind, payload, _) in enumerate(batch):
+                if kind == 'desync':
+                    written[index] = await self._in_savepoint(self._upsert_desync_event, payload)
+                elif kind == 'anomalies':
+                    written[index] = await self._in_savepoint(self._insert_anomalies, payload)
             
             await self.db.commit()
+            return written
             
         except Exception as e:
-            self.logger.error(f"Failed to store metrics: {e}")
+            self.logger.error(f"Failed to store batch of {len(batch)} writes: {e}")
             if self.db:
                 await self.db.rollback()
+                # Ids handed out in the rolled back transaction no longer exist
+                self._label_ids.clear()
+            return [False] * len(batch)
+    
+    async def _in_savepoint(self, write, *args) -> bool:
+        """Run a write inside a savepoint, undoing only its own changes if it fails."""
+        await self.db.execute("SAVEPOINT batch_write")
+        try:
+            await write(*args)
+        except Exception as e:
+            self.logger.error(f"Failed to store {write.__name__.lstrip('_')} write: {e}")
+            await self.db.execute("ROLLBACK TO batch_write")
+            await self.db.execute("RELEASE batch_write")
+            # Label ids inserted under the savepoint are gone with it
+            self._label_ids.clear()
+            return False
+        
+        await self.db.execute("RELEASE batch_write")
+        return True
+    
+    async def _insert_snapshots(self, snapshots: List[MetricSnapshot], tables: List[str]):
+        """Insert the metric rows of snapshots into their shard `tables` (the caller commits)."""
+        rows_by_table: Dict[str, List[tuple]] = {}
+        for table, snapshot in zip(tables, snapshots):
+            rows = rows_by_table.setdefault(table, [])
+            timestamp = snapshot.timestamp
+            for name, value, labels in zip(snapshot.names, snapshot.values, snapshot.labels):
+                # NaN would be stored as NULL and break metric_value NOT NULL
+                if not math.isfinite(value):
+                    continue
+                rows.append((timestamp, name, value, await self._label_id(labels)))
+        
+        # One statement per shard
+        for table, rows in rows_by_table.items():
+            await self.db.executemany(
+                f"INSERT INTO {table} (timestamp, metric_name, metric_value, label_id) VALUES (?, ?, ?, ?)",
+                rows
+            )
+    
+    async def _iter_rows(self, db: Any, query: str, parameters: tuple = ()) -> AsyncIterator[Any]:
+        """Stream a query's rows in fetchmany() batches."""
+        cursor = await db.execute(query, parameters)
+        try:
+            while True:
+                rows = await cursor.fetchmany(FETCH_BATCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row
+        finally:
+            await cursor.close()
     
-    async def get_recent_metrics(self, seconds: int) -> List[MetricSnapshot]:
+    async def _iter_snapshots(self, db: Any, cutoff_time: float, newest_first: bool = False) -> AsyncIterator[MetricSnapshot]:
+        """Rebuild snapshots from the metric rows newer than `cutoff_time`, one per timestamp."""
+        shards = await self._shards_newer_than(cutoff_time)
+        order = 'ASC'
+        if newest_first:
+            shards.reverse()
+            order = 'DESC'
+        
+        # Rows share label sets; decode each one once
+        parsed_labels: Dict[Optional[str], Dict[str, str]] = {None: {}}
+        timestamp = None
+        names: List[str] = []
+        values: List[float] = []
+        labels: List[Dict[str, str]] = []
+        
+        for table in shards:
+            async for row in self._iter_rows(
+                db,
+                METRIC_ROWS_SELECT.format(table=table) + RECENT_ROWS_WHERE.format(table=table) +
+                f" ORDER BY m.id {order}",
+                (cutoff_time, cutoff_time)
+            ):
+                if row['timestamp'] != timestamp:
+                    if names:
+                        yield self._build_snapshot(timestamp, names, values, labels, newest_first)
+                    timestamp = row['timestamp']
+                    names, values, labels = [], [], []
+                
+                row_labels = parsed_labels.get(row['labels'])
+                if row_labels is None:
+                    row_labels = parsed_labels[row['labels']] = _json_loads(row['labels'])
+                names.append(row['metric_name'])
+                values.append(row['metric_value'])
+                labels.append(row_labels)
+        
+        if names:
+            yield self._build_snapshot(timestamp, names, values, labels, newest_first)
+    
+    @staticmethod
+    def _build_snapshot(timestamp: float, names: List[str], values: List[float],
+                        labels: List[Dict[str, str]], reversed_rows: bool) -> MetricSnapshot:
+        """MetricSnapshot from one timestamp's rows, in insertion order."""
+        if reversed_rows:
+            names.reverse()
+            values.reverse()
+            labels.reverse()
+        return MetricSnapshot(timestamp=timestamp, names=names, values=values, labels=labels)
+    
+    async def iter_recent_metrics(self, seconds: int) -> AsyncIterator[MetricSnapshot]:
         """
-        Get recent metrics snapshots.
+        Stream recent metrics snapshots, oldest first.
+        
+        Snapshots are rebuilt from the metric rows still in SQLite, so with
+        the archive enabled they reach back at most the hot window.
         
         Args:
             seconds: Number of seconds to look back
             
-        Returns:
-            List of MetricSnapshot objects
+        Yields:
+            MetricSnapshot objects
         """
         cutoff_time = time.time() - seconds
         
-        cursor = await self.db.execute(
-            "SELECT timestamp, snapshot_data FROM metrics_snapshots WHERE timestamp > ? ORDER BY timestamp",
-            (cutoff_time,)
-        )
+        async with self._acquire_reader() as db:
+            async for snapshot in self._iter_snapshots(db, cutoff_time):
+                yield snapshot
+    
+    async def get_recent_metrics(self, seconds: int, limit: Optional[int] = None) -> List[MetricSnapshot]:
+        """
+        Get recent metrics snapshots.
         
+        Args:
+            seconds: Number of seconds to look back
+            limit: Only return the newest `limit` snapshots
+            
+        Returns:
+            List of MetricSnapshot objects, oldest first
+        """
+        if limit is None:
+            return [snapshot async for snapshot in self.iter_recent_metrics(seconds)]
+        
+        # Newest rows first so reading stops after `limit` snapshots; reversed below
+        cutoff_time = time.time() - seconds
         snapshots = []
-        async for row in cursor:
+        async with self._acquire_reader() as db:
+            snapshot_iter = self._iter_snapshots(db, cutoff_time, newest_first=True)
             try:
-                data = json.loads(row['snapshot_data'])
-                samples = []
-                
-                for metric_name, metric_data in data['metrics'].items():
-                    sample = MetricSample(
-                        name=metric_name,
-                        value=metric_data['value'],
-                        timestamp=data['timestamp'],
-                        labels=metric_data.get('labels', {})
-                    )
-                    samples.append(sample)
-                
-                snapshot = MetricSnapshot(
-                    timestamp=data['timestamp'],
-                    samples=samples
-                )
-                snapshots.append(snapshot)
-                
-            except Exception as e:
-                self.logger.warning(f"Failed to parse stored snapshot: {e}")
-                continue
+                async for snapshot in snapshot_iter:
+                    snapshots.append(snapshot)
+                    if len(snapshots) >= limit:
+                        break
+            finally:
+                # Closes the open cursor before the connection goes back to the pool
+                await snapshot_iter.aclose()
         
+        snapshots.reverse()
         return snapshots
     
+    async def iter_metric_history(self, metric_name: str, seconds: int) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the history of a specific metric, oldest first.
+        
+        Args:
+            metric_name: Name of the metric
+            seconds: Number of seconds to look back
+            
+        Yields:
+            Metric data points
+        """
+        now = time.time()
+        cutoff_time = now - seconds
+        
+        # Archived rows are all older than the ones still in SQLite
+        if self.archive_enabled and cutoff_time < now - self.hot_hours * 3600:
+            for point in await asyncio.to_thread(self._read_archive, metric_name, cutoff_time):
+                yield point
+        
+        # Shards covering the window, oldest first
+        shards = await self._shards_newer_than(cutoff_time)
+        
+        # Rows share label sets; decode each one once
+        parsed_labels: Dict[Optional[str], Dict[str, str]] = {None: {}}
+        async with self._acquire_reader() as db:
+            for table in shards:
+                async for row in self._iter_rows(
+                    db,
+                    METRIC_ROWS_SELECT.format(table=table) +
+                    " WHERE m.metric_name = ? AND m.timestamp > ? ORDER BY m.timestamp",
+                    (metric_name, cutoff_time)
+                ):
+                    labels = parsed_labels.get(row['labels'])
+                    if labels is None:
+                        labels = parsed_labels[row['labels']] = _json_loads(row['labels'])
+                    yield {
+                        'timestamp': row['timestamp'],
+                        'value': row['metric_value'],
+                        'labels': labels
+                    }
+    
     async def get_metric_history(self, metric_name: str, seconds: int) -> List[Dict[str, Any]]:
         """
         Get history for a specific metric.
@@ -279,84 +841,145 @@ class MetricsDatabase:
         Returns:
             List of metric data points
         """
-        cutoff_time = time.time() - seconds
-        
-        cursor = await self.db.execute(
-            "SELECT timestamp, metric_value, labels FROM metrics WHERE metric_name = ? AND timestamp > ? ORDER BY timestamp",
-            (metric_name, cutoff_time)
-        )
-        
-        history = []
-        async for row in cursor:
-            labels = json.loads(row['labels']) if row['labels'] else {}
-            history.append({
-                'timestamp': row['timestamp'],
-                'value': row['metric_value'],
-                'labels': labels
-            })
-        
-        return history
+        return [point async for point in self.iter_metric_history(metric_name, seconds)]
     
-    async def store_desync_event(self, event_id: str, event_data: Dict[str, Any]):
+    async def store_desync_event(self, event_id: str, event_data: Dict[str, Any]) -> asyncio.Future:
         """
-        Store desync event in database.
+        Queue a desync event for storage.
         
         Args:
             event_id: Unique event identifier
             event_data: Complete event data
+            
+        Returns:
+            Future resolving to whether the event's transaction committed
         """
         try:
-            await self.db.execute("""
-                INSERT OR REPLACE INTO desync_events 
-                (event_id, detected_at, recovered_at, local_block, network_block, 
-                 blocks_behind, estimated_start_time, peer_count, event_data)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
+            row = (
                 event_id,
                 event_data['event_metadata']['timestamp'],
-                event_data.get('recovery_time'),
+                event_data['desync_details'].get('recovery_time'),
                 event_data['desync_details']['local_block_height'],
                 event_data['desync_details']['consensus_block_height'],
                 event_data['desync_details']['blocks_behind'],
                 event_data['desync_details'].get('estimated_desync_start'),
                 event_data['peer_analysis']['peer_statistics']['total_peers'],
-                json.dumps(event_data)
-            ))
-            
-            await self.db.commit()
-            
+                _json_text(event_data)
+            )
         except Exception as e:
+            # Rejected here so a malformed event never rolls back a shared batch
             self.logger.error(f"Failed to store desync event: {e}")
-            if self.db:
-                await self.db.rollback()
+            return self._failed_write()
+        
+        return await self._queue_write('desync', row)
+    
+    async def _upsert_desync_event(self, row: tuple):
+        """Insert or update a desync event row (the caller commits)."""
+        # Upsert in place so a recovery update keeps the row's id
+        await self.db.execute("""
+            INSERT INTO desync_events 
+            (event_id, detected_at, recovered_at, local_block, network_block, 
+             blocks_behind, estimated_start_time, peer_count, event_data)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(event_id) DO UPDATE SET
+                recovered_at = excluded.recovered_at,
+                local_block = excluded.local_block,
+                network_block = excluded.network_block,
+                blocks_behind = excluded.blocks_behind,
+                estimated_start_time = excluded.estimated_start_time,
+                peer_count = excluded.peer_count,
+                event_data = excluded.event_data
+        """, row)
     
-    async def store_anomaly(self, anomaly_data: Dict[str, Any]):
+    async def store_anomaly(self, anomaly_data: Dict[str, Any]) -> Optional[asyncio.Future]:
         """
-        Store detected anomaly in database.
+        Queue a detected anomaly for storage.
         
         Args:
             anomaly_data: Anomaly information
-        """
-        try:
-            await self.db.execute("""
-                INSERT INTO anomalies 
-                (detected_at, metric_name, anomaly_type, severity, description, anomaly_data)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                anomaly_data['detected_at'],
-                anomaly_data['metric_name'],
-                anomaly_data['anomaly_type'],
-                anomaly_data['severity'],
-                anomaly_data['description'],
-                json.dumps(anomaly_data)
-            ))
             
-            await self.db.commit()
+        Returns:
+            Future resolving to whether the anomaly's transaction committed
+        """
+        return await self.store_anomalies([anomaly_data])
+    
+    async def store_anomalies(self, anomalies: List[Any]) -> Optional[asyncio.Future]:
+        """
+        Queue several detected anomalies for storage in the same transaction.
+        
+        Args:
+            anomalies: MetricAnomaly objects, or anomaly information dicts
             
+        Returns:
+            Future resolving to whether the anomalies' transaction committed,
+            or None if there was nothing to store
+        """
+        if not anomalies:
+            return None
+        
+        try:
+            rows = [self._anomaly_row(anomaly) for anomaly in anomalies]
         except Exception as e:
-            self.logger.error(f"Failed to store anomaly: {e}")
-            if self.db:
-                await self.db.rollback()
+            self.logger.error(f"Failed to store anomalies: {e}")
+            return self._failed_write()
+        
+        return await self._queue_write('anomalies', rows)
+    
+    async def _insert_anomalies(self, rows: List[tuple]):
+        """Insert anomaly rows (the caller commits)."""
+        await self.db.executemany("""
+            INSERT INTO anomalies 
+            (detected_at, metric_name, anomaly_type, severity, description, anomaly_data)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, rows)
+    
+    @staticmethod
+    def _anomaly_row(anomaly: Any) -> tuple:
+        """Column values for one anomaly; objects are serialized without a dict copy."""
+        if isinstance(anomaly, dict):
+            return (
+                anomaly['detected_at'],
+                anomaly['metric_name'],
+                anomaly['anomaly_type'],
+                anomaly['severity'],
+                anomaly['description'],
+                _json_text(anomaly)
+            )
+        return (
+            anomaly.detected_at,
+            anomaly.metric_name,
+            anomaly.anomaly_type,
+            anomaly.severity,
+            anomaly.description,
+            _json_text(anomaly)
+        )
+    
+    async def iter_recent_desyncs(self, days: int = 30) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream recent desync events, newest first.
+        
+        Args:
+            days: Number of days to look back
+            
+        Yields:
+            Desync events
+        """
+        cutoff_time = time.time() - (days * 24 * 3600)
+        
+        async with self._acquire_reader() as db:
+            async for row in self._iter_rows(
+                db,
+                "SELECT * FROM desync_events WHERE detected_at > ? ORDER BY detected_at DESC",
+                (cutoff_time,)
+            ):
+                yield {
+                    'event_id': row['event_id'],
+                    'detected_at': row['detected_at'],
+                    'recovered_at': row['recovered_at'],
+                    'blocks_behind': row['blocks_behind'],
+                    'duration': row['recovered_at'] - row['detected_at'] if row['recovered_at'] else None,
+                    'event_data': _json_loads(row['event_data'])
+                }
     
     async def get_recent_desyncs(self, days: int = 30) -> List[Dict[str, Any]]:
         """
@@ -368,26 +991,7 @@ class MetricsDatabase:
         Returns:
             List of desync events
         """
-        cutoff_time = time.time() - (days * 24 * 3600)
-        
-        cursor = await self.db.execute(
-            "SELECT * FROM desync_events WHERE detected_at > ? ORDER BY detected_at DESC",
-            (cutoff_time,)
-        )
-        
-        events = []
-        async for row in cursor:
-            event_data = json.loads(row['event_data'])
-            events.append({
-                'event_id': row['event_id'],
-                'detected_at': row['detected_at'],
-                'recovered_at': row['recovered_at'],
-                'blocks_behind': row['blocks_behind'],
-                'duration': row['recovered_at'] - row['detected_at'] if row['recovered_at'] else None,
-                'event_data': event_data
-            })
-        
-        return events
+        return [event async for event in self.iter_recent_desyncs(days)]
     
     async def _cleanup_old_data(self):
         """Clean up old data based on retention policies."""
@@ -395,18 +999,186 @@ class MetricsDatabase:
             cutoff_time = time.time() - (self.retention_hours * 3600)
             
             # Clean old metrics
-            await self.db.execute("DELETE FROM metrics WHERE timestamp < ?", (cutoff_time,))
-            await self.db.execute("DELETE FROM metrics_snapshots WHERE timestamp < ?", (cutoff_time,))
+            await self._expire_metric_rows(cutoff_time)
+            
+            # Move metric rows past the hot window to the archive
+            if self.archive_enabled:
+                archived = await self._expire_metric_rows(time.time() - self.hot_hours * 3600, archive=True)
+                await asyncio.to_thread(self._prune_archive, cutoff_time)
+                if archived:
+                    self.logger.info(f"Archived {archived} metric rows to {self.archive_dir}")
             
             # Clean old anomalies (keep longer than metrics)
             anomaly_cutoff = time.time() - (7 * 24 * 3600)  # 7 days
-            await self.db.execute("DELETE FROM anomalies WHERE detected_at < ?", (anomaly_cutoff,))
+            await self._delete_in_batches(
+                "DELETE FROM anomalies WHERE id IN "
+                "(SELECT id FROM anomalies WHERE detected_at < ? LIMIT ?)",
+                (anomaly_cutoff,)
+            )
             
             await self.db.commit()
+            await self._incremental_vacuum()
             
             self.logger.info("Database cleanup completed")
             
         except Exception as e:
             self.logger.error(f"Database cleanup failed: {e}")
             if self.db:
-                await self.db.rollback()
\ No newline at end of file
+                await self.db.rollback()
+                # Shards dropped in the rolled back transaction are back
+                await self._load_metric_shards()
+    
+    async def _delete_in_batches(self, query: str, parameters: tuple) -> int:
+        """
+        Run a DELETE of at most DELETE_BATCH_ROWS rows per transaction until nothing is left.
+        
+        Args:
+            query: DELETE whose last placeholder is the batch LIMIT
+            parameters: Values for the other placeholders
+            
+        Returns:
+            Number of rows deleted
+        """
+        deleted = 0
+        while True:
+            cursor = await self.db.execute(query, parameters + (DELETE_BATCH_ROWS,))
+            await self.db.commit()
+            deleted += cursor.rowcount
+            if cursor.rowcount < DELETE_BATCH_ROWS:
+                return deleted
+    
+    async def _incremental_vacuum(self):
+        """Return free pages to the filesystem in bounded steps (auto_vacuum=INCREMENTAL only)."""
+        cursor = await self.db.execute("PRAGMA auto_vacuum")
+        if (await cursor.fetchone())[0] != 2:
+            return
+        
+        previous = None
+        while True:
+            cursor = await self.db.execute("PRAGMA freelist_count")
+            free_pages = (await cursor.fetchone())[0]
+            if free_pages == 0 or free_pages == previous:
+                return
+            previous = free_pages
+            
+            # Pages are freed as the statement steps, so drain it
+            cursor = await self.db.execute(f"PRAGMA incremental_vacuum({VACUUM_BATCH_PAGES})")
+            await cursor.fetchall()
+            await self.db.commit()
+    
+    async def _metric_rowid_at(self, table: str, timestamp: float) -> int:
+        """First rowid of a shard at or after `timestamp`; every row before it is older.
+        
+        Rows are inserted in timestamp order, so a rowid-order scan stops at
+        the first newer row instead of walking a timestamp index.
+        """
+        cursor = await self.db.execute(
+            f"SELECT id FROM {table} WHERE timestamp >= ? ORDER BY id LIMIT 1", (timestamp,)
+        )
+        row = await cursor.fetchone()
+        if row is not None:
+            return row[0]
+        
+        # Nothing that recent; the boundary is past the last row
+        cursor = await self.db.execute(f"SELECT IFNULL(MAX(id), 0) + 1 FROM {table}")
+        return (await cursor.fetchone())[0]
+    
+    async def _expire_metric_rows(self, before: float, archive: bool = False) -> int:
+        """
+        Remove metric rows older than `before`.
+        
+        Shards entirely older than `before` are dropped whole; the shard
+        straddling it is trimmed by rowid range, a bounded batch per
+        transaction.
+        
+        Args:
+            before: Rows older than this unix timestamp are removed
+            archive: Write the rows to the Parquet archive first
+            
+        Returns:
+            Number of rows archived
+        """
+        archived = 0
+        for table in list(self._metric_shards):
+            start, end = _shard_span(table)
+            if start >= before:
+                break
+            
+            whole = end <= before
+            boundary = None if whole else await self._metric_rowid_at(table, before)
+            
+            if archive:
+                query = METRIC_ROWS_SELECT.format(table=table)
+                if whole:
+                    cursor = await self.db.execute(query + " ORDER BY m.id")
+                else:
+                    cursor = await self.db.execute(query + " WHERE m.id < ? ORDER BY m.id", (boundary,))
+                rows = await cursor.fetchall()
+                await asyncio.to_thread(self._write_archive, rows)
+                archived += len(rows)
+            
+            if whole:
+                await self.db.execute(f"DROP TABLE {table}")
+                self._metric_shards.remove(table)
+            else:
+                await self._delete_in_batches(
+                    f"DELETE FROM {table} WHERE id IN "
+                    f"(SELECT id FROM {table} WHERE id < ? ORDER BY id LIMIT ?)",
+                    (boundary,)
+                )
+        
+        return archived
+    
+    def _prune_archive(self, retention_cutoff: float):
+        """Delete archive files whose hour is entirely past retention."""
+        if not self.archive_dir.exists():
+            return
+        
+        for path in self.archive_dir.glob('metrics-*.parquet'):
+            hour = calendar.timegm(time.strptime(path.stem.split('-')[1], ARCHIVE_HOUR_FORMAT))
+            if hour + 3600 < retention_cutoff:
+                path.unlink()
+    
+    def _write_archive(self, rows: List[Any]):
+        """Write rows (oldest first) as hourly Parquet files."""
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        
+        start = 0
+        while start < len(rows):
+            hour = int(rows[start][0] // 3600)
+            end = start
+            while end < len(rows) and int(rows[end][0] // 3600) == hour:
+                end += 1
+            
+            group = rows[start:end]
+            table = pa.Table.from_arrays([
+                pa.array([int(row[0] * 1_000_000) for row in group], pa.timestamp('us')),
+                pa.array([row[1] for row in group], pa.string()).dictionary_encode(),
+                pa.array([row[2] for row in group], pa.float64()),
+                pa.array([row[3] for row in group], pa.string()),
+            ], schema=ARCHIVE_SCHEMA)
+            
+            # First row's microsecond timestamp keeps files from repeated runs apart
+            name = f"metrics-{time.strftime(ARCHIVE_HOUR_FORMAT, time.gmtime(hour * 3600))}-{int(group[0][0] * 1_000_000)}"
+            pq.write_table(table, self.archive_dir / f"{name}.parquet", compression='zstd')
+            start = end
+    
+    def _read_archive(self, metric_name: str, cutoff_time: float) -> List[Dict[str, Any]]:
+        """Archived points of one metric newer than `cutoff_time`, oldest first."""
+        if not self.archive_dir.exists() or not any(self.archive_dir.glob('metrics-*.parquet')):
+            return []
+        
+        dataset = pads.dataset(str(self.archive_dir), format='parquet', schema=ARCHIVE_SCHEMA)
+        cutoff = pa.scalar(int(cutoff_time * 1_000_000), pa.timestamp('us'))
+        table = dataset.to_table(
+            columns=['timestamp', 'value', 'labels'],
+            filter=(pads.field('metric_name') == metric_name) & (pads.field('timestamp') > cutoff)
+        ).sort_by('timestamp')
+        
+        timestamps = table.column('timestamp').cast(pa.int64()).to_pylist()
+        values = table.column('value').to_pylist()
+        labels = table.column('labels').to_pylist()
+        return [
+            {'timestamp': ts / 1_000_000, 'value': value, 'labels': _json_loads(label) if label else {}}
+            for ts, value, label in zip(timestamps, values, labels)
+        ]
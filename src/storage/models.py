@@ -4,11 +4,12 @@ Data models for the monitoring system.
 
 from dataclasses import dataclass, field
 from typing import Dict, Any, List, Optional
+import operator
 import time
 import json
 
 
-@dataclass
+@dataclass(slots=True)
 class NodeInfo:
     """Information about a blockchain node."""
     
@@ -20,17 +21,16 @@ class NodeInfo:
     ipc_path: str
     discovered_at: float = field(default_factory=time.time)
     
+    # to_dict() keys in output order; properties are read like fields
+    _FIELDS = (
+        'node_type', 'chain_id', 'network_name', 'client_version',
+        'protocol_version', 'ipc_path', 'discovered_at',
+    )
+    _GETTER = operator.attrgetter(*_FIELDS)
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary."""
-        return {
-            'node_type': self.node_type,
-            'chain_id': self.chain_id,
-            'network_name': self.network_name,
-            'client_version': self.client_version,
-            'protocol_version': self.protocol_version,
-            'ipc_path': self.ipc_path,
-            'discovered_at': self.discovered_at
-        }
+        return dict(zip(self._FIELDS, self._GETTER(self)))
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'NodeInfo':
@@ -38,7 +38,7 @@ class NodeInfo:
         return cls(**data)
 
 
-@dataclass
+@dataclass(slots=True)
 class SyncStatus:
     """Node synchronization status."""
     
@@ -53,14 +53,34 @@ class SyncStatus:
     synced_storage: Optional[int] = None
     synced_storage_bytes: Optional[int] = None
     
+    # Derived values, computed once; replace the object rather than mutating it
+    _blocks_behind: int = field(init=False, repr=False, compare=False)
+    _sync_progress: float = field(init=False, repr=False, compare=False)
+    
+    _FIELDS = (
+        'is_syncing', 'current_block', 'highest_block', 'starting_block',
+        'synced_accounts', 'synced_account_bytes', 'synced_bytecodes',
+        'synced_bytecode_bytes', 'synced_storage', 'synced_storage_bytes',
+        'blocks_behind', 'sync_progress',
+    )
+    _GETTER = operator.attrgetter(*_FIELDS)
+    
+    def __post_init__(self):
+        self._blocks_behind = max(0, self.highest_block - self.current_block)
+        self._sync_progress = self._compute_sync_progress()
+    
     @property
     def blocks_behind(self) -> int:
         """Number of blocks behind the network."""
-        return max(0, self.highest_block - self.current_block)
+        return self._blocks_behind
     
     @property
     def sync_progress(self) -> float:
         """Sync progress as percentage (0.0 - 1.0)."""
+        return self._sync_progress
+    
+    def _compute_sync_progress(self) -> float:
+        """Sync progress from the block heights (see sync_progress)."""
         if not self.is_syncing or self.highest_block <= 0:
             return 1.0 if not self.is_syncing else 0.0
         
@@ -77,23 +97,10 @@ class SyncStatus:
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary."""
-        return {
-            'is_syncing': self.is_syncing,
-            'current_block': self.current_block,
-            'highest_block': self.highest_block,
-            'starting_block': self.starting_block,
-            'synced_accounts': self.synced_accounts,
-            'synced_account_bytes': self.synced_account_bytes,
-            'synced_bytecodes': self.synced_bytecodes,
-            'synced_bytecode_bytes': self.synced_bytecode_bytes,
-            'synced_storage': self.synced_storage,
-            'synced_storage_bytes': self.synced_storage_bytes,
-            'blocks_behind': self.blocks_behind,
-            'sync_progress': self.sync_progress
-        }
+        return dict(zip(self._FIELDS, self._GETTER(self)))
 
 
-@dataclass
+@dataclass(slots=True)
 class PeerInfo:
     """Information about a node peer."""
     
@@ -103,18 +110,17 @@ class PeerInfo:
     network: Dict[str, Any]
     protocols: Dict[str, Any]
     
+    _FIELDS = (
+        'id', 'name', 'caps', 'network', 'protocols',
+    )
+    _GETTER = operator.attrgetter(*_FIELDS)
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary."""
-        return {
-            'id': self.id,
-            'name': self.name,
-            'caps': self.caps,
-            'network': self.network,
-            'protocols': self.protocols
-        }
+        return dict(zip(self._FIELDS, self._GETTER(self)))
 
 
-@dataclass
+@dataclass(slots=True)
 class DesyncEvent:
     """Detected desynchronization event."""
     
@@ -130,6 +136,13 @@ class DesyncEvent:
     severity: str = "medium"
     context_data: Dict[str, Any] = field(default_factory=dict)
     
+    _FIELDS = (
+        'event_id', 'detected_at', 'local_block', 'network_block',
+        'blocks_behind', 'peer_count', 'estimated_start_time', 'recovered_at',
+        'recovery_duration', 'severity', 'duration', 'is_active', 'context_data',
+    )
+    _GETTER = operator.attrgetter(*_FIELDS)
+    
     @property
     def duration(self) -> Optional[float]:
         """Duration of the desync event."""
@@ -144,21 +157,7 @@ class DesyncEvent:
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary."""
-        return {
-            'event_id': self.event_id,
-            'detected_at': self.detected_at,
-            'local_block': self.local_block,
-            'network_block': self.network_block,
-            'blocks_behind': self.blocks_behind,
-            'peer_count': self.peer_count,
-            'estimated_start_time': self.estimated_start_time,
-            'recovered_at': self.recovered_at,
-            'recovery_duration': self.recovery_duration,
-            'severity': self.severity,
-            'duration': self.duration,
-            'is_active': self.is_active,
-            'context_data': self.context_data
-        }
+        return dict(zip(self._FIELDS, self._GETTER(self)))
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'DesyncEvent':
@@ -171,7 +170,7 @@ class DesyncEvent:
         return cls(**data)
 
 
-@dataclass
+@dataclass(slots=True)
 class MetricAnomaly:
     """Detected metric anomaly."""
     
@@ -185,22 +184,18 @@ class MetricAnomaly:
     deviation_score: float
     context: Dict[str, Any] = field(default_factory=dict)
     
+    _FIELDS = (
+        'metric_name', 'detected_at', 'anomaly_type', 'severity', 'description',
+        'current_value', 'expected_range', 'deviation_score', 'context',
+    )
+    _GETTER = operator.attrgetter(*_FIELDS)
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary."""
-        return {
-            'metric_name': self.metric_name,
-            'detected_at': self.detected_at,
-            'anomaly_type': self.anomaly_type,
-            'severity': self.severity,
-            'description': self.description,
-            'current_value': self.current_value,
-            'expected_range': self.expected_range,
-            'deviation_score': self.deviation_score,
-            'context': self.context
-        }
+        return dict(zip(self._FIELDS, self._GETTER(self)))
 
 
-@dataclass
+@dataclass(slots=True)
 class CorrelationResult:
     """Result of correlation analysis between metrics and events."""
     
@@ -212,20 +207,18 @@ class CorrelationResult:
     analysis_window: Dict[str, float]
     patterns_detected: List[Dict[str, Any]] = field(default_factory=list)
     
+    _FIELDS = (
+        'metric_name', 'event_type', 'correlation_strength', 'confidence_level',
+        'sample_size', 'analysis_window', 'patterns_detected',
+    )
+    _GETTER = operator.attrgetter(*_FIELDS)
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary."""
-        return {
-            'metric_name': self.metric_name,
-            'event_type': self.event_type,
-            'correlation_strength': self.correlation_strength,
-            'confidence_level': self.confidence_level,
-            'sample_size': self.sample_size,
-            'analysis_window': self.analysis_window,
-            'patterns_detected': self.patterns_detected
-        }
+        return dict(zip(self._FIELDS, self._GETTER(self)))
 
 
-@dataclass
+@dataclass(slots=True)
 class MonitoringState:
     """Current state of the monitoring system."""
     
@@ -254,6 +247,19 @@ class MonitoringState:
 class MonitoringStats:
     """Statistics for monitoring performance."""
     
+    __slots__ = (
+        'metrics_collected',
+        'desyncs_detected',
+        'anomalies_detected',
+        'ipc_calls_made',
+        'ipc_call_failures',
+        'prometheus_requests',
+        'prometheus_request_failures',
+        'database_writes',
+        'database_write_failures',
+        'start_time',
+    )
+    
     def __init__(self):
         self.metrics_collected = 0
         self.desyncs_detected = 0
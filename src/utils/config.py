@@ -2,17 +2,27 @@
 Configuration management utilities.
 """
 
+import copy
 import os
 import yaml
 import logging
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Any, Optional
 
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
 
 def load_config(config_path: Optional[str] = None) -> Dict[str, Any]:
     """
     Load configuration from YAML file.
     
+    Parsed files are cached until their modification time changes; each
+    call returns its own copy.
+    
     Args:
         config_path: Path to config file. If None, uses default.
         
@@ -31,9 +41,15 @@ def load_config(config_path: Optional[str] = None) -> Dict[str, Any]:
     if not config_path.exists():
         raise FileNotFoundError(f"Configuration file not found: {config_path}")
     
+    return copy.deepcopy(_load_config_file(str(config_path), config_path.stat().st_mtime_ns))
+
+
+@lru_cache(maxsize=None)
+def _load_config_file(config_path: str, mtime_ns: int) -> Dict[str, Any]:
+    """Parse, validate and complete a config file (cached per path and mtime)."""
     try:
         with open(config_path, 'r') as f:
-            config = yaml.safe_load(f)
+            config = yaml.load(f, Loader=_YamlLoader)
         
         # Validate required sections
         required_sections = ['node', 'monitoring', 'prometheus', 'correlation', 'storage', 'logging']
@@ -53,12 +69,18 @@ def load_config(config_path: Optional[str] = None) -> Dict[str, Any]:
 
 def load_prometheus_metrics_config() -> Dict[str, Any]:
     """Load Prometheus metrics configuration."""
-    metrics_config_path = os.path.join(
+    metrics_config_path = Path(os.path.join(
         os.path.dirname(__file__), "../../config/prometheus_metrics.yaml"
-    )
+    )).resolve()
     
-    with open(metrics_config_path, 'r') as f:
-        return yaml.safe_load(f)
+    return copy.deepcopy(_load_yaml_file(str(metrics_config_path), metrics_config_path.stat().st_mtime_ns))
+
+
+@lru_cache(maxsize=None)
+def _load_yaml_file(path: str, mtime_ns: int) -> Any:
+    """Parse a YAML file (cached per path and mtime)."""
+    with open(path, 'r') as f:
+        return yaml.load(f, Loader=_YamlLoader)
 
 
 def _apply_defaults(config: Dict[str, Any]) -> Dict[str, Any]:
@@ -67,6 +89,19 @@ def _apply_defaults(config: Dict[str, Any]) -> Dict[str, Any]:
     if 'auto_detect' not in config['node']:
         config['node']['auto_detect'] = True
     
+    return config
+
+
+def ensure_runtime_dirs(config: Dict[str, Any]) -> None:
+    """
+    Create the data and log directories named in the configuration.
+    
+    Called once by the application at startup; load_config itself has no
+    filesystem side effects.
+    
+    Args:
+        config: Configuration dictionary returned by load_config
+    """
     # Create data directory if it doesn't exist
     data_dir = Path(config['storage']['database_path']).parent
     data_dir.mkdir(parents=True, exist_ok=True)
@@ -77,8 +112,6 @@ def _apply_defaults(config: Dict[str, Any]) -> Dict[str, Any]:
     
     for subdir in ['desyncs', 'analysis', 'metrics', 'system']:
         (log_dir / subdir).mkdir(parents=True, exist_ok=True)
-    
-    return config
 
 
 def _resolve_paths(config: Dict[str, Any]) -> Dict[str, Any]:
@@ -115,6 +148,16 @@ def get_network_config(config: Dict[str, Any], network_name: str) -> Dict[str, A
     return config['node']['networks'][network_name]
 
 
+# Substring of a lower-cased IPC path -> network, first match wins
+_NETWORK_MATCHERS = (
+    ('bsc', 'bsc'),
+    ('geth.ipc', 'bsc'),
+    ('reth.ipc', 'base'),
+    ('tmp', 'base'),
+)
+
+
+@lru_cache(maxsize=64)
 def detect_network_from_ipc(ipc_path: str) -> str:
     """
     Detect network type from IPC path.
@@ -127,10 +170,5 @@ def detect_network_from_ipc(ipc_path: str) -> str:
     """
     ipc_path = ipc_path.lower()
     
-    if 'bsc' in ipc_path or 'geth.ipc' in ipc_path:
-        return 'bsc'
-    elif 'reth.ipc' in ipc_path or 'tmp' in ipc_path:
-        return 'base'
-    else:
-        # Default to BSC if can't determine
-        return 'bsc'
\ No newline at end of file
+    # Default to BSC if can't determine
+    return next((network for pattern, network in _NETWORK_MATCHERS if pattern in ipc_path), 'bsc')
\ No newline at end of file
@@ -2,52 +2,389 @@
 Logging setup and utilities.
 """
 
+import atexit
+import codecs
+import copy
 import os
 import json
 import logging
 import logging.config
+import logging.handlers
+import queue
+import time
 import yaml
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
 
-class JSONFormatter(logging.Formatter):
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+# Standard LogRecord attributes; anything else on a record is an extra field
+_RESERVED_RECORD_ATTRS = frozenset({
+    'name', 'msg', 'args', 'levelname', 'levelno', 'pathname',
+    'filename', 'module', 'exc_info', 'exc_text', 'stack_info',
+    'lineno', 'funcName', 'created', 'msecs', 'relativeCreated',
+    'thread', 'threadName', 'processName', 'process', 'getMessage',
+    'message', 'asctime',
+})
+
+# Attribute count of a record created without extra=; only larger records
+# can carry extra fields
+_BASE_ATTR_COUNT = len(logging.LogRecord('x', 0, 'x', 0, 'x', (), None).__dict__)
+
+# Set on the shared record by text formatters of handlers that ran earlier
+_FORMATTER_RECORD_ATTRS = ('message', 'asctime')
+
+
+def _json_default(value: Any) -> Any:
+    """Serialize extra-field values the JSON encoder has no native type for."""
+    if isinstance(value, Exception):
+        return f"{type(value).__name__}: {value}"
+    # Decimal, Path and anything else fall back to their text form
+    return str(value)
+
+
+if HAS_ORJSON:
+    # numpy scalars/arrays in extras are serialized natively (no-op without numpy);
+    # naive datetimes stay naive since the monitors log local time
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY
+    
+    def _dumps_entry_bytes(entry: Dict[str, Any]) -> bytes:
+        try:
+            return orjson.dumps(entry, default=_json_default, option=_ORJSON_OPTIONS)
+        except TypeError:
+            # e.g. integers beyond 64 bits or non-string keys in extras
+            return json.dumps(entry, default=_json_default).encode('utf-8')
+    
+    def _dumps_entry(entry: Dict[str, Any]) -> str:
+        return _dumps_entry_bytes(entry).decode('utf-8')
+else:
+    def _dumps_entry(entry: Dict[str, Any]) -> str:
+        return json.dumps(entry, default=_json_default)
+    
+    def _dumps_entry_bytes(entry: Dict[str, Any]) -> bytes:
+        return _dumps_entry(entry).encode('utf-8')
+
+
+class CachedTimeFormatter(logging.Formatter):
+    """Formatter producing logging.Formatter's timestamps with one strftime per second."""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # ((second, datefmt), strftime text) of the last record, replaced as
+        # one tuple so handlers sharing the formatter never see a torn pair
+        self._time_cache = (None, '')
+    
+    def formatTime(self, record, datefmt=None):
+        """Same output as logging.Formatter.formatTime, reusing the strftime text within a second."""
+        key = (int(record.created), datefmt)
+        cached_key, text = self._time_cache
+        if key != cached_key:
+            text = time.strftime(datefmt or self.default_time_format, self.converter(record.created))
+            self._time_cache = (key, text)
+        
+        if datefmt is None and self.default_msec_format:
+            return self.default_msec_format % (text, record.msecs)
+        return text
+
+
+class JSONFormatter(CachedTimeFormatter):
     """JSON log formatter for structured logging."""
     
     def format(self, record):
+        return _dumps_entry(self._build_entry(record))
+    
+    def format_bytes(self, record) -> bytes:
+        """The record as UTF-8 encoded JSON, for handlers writing bytes."""
+        return _dumps_entry_bytes(self._build_entry(record))
+    
+    def _build_entry(self, record) -> Dict[str, Any]:
+        """Dict of the record's standard and extra fields."""
+        # Standard fields straight from the instance dict
+        fields = record.__dict__
         log_entry = {
             'timestamp': self.formatTime(record, self.datefmt),
-            'level': record.levelname,
-            'logger': record.name,
+            'level': fields['levelname'],
+            'logger': fields['name'],
             'message': record.getMessage(),
-            'module': record.module,
-            'function': record.funcName,
-            'line': record.lineno
+            'module': fields['module'],
+            'function': fields['funcName'],
+            'line': fields['lineno']
         }
         
-        # Add exception info if present
+        # Add exception info if present, formatted once per record like
+        # logging.Formatter does (other handlers reuse exc_text)
         if record.exc_info:
-            log_entry['exception'] = self.formatException(record.exc_info)
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+            log_entry['exception'] = record.exc_text
         
         # Add extra fields if present
-        for key, value in record.__dict__.items():
-            if key not in ['name', 'msg', 'args', 'levelname', 'levelno', 'pathname',
-                          'filename', 'module', 'exc_info', 'exc_text', 'stack_info',
-                          'lineno', 'funcName', 'created', 'msecs', 'relativeCreated',
-                          'thread', 'threadName', 'processName', 'process', 'getMessage',
-                          'message']:
-                log_entry[key] = value
+        attr_count = len(fields)
+        for key in _FORMATTER_RECORD_ATTRS:
+            if key in fields:
+                attr_count -= 1
+        if attr_count > _BASE_ATTR_COUNT:
+            for key, value in fields.items():
+                if key not in _RESERVED_RECORD_ATTRS:
+                    log_entry[key] = value
+        
+        return log_entry
+
+
+# Write buffer of log files; the queue listener flushes it whenever the
+# queue runs empty, so a burst of records costs one write
+LOG_FILE_BUFFER_BYTES = 65536
+
+
+class _BufferedFileMixin:
+    """Opens the log file with a large buffer and skips the flush after each record."""
+    
+    def _open(self):
+        stream = open(self.baseFilename, self.mode, buffering=LOG_FILE_BUFFER_BYTES,
+                      encoding=self.encoding, errors=self.errors)
+        # Formatters with format_bytes() can skip the text layer on UTF-8 files
+        self._utf8_stream = codecs.lookup(stream.encoding).name == 'utf-8'
+        return stream
+    
+    def emit(self, record):
+        format_bytes = getattr(self.formatter, 'format_bytes', None)
+        if format_bytes is None:
+            super().emit(record)
+            return
+        
+        try:
+            should_rollover = getattr(self, 'shouldRollover', None)
+            if should_rollover is not None and should_rollover(record):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            if not self._utf8_stream:
+                logging.StreamHandler.emit(self, record)
+                return
+            # Every record of this handler takes this path, so nothing is
+            # pending in the text layer ahead of these bytes
+            self.stream.buffer.write(format_bytes(record) + self.terminator.encode('utf-8'))
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+    
+    def flush(self):
+        # Called by emit() for every record; closing the file still writes the buffer
+        pass
+    
+    def flush_buffer(self):
+        """Write buffered records to the file."""
+        super().flush()
+
+
+class BufferedFileHandler(_BufferedFileMixin, logging.FileHandler):
+    """FileHandler writing through a large buffer."""
+
+
+class BufferedTimedRotatingFileHandler(_BufferedFileMixin, logging.handlers.TimedRotatingFileHandler):
+    """TimedRotatingFileHandler writing through a large buffer."""
+
+
+class BufferedRotatingFileHandler(_BufferedFileMixin, logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler writing through a large buffer.
+    
+    The file size is tracked in memory; the stock size check seeks the
+    stream, which would flush the buffer on every record.
+    """
+    
+    def _open(self):
+        stream = super()._open()
+        self._size = os.fstat(stream.fileno()).st_size
+        # Never roll over anything other than a regular file (bpo-45401)
+        self._regular_file = os.path.isfile(self.baseFilename)
+        self._pending = 0
+        return stream
+    
+    def shouldRollover(self, record):
+        if self.stream is None:
+            self.stream = self._open()
+        if self.maxBytes <= 0 or not self._regular_file:
+            self._pending = 0
+            return False
+        self._pending = len(self.format(record)) + len(self.terminator)
+        return self._size + self._pending >= self.maxBytes
+    
+    def emit(self, record):
+        super().emit(record)
+        self._size += self._pending
+
+
+# Standard file handler classes replaced by their buffered variants in setup_logging
+_BUFFERED_HANDLER_CLASSES = {
+    'logging.FileHandler': BufferedFileHandler,
+    'logging.handlers.RotatingFileHandler': BufferedRotatingFileHandler,
+    'logging.handlers.TimedRotatingFileHandler': BufferedTimedRotatingFileHandler,
+}
+
+
+class _RoutingQueueHandler(logging.handlers.QueueHandler):
+    """Queues records together with the handlers of the logger they were logged on."""
+    
+    def __init__(self, log_queue: queue.SimpleQueue, targets: Tuple[logging.Handler, ...]):
+        super().__init__(log_queue)
+        self.targets = targets
+        # Records no target would accept are dropped by the logger before
+        # prepare() renders their message on the calling thread
+        self.setLevel(min(handler.level for handler in targets))
+    
+    def prepare(self, record):
+        """Freeze the message arguments but keep the record otherwise intact.
         
-        return json.dumps(log_entry)
+        The stock QueueHandler.prepare folds the traceback into msg and drops
+        exc_info; the target handlers run in this process, so formatters can
+        use the record as logged.
+        """
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+    
+    def enqueue(self, record):
+        self.queue.put_nowait((record, self.targets))
+
+
+class _RoutingQueueListener(logging.handlers.QueueListener):
+    """Single background thread passing queued records to their target handlers."""
+    
+    def __init__(self, log_queue: queue.SimpleQueue):
+        super().__init__(log_queue, respect_handler_level=True)
+        # Buffered handlers written to since the queue last ran empty
+        self._unflushed = set()
+    
+    def handle(self, item):
+        record, targets = item
+        for handler in targets:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+                if isinstance(handler, _BufferedFileMixin):
+                    self._unflushed.add(handler)
+        
+        if self._unflushed and self.queue.empty():
+            for handler in self._unflushed:
+                handler.flush_buffer()
+            self._unflushed.clear()
+
+
+# Listener behind the queue handlers installed by setup_logging
+_queue_listener: Optional[_RoutingQueueListener] = None
+
+
+def _stop_queue_listener() -> None:
+    """Drain queued records and stop the listener thread, if one is running."""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
+# Runs before logging's own shutdown hook, so queued records still reach the files
+atexit.register(_stop_queue_listener)
+
+
+def _expand_handler_filenames(log_config: Dict[str, Any]) -> None:
+    """Expand ~ and environment variables in handler filenames, once per config load."""
+    for handler_config in log_config.get('handlers', {}).values():
+        if 'filename' in handler_config:
+            handler_config['filename'] = os.path.expandvars(os.path.expanduser(handler_config['filename']))
+
+
+def _share_identical_formatters(log_config: Dict[str, Any]) -> None:
+    """Point handlers at one formatter per distinct formatter config and drop the duplicates."""
+    formatters = log_config.get('formatters', {})
+    first_by_config: Dict[str, str] = {}
+    duplicates: Dict[str, str] = {}
+    for name, formatter_config in formatters.items():
+        # Formatter configs are flat mappings of scalars
+        key = repr(sorted(formatter_config.items()))
+        first = first_by_config.setdefault(key, name)
+        if first != name:
+            duplicates[name] = first
+    
+    for name in duplicates:
+        del formatters[name]
+    for handler_config in log_config.get('handlers', {}).values():
+        formatter = handler_config.get('formatter')
+        if formatter in duplicates:
+            handler_config['formatter'] = duplicates[formatter]
+
+
+def _use_buffered_file_handlers(log_config: Dict[str, Any]) -> None:
+    """Swap standard file handler classes in a logging config for the buffered ones."""
+    for handler_config in log_config.get('handlers', {}).values():
+        buffered = _BUFFERED_HANDLER_CLASSES.get(handler_config.get('class'))
+        if buffered is not None:
+            # A '()' factory may be a class object; 'class' must be an import path
+            del handler_config['class']
+            handler_config['()'] = buffered
+
+
+def _install_queue_handlers(logger_names: List[str]) -> None:
+    """
+    Move the handlers of the root logger and the named loggers behind one queue.
+    
+    Logging calls then only enqueue the record; formatting and file/console
+    I/O happen on the listener thread.
+    
+    Args:
+        logger_names: Loggers configured by the logging config
+    """
+    global _queue_listener
+    log_queue = queue.SimpleQueue()
+    listener = _RoutingQueueListener(log_queue)
+    
+    # getLogger('') is the root logger; dedupe by identity
+    loggers = {id(logger): logger for logger in map(logging.getLogger, ['', *logger_names])}
+    
+    # Loggers sharing a handler list share one queue handler
+    queue_handlers: Dict[Tuple[int, ...], _RoutingQueueHandler] = {}
+    for logger in loggers.values():
+        if not logger.handlers:
+            continue
+        targets = tuple(logger.handlers)
+        key = tuple(id(handler) for handler in targets)
+        if key not in queue_handlers:
+            queue_handlers[key] = _RoutingQueueHandler(log_queue, targets)
+        logger.handlers = [queue_handlers[key]]
+    
+    listener.start()
+    _queue_listener = listener
+
+
+# config_path argument of the last successful setup_logging call
+_initialized_from: Optional[str] = None
 
 
 def setup_logging(config_path: str = None) -> None:
     """
     Setup logging configuration from YAML file.
     
+    Calling it again with the same path keeps the current configuration.
+    
     Args:
         config_path: Path to logging configuration file
     """
+    global _initialized_from
+    requested_path = str(config_path or '')
+    if requested_path == _initialized_from:
+        return
+    
     if config_path is None:
         config_path = os.path.join(
             os.path.dirname(__file__), "../../config/logging.yaml"
@@ -66,18 +403,31 @@ def setup_logging(config_path: str = None) -> None:
         return
     
     try:
-        with open(config_path, 'r') as f:
-            log_config = yaml.safe_load(f)
+        # The old listener must not write to handlers dictConfig is about to close
+        _stop_queue_listener()
+        _initialized_from = None
+        
+        # dictConfig consumes the dict it is given, so it gets a copy
+        stat = config_path.stat()
+        log_config = copy.deepcopy(_load_logging_yaml(str(config_path), stat.st_mtime_ns, stat.st_size))
         
         # Ensure log directories exist
+        _expand_handler_filenames(log_config)
         _create_log_directories(log_config)
         
-        # Configure logging
+        # One formatter per distinct config; buffered file handlers
+        _share_identical_formatters(log_config)
+        _use_buffered_file_handlers(log_config)
+        
+        # Configure logging, then put the configured handlers behind a queue
+        logger_names = list(log_config.get('loggers', {}))
         logging.config.dictConfig(log_config)
+        _install_queue_handlers(logger_names)
         
         # Test logging setup
         logger = logging.getLogger(__name__)
         logger.info("Logging system initialized successfully")
+        _initialized_from = requested_path
         
     except Exception as e:
         # Fallback to basic logging
@@ -89,14 +439,25 @@ def setup_logging(config_path: str = None) -> None:
         logging.error(f"Failed to setup logging configuration: {e}")
 
 
+@lru_cache(maxsize=32)
+def _load_logging_yaml(config_path: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    """Parse a logging config file (cached per path, mtime and size)."""
+    with open(config_path, 'r') as f:
+        return yaml.load(f, Loader=_YamlLoader)
+
+
 def _create_log_directories(log_config: Dict[str, Any]) -> None:
     """Create log directories from logging configuration."""
     handlers = log_config.get('handlers', {})
     
-    for handler_name, handler_config in handlers.items():
-        if 'filename' in handler_config:
-            log_file = Path(handler_config['filename'])
-            log_file.parent.mkdir(parents=True, exist_ok=True)
+    # Handlers often share a directory; create each one once
+    directories = {
+        os.path.dirname(handler_config['filename']) or '.'
+        for handler_config in handlers.values()
+        if 'filename' in handler_config
+    }
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
 
 
 def get_logger(name: str) -> logging.Logger:
@@ -4,13 +4,19 @@ Live status dashboard for the monitoring application
 """
 
 import asyncio
+import os
 import sys
-import json
-from pathlib import Path
-from datetime import datetime
+import time
 
 # Add src to path
-sys.path.insert(0, str(Path(__file__).parent / 'src'))
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+# Seconds between checks; consecutive connection failures step through the
+# longer delays (last one repeats) so a dead node is not polled every 5s
+POLL_INTERVAL = 5
+FAILURE_BACKOFF = (5, 10, 30)
 
 async def monitor_status():
     """Show live status of the monitoring system."""
@@ -28,43 +34,62 @@ async def monitor_status():
         config = load_config()
         
         # Get connection details
-        ipc_path = (
-            config.get('networks', {}).get('bsc', {}).get('ipc_path') or
-            config.get('node', {}).get('ipc_path')
-        )
-        http_rpc_url = config.get('node', {}).get('rpc_url', 'http://localhost:8545')
+        try:
+            ipc_path = config['networks']['bsc']['ipc_path']
+        except KeyError:
+            ipc_path = None
+        node_config = config.get('node', {})
+        if not ipc_path:
+            ipc_path = node_config.get('ipc_path')
+        http_rpc_url = node_config.get('rpc_url', 'http://localhost:8545')
         
         # Create IPC client
         client = IPCClient(ipc_path=ipc_path, http_rpc_url=http_rpc_url)
         
         iteration = 0
+        failures = 0
         while True:
             iteration += 1
-            timestamp = datetime.now().strftime("%H:%M:%S")
+            lt = time.localtime()
+            timestamp = f"{lt.tm_hour:02d}:{lt.tm_min:02d}:{lt.tm_sec:02d}"
+            
+            # Fragments of this check's status line, written in one go below
+            line = [f"\r🕐 {timestamp} | Check #{iteration}"]
             
-            print(f"\r🕐 {timestamp} | Check #{iteration}", end="")
+            # Test connection and get sync status in one round trip
+            version_response, sync_status = await asyncio.gather(
+                client.get_client_version(),
+                client.get_sync_status(),
+                return_exceptions=True
+            )
             
-            try:
-                # Test connection
-                version_response = await client.get_client_version()
-                
-                if version_response.success:
-                    print(f" | ✅ Connected: {version_response.data[:50]}...")
-                    
-                    # Get sync status
-                    sync_status = await client.get_sync_status()
-                    if sync_status:
-                        syncing_status = "🔄 Syncing" if sync_status.is_syncing else "✅ Synced"
-                        print(f" | {syncing_status} | Block: {sync_status.current_block:,}")
-                    else:
-                        print(" | ❓ No sync status")
+            # The client version may be served from the client's metadata
+            # cache, so only the live sync query shows the node is reachable
+            connected = sync_status is not None and not isinstance(sync_status, Exception)
+            if isinstance(version_response, Exception):
+                line.append(f" | 💥 Error: {str(version_response)[:30]}...")
+            elif version_response.success:
+                if connected:
+                    line.append(f" | ✅ Connected: {version_response.data[:50]}...")
+                    syncing_status = "🔄 Syncing" if sync_status.is_syncing else "✅ Synced"
+                    line.append(f" | {syncing_status} | Block: {sync_status.current_block:,}")
+                elif isinstance(sync_status, Exception):
+                    line.append(f" | 💥 Error: {str(sync_status)[:30]}...")
                 else:
-                    print(f" | ❌ Connection failed: {version_response.error[:30]}...")
-                    
-            except Exception as e:
-                print(f" | 💥 Error: {str(e)[:30]}...")
+                    line.append(" | ❌ Connection failed: no sync status")
+            else:
+                line.append(f" | ❌ Connection failed: {version_response.error[:30]}...")
+            
+            line.append("\n")
+            sys.stdout.write("".join(line))
+            sys.stdout.flush()
             
-            await asyncio.sleep(5)  # Update every 5 seconds
+            if connected:
+                failures = 0
+                await asyncio.sleep(POLL_INTERVAL)
+            else:
+                failures += 1
+                await asyncio.sleep(FAILURE_BACKOFF[min(failures, len(FAILURE_BACKOFF)) - 1])
             
     except KeyboardInterrupt:
         print(f"\n\n👋 Status monitoring stopped.")
@@ -0,0 +1,76 @@
+"""
+Desync logger context queries against a real metrics database.
+"""
+
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+from core.prometheus_client import MetricSnapshot
+from loggers.desync_logger import DesyncLogger
+from storage.database import MetricsDatabase
+from storage.models import DesyncEvent
+
+
+class DesyncLoggerDatabaseTest(unittest.IsolatedAsyncioTestCase):
+    """The context scans read metrics written through the database the app wires in."""
+    
+    async def asyncSetUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        root = Path(self._tmp.name)
+        self.config = {
+            'logging': {'logs_directory': str(root / 'logs')},
+            'storage': {'database_path': str(root / 'monitoring.db'), 'timeseries_retention_hours': 1}
+        }
+        
+        # Shared database as main.py creates it
+        self.database = MetricsDatabase(self.config)
+        await self.database.initialize()
+        
+        # Twenty steady samples and one spike within the context window
+        now = time.time()
+        writes = []
+        for i in range(21):
+            value = 1000.0 if i == 20 else 10.0 + i % 2
+            snapshot = MetricSnapshot(now - 60 + i, ['peer_count'], [value], [{}])
+            writes.append(await self.database.store_metrics(snapshot))
+        for write in writes:
+            self.assertTrue(await write)
+        
+        self.event = DesyncEvent('event-1', now, 100, 110, 10, 5)
+    
+    async def asyncTearDown(self):
+        await self.database.close()
+        self._tmp.cleanup()
+    
+    async def test_shared_database(self):
+        desync_logger = DesyncLogger(self.config, database=self.database)
+        await desync_logger.initialize()
+        try:
+            anomalies = await desync_logger._identify_metric_anomalies(self.event)
+            self.assertEqual([anomaly['value'] for anomaly in anomalies], [1000.0])
+            
+            context = await desync_logger._get_context_metrics(self.event.detected_at)
+            self.assertIn('peer_count', context['pre_event']['metrics'])
+        finally:
+            await desync_logger.close()
+        
+        # Closing the logger leaves the shared database open
+        self.assertEqual(len(await self.database.get_recent_metrics(120)), 21)
+    
+    async def test_own_database(self):
+        desync_logger = DesyncLogger(self.config)
+        await desync_logger.initialize()
+        try:
+            anomalies = await desync_logger._identify_metric_anomalies(self.event)
+            self.assertEqual(len(anomalies), 1)
+        finally:
+            await desync_logger.close()
+
+
+if __name__ == '__main__':
+    unittest.main()